@@ -1,6 +1,9 @@
+import json
+
 from django.contrib import admin
 from django.db.models import F, OrderBy
-from .models import Region, City, Currency, Subscription, CountryName, ExchangeRate
+from django.utils.html import format_html
+from .models import Region, City, Currency, Subscription, CountryName, ExchangeRate, ProfiledRequest
 
 
 @admin.register(ExchangeRate)
@@ -42,3 +45,29 @@ class CityAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Currency)
+
+
+@admin.register(ProfiledRequest)
+class ProfiledRequestAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'sql_count', 'sql_ms',
+                    'trigger')
+    list_filter = ('trigger', 'method', 'status_code')
+    search_fields = ('path', 'view_name')
+    fields = ('created_at', 'method', 'path', 'view_name', 'status_code', 'trigger', 'duration_ms', 'sql_count',
+              'sql_ms', 'profile_display', 'queries_display', 'flame_graph')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Профиль')
+    def profile_display(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto">{}</pre>', obj.profile)
+
+    @admin.display(description='SQL-запросы')
+    def queries_display(self, obj):
+        slowest = sorted(obj.queries, key=lambda query: -query['duration_ms'])
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', json.dumps(slowest, ensure_ascii=False, indent=2))
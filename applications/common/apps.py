@@ -5,3 +5,9 @@ class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'applications.common'
     verbose_name = "4. ОБЩИЕ ПОЛЯ"
+
+    def ready(self):
+        import applications.common.signals
+        from applications.common.metrics import instrument_serializers
+
+        instrument_serializers()
@@ -0,0 +1,111 @@
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+
+from .metrics import record_cache
+
+# Маркер промаха общего кэша: None - закэшированное значение (например, "курс не задан")
+MISSING = object()
+
+
+class TwoLevelCache:
+    """
+    Двухуровневый кэш: словарь в памяти процесса поверх общего кэша (Redis).
+
+    Инвалидация меняет версию пространства имен в общем кэше, поэтому старые
+    значения просто перестают читаться. Локальная копия сверяет версию не чаще
+    раза в local_timeout секунд, так что горячий путь не ходит ни в базу, ни в Redis.
+    Общий кэш обязателен (CACHE_REDIS_URL): с кэшем в памяти процесса инвалидация
+    из одного процесса не видна остальным.
+    """
+
+    def __init__(self, namespace, timeout=60 * 60, local_timeout=5):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self._local = {}
+
+    @property
+    def version_key(self):
+        return f'{self.namespace}:version'
+
+    def get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(self.version_key, version, timeout=None):
+                version = cache.get(self.version_key, version)
+        return version
+
+    def get(self, key, loader):
+        now = time.monotonic()
+        entry = self._local.get(key)
+        if entry and now - entry[2] < self.local_timeout:
+            record_cache('local', True)
+            return entry[1]
+
+        version = self.get_version()
+        if entry and entry[0] == version:
+            record_cache('local', True)
+            self._local[key] = (version, entry[1], now)
+            return entry[1]
+
+        shared_key = f'{self.namespace}:{version}:{key}'
+        value = cache.get(shared_key, MISSING)
+        record_cache('shared', value is not MISSING)
+        if value is MISSING:
+            value = loader()
+            cache.set(shared_key, value, timeout=self.timeout)
+        self._local[key] = (version, value, now)
+        return value
+
+    def invalidate(self):
+        cache.set(self.version_key, time.time_ns(), timeout=None)
+        self._local.clear()
+
+
+class ReferenceCache:
+    """
+    Справочные таблицы (регионы, города, типы комнат и т.п.) целиком в памяти.
+
+    Для каждой модели хранится словарь {pk: объект} и индексы по полям, через
+    TwoLevelCache со своей версией. Сохранение или удаление записи справочника
+    сбрасывает версию его модели.
+    """
+
+    def __init__(self):
+        self._caches = {}
+
+    def register(self, model):
+        if model not in self._caches:
+            label = model._meta.label_lower
+            self._caches[model] = TwoLevelCache(f'reference:{label}')
+            post_save.connect(self.invalidate, sender=model, weak=False, dispatch_uid=f'reference_cache_{label}')
+            post_delete.connect(self.invalidate, sender=model, weak=False, dispatch_uid=f'reference_cache_{label}')
+        return self._caches[model]
+
+    def invalidate(self, sender, **kwargs):
+        self.register(sender).invalidate()
+
+    def all(self, model):
+        return self.register(model).get('all', lambda: {obj.pk: obj for obj in model._default_manager.all()})
+
+    def get(self, model, pk):
+        return self.all(model).get(pk)
+
+    def lookup(self, model, field_name, value):
+        """Поиск записи по значению поля (значения из запроса приходят строками)"""
+        if field_name == 'pk':
+            field_name = model._meta.pk.attname
+
+        def build_index():
+            index = {}
+            for obj in model._default_manager.order_by('pk'):
+                index.setdefault(str(getattr(obj, field_name)), obj)
+            return index
+
+        return self.register(model).get(f'by:{field_name}', build_index).get(str(value))
+
+
+reference_cache = ReferenceCache()
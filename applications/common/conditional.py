@@ -0,0 +1,86 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .response_cache import get_generation, normalize_query_params
+
+
+def make_etag(*parts, weak=False):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    etag = quote_etag(digest)
+    return f'W/{etag}' if weak else etag
+
+
+def set_validators(response, etag, last_modified=None):
+    """Валидаторы в ответе; клиент обязан перепроверять копию при каждом обращении"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, max_age=0, must_revalidate=True)
+    return response
+
+
+class ConditionalRetrieveMixin:
+    """
+    If-None-Match / If-Modified-Since для retrieve.
+
+    Версия объявления читается легким запросом (etag_probe_fields, без JOIN
+    справочников и prefetch), и при совпадении отдается 304 без сериализации.
+    Счетчик просмотров в версию не входит: иначе каждый сброс просмотров
+    делал бы недействительными копии всех клиентов.
+    """
+    last_modified_field = 'updated_at'
+    etag_probe_fields = ('updated_at',)
+
+    def get_etag_probe_queryset(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+    def get_etag_extra(self):
+        """Версии данных вне строки объявления, попадающих в ответ"""
+        return ()
+
+    def get_detail_validators(self):
+        probe = self.get_etag_probe_queryset().values(*self.etag_probe_fields).first()
+        if probe is None:
+            return None, None
+        last_modified = probe.get(self.last_modified_field)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        etag = make_etag(self.kwargs[self.lookup_url_kwarg or self.lookup_field],
+                         *(probe[field] for field in self.etag_probe_fields), *self.get_etag_extra())
+        return etag, last_modified
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_detail_validators()
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            set_validators(response, etag, last_modified)
+        return response
+
+
+class ConditionalListMixin:
+    """Слабый ETag списка из поколения кэша ответов (cache_group и категория) и параметров запроса"""
+
+    def get_list_etag_extra(self):
+        """Что еще меняет список помимо поколения (например, окно по дате)"""
+        return ()
+
+    def get_list_etag(self):
+        generation = get_generation(self.cache_group, self.get_cache_category())
+        return make_etag(generation, normalize_query_params(self.request.query_params),
+                         *self.get_list_etag_extra(), weak=True)
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            set_validators(response, etag)
+        return response
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class LocalViewStore:
+    """
+    Буфер просмотров в памяти процесса с теми же командами, что у Redis
+    (для разработки и тестов, только при DEBUG): задача сброса видит лишь
+    просмотры своего процесса.
+    """
+
+    def __init__(self):
+        self._hashes = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def set(self, key, value, nx=False, ex=None):
+        with self._lock:
+            now = time.monotonic()
+            if nx and self._expires.get(key, 0) > now:
+                return None
+            self._expires[key] = now + ex if ex else float('inf')
+            return True
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            values = self._hashes.setdefault(key, Counter())
+            values[str(field).encode()] += amount
+            return values[str(field).encode()]
+
+    def exists(self, key):
+        return int(key in self._hashes)
+
+    def rename(self, key, new_key):
+        with self._lock:
+            if key not in self._hashes:
+                raise redis.ResponseError('no such key')
+            self._hashes[new_key] = self._hashes.pop(key)
+
+    def hgetall(self, key):
+        with self._lock:
+            return {field: str(value).encode() for field, value in self._hashes.get(key, {}).items()}
+
+    def delete(self, key):
+        with self._lock:
+            self._hashes.pop(key, None)
+            self._expires.pop(key, None)
+
+
+class ViewCounter:
+    """
+    Буфер просмотров объявлений.
+
+    Просмотры копятся в Redis (HINCRBY в хэше на модель), уникальность зрителя -
+    ключ с TTL unique_ttl. В продакшене Redis обязателен: буфер должен быть общим
+    для всех процессов, иначе задача flush_view_counts из beat его не увидит; без
+    redis_url (разработка и тесты) - LocalViewStore в памяти процесса. Задача
+    периодически переносит накопленное в view_count пачками
+    UPDATE ... FROM (VALUES ...). Счетчики в базе отстают от реальных на период сброса.
+    """
+
+    key_prefix = 'views'
+
+    def __init__(self, redis_url=None, unique_ttl=0):
+        self.redis_url = redis_url
+        self.unique_ttl = unique_ttl
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url) if self.redis_url else LocalViewStore()
+        return self._client
+
+    @staticmethod
+    def get_model(instance_or_model):
+        """Модель, в таблице которой лежит view_count (для наследников - родитель)"""
+        return instance_or_model._meta.get_field('view_count').model
+
+    def buffer_key(self, model):
+        return f'{self.key_prefix}:{model._meta.label_lower}'
+
+    def record(self, instance, viewer=None):
+        """Учитываем просмотр; viewer - идентификатор зрителя для подсчета уникальных просмотров"""
+        model = self.get_model(instance)
+        return self.record_pk(model, getattr(instance, model._meta.pk.attname), viewer)
+
+    def record_pk(self, model, pk, viewer=None):
+        """Учитываем просмотр по первичному ключу, без загрузки объекта (ответ из кэша)"""
+        model = self.get_model(model)
+        key = self.buffer_key(model)
+        seen_key = None
+        if viewer and self.unique_ttl:
+            digest = hashlib.sha1(str(viewer).encode()).hexdigest()[:16]
+            seen_key = f'{key}:seen:{pk}:{digest}'
+
+        try:
+            if seen_key and not self.client.set(seen_key, 1, nx=True, ex=self.unique_ttl):
+                return False
+            self.client.hincrby(key, pk, 1)
+            return True
+        except redis.RedisError as exc:
+            # Просмотры не критичны: не роняем страницу объявления
+            logger.warning(f"Не удалось учесть просмотр {pk}: {exc}")
+            return False
+
+    def drain(self, model):
+        """Забираем накопленные просмотры модели: {pk: количество}"""
+        key = self.buffer_key(model)
+        flushing_key = f'{key}:flushing'
+        # Остаток от прерванного сброса обрабатываем первым, новые просмотры копятся в свежем хэше
+        if not self.client.exists(flushing_key):
+            try:
+                self.client.rename(key, flushing_key)
+            except redis.ResponseError:
+                return {}
+        counts = {pk.decode(): int(value) for pk, value in self.client.hgetall(flushing_key).items()}
+        return counts
+
+    def acknowledge(self, model):
+        self.client.delete(f'{self.buffer_key(model)}:flushing')
+
+    def flush(self, model, batch_size=1000):
+        """Переносим буфер в базу; возвращаем число обновленных объявлений"""
+        counts = self.drain(model)
+        items = list(counts.items())
+        table = connection.ops.quote_name(model._meta.db_table)
+        pk_column = connection.ops.quote_name(model._meta.pk.column)
+
+        with transaction.atomic():
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                values = ', '.join(['(%s, %s)'] * len(batch))
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'UPDATE {table} AS ad SET view_count = ad.view_count + v.delta '
+                        f'FROM (VALUES {values}) AS v(pk, delta) WHERE ad.{pk_column} = v.pk',
+                        [param for pk, delta in batch for param in (pk, delta)]
+                    )
+        self.acknowledge(model)
+        return len(items)
+
+
+view_counter = ViewCounter(
+    redis_url=settings.VIEW_COUNTER_REDIS_URL,
+    unique_ttl=getattr(settings, 'VIEW_COUNTER_UNIQUE_TTL', 0),
+)
+
+
+def get_viewer_id(request):
+    """Идентификатор зрителя: пользователь или IP"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    ip = forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR')
+    return f'ip:{ip}' if ip else None
@@ -0,0 +1,180 @@
+import copy
+
+from django.db import connection
+from django.db.models import BooleanField, Case, ExpressionWrapper, F, IntegerField, Q, Value, When
+from django.http import QueryDict
+from django_filters.utils import translate_validation
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .cache import reference_cache
+
+
+class Facet:
+    """
+    Счетчики объявлений по значениям поля.
+
+    params - параметры фильтра, относящиеся к этому фасету: при подсчете
+    фасета они не применяются, чтобы были видны все варианты выбора.
+    attribute - поле справочника для подписи значения (для внешних ключей).
+    """
+
+    def __init__(self, field, params=None, attribute=None):
+        self.field = field
+        self.params = tuple(params) if params is not None else ()
+        self.attribute = attribute
+
+    def bind(self, name, model):
+        """Копия фасета для поля name модели model"""
+        facet = copy.copy(self)
+        facet.params = self.params or (name,)
+        facet.related_model = None
+        if self.attribute:
+            facet.related_model = model._meta.get_field(self.field).related_model
+            reference_cache.register(facet.related_model)
+        return facet
+
+    def expression(self):
+        return F(self.field)
+
+    def represent(self, value, count):
+        item = {'value': value, 'count': count}
+        if self.related_model is not None:
+            obj = reference_cache.get(self.related_model, value)
+            item['label'] = str(getattr(obj, self.attribute)) if obj is not None else None
+        return item
+
+
+class RangeFacet(Facet):
+    """Счетчики по интервалам значений: bounds - границы интервалов по возрастанию"""
+
+    def __init__(self, field, bounds, params=None):
+        super().__init__(field, params)
+        self.bounds = tuple(bounds)
+
+    def expression(self):
+        return Case(
+            *(When(**{f'{self.field}__lt': bound}, then=Value(index)) for index, bound in enumerate(self.bounds)),
+            When(**{f'{self.field}__isnull': False}, then=Value(len(self.bounds))),
+            default=Value(None),
+            output_field=IntegerField(),
+        )
+
+    def represent(self, value, count):
+        return {
+            'value': value,
+            'min': self.bounds[value - 1] if value else None,
+            'max': self.bounds[value] if value < len(self.bounds) else None,
+            'count': count,
+        }
+
+
+def select_params(data, names):
+    params = QueryDict(mutable=True)
+    for name in names:
+        values = [value for value in data.getlist(name) if value != '']
+        if values:
+            params.setlist(name, values)
+    return params
+
+
+def count_facets(queryset, filterset_class, data, facets, request=None, prepare=None):
+    """
+    Все фасеты одним запросом с GROUPING SETS.
+
+    Строки отбираются фильтрами, не относящимися ни к одному фасету. Фильтр
+    каждого фасета превращается во флаг строки, и счетчик фасета считает
+    строки, у которых выполнены флаги всех остальных фасетов.
+    """
+    facet_params = {param for facet in facets.values() for param in facet.params}
+
+    def apply_filters(params, base):
+        filterset = filterset_class(data=params, queryset=base, request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return filterset.qs
+
+    rows = apply_filters(select_params(data, [key for key in data if key not in facet_params]), queryset)
+    if prepare is not None:
+        rows = prepare(rows)
+
+    names = list(facets)
+    flags = {}
+    for name in names:
+        params = select_params(data, facets[name].params)
+        if params:
+            condition = Q(pk__in=apply_filters(params, queryset).order_by().values('pk'))
+            flags[name] = ExpressionWrapper(condition, output_field=BooleanField())
+
+    rows = rows.order_by().values(
+        **{f'facet_{index}': facets[name].expression() for index, name in enumerate(names)},
+        **{f'match_{names.index(name)}': flag for name, flag in flags.items()},
+    )
+    inner_sql, params = rows.query.sql_with_params()
+
+    def matches(excluded=None):
+        conditions = [f'match_{names.index(name)}' for name in flags if name != excluded]
+        return f"COUNT(*) FILTER (WHERE {' AND '.join(conditions)})" if conditions else 'COUNT(*)'
+
+    columns = [f'facet_{index}' for index in range(len(names))]
+    sql = (
+        f"SELECT {', '.join(columns)}, GROUPING({', '.join(columns)}), {matches()}, "
+        f"{', '.join(f'{matches(name)}' for name in names)} "
+        f"FROM ({inner_sql}) AS facet_rows "
+        f"GROUP BY GROUPING SETS ({', '.join(f'({column})' for column in columns)}, ())"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        result_rows = cursor.fetchall()
+
+    full_mask = (1 << len(names)) - 1
+    total = 0
+    result = {name: [] for name in names}
+    for row in result_rows:
+        mask = row[len(names)]
+        if mask == full_mask:
+            total = row[len(names) + 1]
+            continue
+        # В GROUPING первый столбец - старший бит; 0 у единственного сгруппированного столбца
+        index = len(names) - (full_mask ^ mask).bit_length()
+        count = row[len(names) + 2 + index]
+        value = row[index]
+        if count and value is not None:
+            result[names[index]].append(facets[names[index]].represent(value, count))
+
+    for name in names:
+        result[name].sort(key=lambda item: (-item['count'], str(item['value'])))
+    return {'total': total, 'facets': result}
+
+
+class FacetsMixin:
+    """
+    Действие /facets: количество объявлений по вариантам фильтров для текущей
+    выборки. facet_fields = {'имя': Facet(...)}; результат кэшируется через
+    CachedResponseMixin по поколению категории и параметрам запроса.
+    """
+    facet_fields = {}
+
+    def get_facet_fields(self):
+        model = self.queryset.model
+        return {name: facet.bind(name, model) for name, facet in self.facet_fields.items()}
+
+    def prepare_facet_queryset(self, queryset):
+        """Фильтры остальных бэкендов (кроме FilterSet), например поиск"""
+        for backend in self.filter_backends:
+            if getattr(backend, 'get_filterset_class', None) is None:
+                queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(detail=False, methods=['get'])
+    def facets(self, request, *args, **kwargs):
+        def render():
+            return Response(count_facets(
+                self.queryset.all(), self.filterset_class, request.query_params, self.get_facet_fields(),
+                request=request, prepare=self.prepare_facet_queryset,
+            ))
+
+        return self.cached_response(request, 'facets', render, shared=True)
@@ -0,0 +1,143 @@
+import django_filters
+from django import forms
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, Point, Polygon
+from django.contrib.gis.measure import D
+from django.core.exceptions import ValidationError
+from django_filters.fields import ModelChoiceField, ModelMultipleChoiceField
+
+from .cache import reference_cache
+
+
+class CachedModelChoiceField(ModelChoiceField):
+    """Проверка выбранного значения по справочнику в памяти вместо запроса к базе"""
+
+    def to_python(self, value):
+        if self.null_label is not None and value == self.null_value:
+            return value
+        if value in self.empty_values:
+            return None
+        model = self.queryset.model
+        if isinstance(value, model):
+            return value
+        obj = reference_cache.lookup(model, self.to_field_name or 'pk', value)
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value}
+            )
+        return obj
+
+
+class CachedModelMultipleChoiceField(ModelMultipleChoiceField):
+    """Множественный выбор по справочнику в памяти"""
+
+    def _check_values(self, value):
+        try:
+            value = frozenset(value)
+        except TypeError:
+            raise ValidationError(self.error_messages['invalid_list'], code='invalid_list')
+
+        null = self.null_label is not None and self.null_value in value
+        model = self.queryset.model
+        result = []
+        for item in value:
+            if null and item == self.null_value:
+                continue
+            obj = reference_cache.lookup(model, self.to_field_name or 'pk', item)
+            if obj is None:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'], code='invalid_choice', params={'value': item}
+                )
+            result.append(obj)
+        return result + ([self.null_value] if null else [])
+
+
+class CachedModelChoiceFilter(django_filters.ModelChoiceFilter):
+    field_class = CachedModelChoiceField
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        reference_cache.register(self.queryset.model)
+
+
+class CachedModelMultipleChoiceFilter(django_filters.ModelMultipleChoiceFilter):
+    field_class = CachedModelMultipleChoiceField
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        reference_cache.register(self.queryset.model)
+
+
+def parse_numbers(value, count):
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count:
+        raise ValidationError(f'Ожидается {count} числа через запятую.', code='invalid')
+    return numbers
+
+
+class DistanceField(forms.CharField):
+    """"lat,lon,km" -> (Point, D)"""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        lat, lon, radius = parse_numbers(value, 3)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or not 0 < radius <= 500:
+            raise ValidationError('Некорректная точка или радиус (до 500 км).', code='invalid')
+        return Point(lon, lat, srid=4326), D(km=radius)
+
+
+class BBoxField(forms.CharField):
+    """"min_lon,min_lat,max_lon,max_lat" -> Polygon"""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        min_lon, min_lat, max_lon, max_lat = parse_numbers(value, 4)
+        if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+            raise ValidationError('Некорректные границы области.', code='invalid')
+        return Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+
+
+class PolygonField(forms.CharField):
+    """Полигон в GeoJSON или WKT (координаты в WGS84)"""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        try:
+            geometry = GEOSGeometry(value, srid=4326)
+        except (GEOSException, ValueError):
+            raise ValidationError('Некорректный полигон.', code='invalid')
+        if geometry.geom_type not in ('Polygon', 'MultiPolygon') or not geometry.valid:
+            raise ValidationError('Ожидается корректный Polygon или MultiPolygon.', code='invalid')
+        return geometry
+
+
+class DistanceFilter(django_filters.Filter):
+    field_class = DistanceField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('lookup_expr', 'dwithin')
+        super().__init__(*args, **kwargs)
+
+
+class BBoxFilter(django_filters.Filter):
+    field_class = BBoxField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('lookup_expr', 'intersects')
+        super().__init__(*args, **kwargs)
+
+
+class PolygonFilter(django_filters.Filter):
+    field_class = PolygonField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('lookup_expr', 'intersects')
+        super().__init__(*args, **kwargs)
@@ -0,0 +1,269 @@
+import inspect
+from collections import namedtuple
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.query import ValuesListIterable
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+
+from .metrics import measure_serializer
+
+# Поля, у которых to_representation - просто приведение типа
+FAST_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.URLField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+}
+# Ключи строки, нужные пагинации (курсор по created_at и pk)
+PAGINATION_KEYS = ('pk', 'created_at')
+
+
+class NotCompilable(Exception):
+    """Поле сериализатора нельзя вычислить по строке .values()"""
+
+
+class RowIterable(ValuesListIterable):
+    """Строки .values_list() как именованные кортежи с методами модели"""
+    row_class = None
+
+    def __iter__(self):
+        make = self.row_class._make
+        for values in super().__iter__():
+            yield make(values)
+
+
+def resolve_key(model, attrs):
+    """Ключ .values() для пути source ('city.city' -> 'city__city'); None - атрибута нет у модели"""
+    keys = []
+    for position, attr in enumerate(attrs):
+        last = position == len(attrs) - 1
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            if position == 0 and not hasattr(model, attr):
+                return None
+            if position == 0 and last:
+                # Метод или свойство модели
+                return attr
+            raise NotCompilable(f'{model.__name__}.{attr}')
+        if field.many_to_many or field.one_to_many or field.auto_created and not field.concrete:
+            raise NotCompilable(f'{model.__name__}.{attr}: связь "ко многим"')
+        if field.is_relation and attr == field.attname:
+            # Внешний ключ по имени столбца (source='city_id')
+            keys.append(attr)
+            if not last:
+                raise NotCompilable(f'{model.__name__}.{attr}')
+            break
+        keys.append(field.name)
+        if field.is_relation:
+            if last:
+                raise NotCompilable(f'{model.__name__}.{attr}: объект связи')
+            model = field.related_model
+        elif not last:
+            raise NotCompilable(f'{model.__name__}.{attr}')
+    return '__'.join(keys)
+
+
+class FlatSerializer:
+    """
+    Сериализатор списка, скомпилированный в плоскую функцию над строками .values_list().
+
+    Каждое поле заранее сводится к ключу строки и преобразованию значения, так
+    что на строку не тратится разбор source, get_attribute и проверки DRF.
+    Поддерживаются поля моделей (в том числе через связи: 'city.city'), методы и
+    свойства модели, SerializerMethodField, ModelField и вложенные списки по
+    обратному внешнему ключу (одним дополнительным запросом на страницу).
+    Атрибуты, которые читают методы, перечисляются в Meta.flat_values
+    сериализатора. Вывод совпадает с обычным сериализатором (проверка -
+    test_flat_serializer_matches_drf, на рабочей базе - manage.py check_flat_serializers).
+    """
+
+    def __init__(self, serializer_class, model):
+        self.serializer_class = serializer_class
+        self.model = model
+        self.plan = []
+        self.nested = {}
+        keys = []
+        row_attributes = {}
+
+        field_names = {f.name for f in model._meta.get_fields()} | {f.attname for f in model._meta.concrete_fields}
+        serializer = serializer_class()
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                self.plan.append((name, 'method', field.method_name))
+            elif isinstance(field, serializers.ListSerializer):
+                self.nested[name] = self.compile_nested(field)
+                self.plan.append((name, 'nested', None))
+            elif isinstance(field, serializers.BaseSerializer):
+                raise NotCompilable(f'{serializer_class.__name__}.{name}: вложенный сериализатор')
+            elif isinstance(field, serializers.ModelField):
+                keys.append(field.model_field.attname)
+                self.plan.append((name, 'row', None))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                keys.append(model._meta.get_field(field.source).attname)
+                self.plan.append((name, 'pk', keys[-1]))
+            elif isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField)) or field.source == '*':
+                raise NotCompilable(f'{serializer_class.__name__}.{name}')
+            else:
+                key = resolve_key(model, field.source_attrs)
+                if key is None:
+                    self.plan.append(self.missing_attribute(name, field))
+                elif key not in field_names and '__' not in key:
+                    # Метод или свойство модели: переносим в класс строки
+                    attribute = inspect.getattr_static(model, key)
+                    if isinstance(attribute, cached_property):
+                        attribute = property(attribute.func)
+                    elif not inspect.isfunction(attribute) and not isinstance(attribute, property):
+                        raise NotCompilable(f'{model.__name__}.{key}')
+                    row_attributes[key] = attribute
+                    self.plan.append((name, 'call' if inspect.isfunction(attribute) else 'value', key))
+                else:
+                    keys.append(key)
+                    self.plan.append((name, 'value', key))
+
+        for key in getattr(getattr(serializer_class, 'Meta', None), 'flat_values', ()):
+            if key.split('__')[0] in field_names:
+                keys.append(key)
+        keys += [key for key in PAGINATION_KEYS if key == 'pk' or key in field_names]
+        self.keys = list(dict.fromkeys(keys))
+        self.row_class = type(
+            f'{model.__name__}Row', (namedtuple(f'{model.__name__}Values', self.keys),),
+            {'__slots__': (), **row_attributes}
+        )
+
+    @staticmethod
+    def missing_attribute(name, field):
+        """Атрибута нет у модели: как в Field.get_attribute при AttributeError"""
+        if field.default is not empty:
+            return name, 'const', field.get_default()
+        if field.allow_null:
+            return name, 'const', None
+        if not field.required:
+            return name, 'skip', None
+        raise NotCompilable(f'{name}: нет атрибута')
+
+    def compile_nested(self, field):
+        if len(field.source_attrs) != 1:
+            raise NotCompilable(field.source)
+        try:
+            relation = self.model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            raise NotCompilable(field.source)
+        if not relation.one_to_many:
+            raise NotCompilable(f'{field.source}: поддерживается только обратный внешний ключ')
+        return relation.field.attname, FlatSerializer(type(field.child), relation.related_model)
+
+    def values(self, queryset):
+        """Queryset строк для этого сериализатора (фильтры и сортировка сохраняются)"""
+        queryset = queryset.select_related(None).prefetch_related(None).values_list(*self.keys)
+        queryset._iterable_class = type('RowIterable', (RowIterable,), {'row_class': self.row_class})
+        return queryset
+
+    def bind(self, context=None):
+        return BoundFlatSerializer(self, self.serializer_class(context=context or {}))
+
+
+class BoundFlatSerializer:
+    """Скомпилированный сериализатор с контекстом запроса"""
+
+    def __init__(self, flat, serializer):
+        self.flat = flat
+        self.wrap = getattr(serializer, 'wrap_representation', None)
+        self.nested = {
+            name: (fk, nested.bind(serializer.context)) for name, (fk, nested) in flat.nested.items()
+        }
+        fields = serializer.fields
+        self.steps = []
+        for name, kind, argument in flat.plan:
+            field = fields[name]
+            if kind == 'method':
+                self.steps.append((name, kind, None, getattr(serializer, argument)))
+            elif kind == 'row':
+                self.steps.append((name, kind, None, field.to_representation))
+            elif kind in ('const', 'skip', 'nested'):
+                self.steps.append((name, kind, argument, None))
+            elif kind == 'pk':
+                self.steps.append((name, 'value', attrgetter(argument), None))
+            else:
+                converter = FAST_CONVERTERS.get(type(field), field.to_representation)
+                getter = attrgetter(argument)
+                if kind == 'call':
+                    method_getter = getter
+                    getter = lambda row, method_getter=method_getter: method_getter(row)()
+                self.steps.append((name, 'value', getter, converter))
+
+    def serialize(self, rows):
+        with measure_serializer():
+            return self.serialize_rows(rows)
+
+    def serialize_rows(self, rows):
+        children = {}
+        for name, (fk, nested) in self.nested.items():
+            children[name] = nested.fetch_children(fk, [row.pk for row in rows])
+
+        result = []
+        for row in rows:
+            data = {}
+            for name, kind, getter, converter in self.steps:
+                if kind == 'value':
+                    value = getter(row)
+                    data[name] = None if value is None else (converter(value) if converter else value)
+                elif kind == 'method' or kind == 'row':
+                    data[name] = converter(row)
+                elif kind == 'const':
+                    data[name] = getter
+                elif kind == 'nested':
+                    data[name] = children[name].get(row.pk, [])
+            result.append(self.wrap(row, data) if self.wrap else data)
+        return result
+
+    def fetch_children(self, fk, parent_ids):
+        """Вложенный список: строки связанной модели для страницы родителей, {pk родителя: [...]}"""
+        grouped = {}
+        if not parent_ids:
+            return grouped
+        # Порядок - Meta.ordering модели, как у prefetch_related
+        rows = list(self.flat.model._default_manager.filter(**{f'{fk}__in': parent_ids}).values_list(
+            fk, *self.flat.keys
+        ))
+        make = self.flat.row_class._make
+        parents = [values[0] for values in rows]
+        for parent_id, data in zip(parents, self.serialize_rows([make(values[1:]) for values in rows])):
+            grouped.setdefault(parent_id, []).append(data)
+        return grouped
+
+
+_compiled = {}
+
+
+def get_flat_serializer(serializer_class, model):
+    """Скомпилированный сериализатор или None, если сериализатор не компилируется"""
+    key = (serializer_class, model)
+    if key not in _compiled:
+        try:
+            _compiled[key] = FlatSerializer(serializer_class, model)
+        except NotCompilable:
+            _compiled[key] = None
+    return _compiled[key]
+
+
+class FlatListMixin:
+    """list через скомпилированный сериализатор (FlatSerializer), если сериализатор списка компилируется"""
+
+    def list(self, request, *args, **kwargs):
+        flat = get_flat_serializer(self.get_serializer_class(), self.queryset.model)
+        if flat is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = flat.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        data = flat.bind(self.get_serializer_context()).serialize(list(queryset if page is None else page))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
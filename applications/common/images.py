@@ -0,0 +1,166 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import billiard
+import requests
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+# Размеры фотографий для клиентов: превью в галерее, карточка в списке, полный экран
+IMAGE_VARIANTS = {
+    'thumbnail': {'width': 320, 'height': 240, 'crop': 'fill', 'gravity': 'auto'},
+    'card': {'width': 640, 'crop': 'limit'},
+    'full': {'width': 1920, 'crop': 'limit'},
+}
+
+
+def image_srcset(variants):
+    """Атрибут srcset: 'url 320w, url 640w, url 1920w'"""
+    return ', '.join(
+        f"{variants[name]} {options['width']}w" for name, options in IMAGE_VARIANTS.items() if name in variants
+    )
+
+
+def build_image_variants(image):
+    """
+    URL вариантов фотографии из Cloudinary и srcset по ним.
+
+    Трансформации задаются в самом URL, запросов к API нет. Результат хранится
+    в поле variants фотографии, и API отдает его как есть.
+    """
+    if not isinstance(image, CloudinaryResource) or not image.public_id:
+        return {}
+    variants = {
+        name: image.build_url(quality='auto', fetch_format='auto', secure=True, **options)
+        for name, options in IMAGE_VARIANTS.items()
+    }
+    variants['srcset'] = image_srcset(variants)
+    return variants
+
+
+def get_image_storage():
+    """Хранилище оптимизированных фото (settings.IMAGE_PIPELINE_STORAGE), в тестах - FileSystemStorage"""
+    return import_string(settings.IMAGE_PIPELINE_STORAGE)()
+
+
+def read_source(source):
+    """Исходный файл по URL или локальному пути, не больше IMAGE_PIPELINE_MAX_SOURCE_BYTES"""
+    limit = settings.IMAGE_PIPELINE_MAX_SOURCE_BYTES
+    if not source.startswith(('http://', 'https://')):
+        with open(source, 'rb') as source_file:
+            content = source_file.read(limit + 1)
+    else:
+        with requests.get(source, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            content = b''
+            for chunk in response.iter_content(256 * 1024):
+                content += chunk
+                if len(content) > limit:
+                    break
+    if len(content) > limit:
+        raise ValueError(f"Файл больше {limit} байт")
+    return content
+
+
+def resize(image, options):
+    """Размер как у трансформаций Cloudinary: fill - обрезка по центру, limit - только уменьшение"""
+    width = options['width']
+    if options['crop'] == 'fill':
+        return ImageOps.fit(image, (width, options['height']), Image.LANCZOS)
+    if image.width <= width:
+        return image
+    return image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+
+def apply_watermark(image, watermark):
+    """Водяной знак в правом нижнем углу шириной в пятую часть фото"""
+    width = max(1, image.width // 5)
+    mark = watermark.resize((width, max(1, round(watermark.height * width / watermark.width))), Image.LANCZOS)
+    margin = max(1, image.width // 50)
+    image = image.convert('RGBA')
+    image.alpha_composite(mark, (image.width - mark.width - margin, image.height - mark.height - margin))
+    return image
+
+
+# Состояние процесса пула: хранилище и водяной знак создаются один раз на процесс
+worker_context = {}
+
+
+def init_pipeline_worker():
+    worker_context['storage'] = get_image_storage()
+    worker_context['watermark'] = None
+    if settings.IMAGE_WATERMARK_PATH:
+        with Image.open(settings.IMAGE_WATERMARK_PATH) as watermark:
+            worker_context['watermark'] = watermark.convert('RGBA')
+
+
+def process_image_file(job):
+    """
+    Оптимизация одного фото в процессе пула: ориентация по EXIF, размеры
+    IMAGE_VARIANTS, WebP без метаданных, водяной знак. Файлы пишутся через
+    API хранилищ Django под именем '<prefix>_<размер>.webp'.
+    """
+    if 'storage' not in worker_context:
+        init_pipeline_worker()
+    storage = worker_context['storage']
+    try:
+        content = read_source(job['source'])
+        with Image.open(BytesIO(content)) as source:
+            # JPEG декодируется сразу в уменьшенном масштабе, если фото намного больше нужного
+            largest = max(options['width'] for options in IMAGE_VARIANTS.values())
+            scale = largest / min(source.size)
+            if scale < 1:
+                source.draft('RGB', (math.ceil(source.width * scale), math.ceil(source.height * scale)))
+            icc_profile = source.info.get('icc_profile')
+            # exif_transpose поворачивает пиксели; EXIF в WebP не передаем
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        urls, sizes = {}, {}
+        # От большего размера к меньшему: каждый следующий считается из предыдущего
+        for name, options in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]['width']):
+            image = resize(image, options)
+            variant = image
+            if worker_context['watermark'] is not None and name in settings.IMAGE_WATERMARK_VARIANTS:
+                variant = apply_watermark(image, worker_context['watermark'])
+            buffer = BytesIO()
+            variant.save(buffer, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY, method=4, icc_profile=icc_profile)
+            file_name = f"{job['prefix']}_{name}.webp"
+            if storage.exists(file_name):
+                storage.delete(file_name)
+            file_name = storage.save(file_name, ContentFile(buffer.getvalue()))
+            urls[name] = storage.url(file_name)
+            sizes[name] = buffer.tell()
+    except Exception as exc:
+        return {'id': job['id'], 'error': f"{type(exc).__name__}: {exc}"}
+
+    urls['srcset'] = image_srcset(urls)
+    return {'id': job['id'], 'error': None, 'original_size': len(content), 'sizes': sizes, 'variants': urls}
+
+
+def process_image_files(jobs):
+    """
+    Оптимизация фото в пуле процессов. Задания - словари с id, source (URL или
+    путь) и prefix (имя файла в хранилище без размера).
+
+    Процессы создаются через billiard: процессы воркера Celery - демоны, и
+    multiprocessing в них не запускает дочерние процессы. billiard.pool.Pool
+    не подходит: при завершении его процессы до 30 секунд ждут подтверждений.
+    """
+    workers = min(settings.IMAGE_PIPELINE_WORKERS, len(jobs))
+    if workers <= 1:
+        return [process_image_file(job) for job in jobs]
+    # Дочерние процессы не должны наследовать открытые соединения с базой (внутри
+    # транзакции закрыть нельзя; процессы пула базу не используют и выходят через os._exit)
+    if not any(connection.in_atomic_block for connection in connections.all()):
+        connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=billiard.get_context('fork'), initializer=init_pipeline_worker
+    ) as executor:
+        return list(executor.map(process_image_file, jobs))
@@ -0,0 +1,220 @@
+import json
+import re
+import statistics
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from applications.real_estate.models import RealEstateAd
+from applications.real_estate_advertisement import views as real_estate_views
+from applications.real_estate_advertisement.models import ListingIndex
+from applications.real_estate_advertisement.signals import AD_MODELS
+from applications.real_estate_advertisement.tasks import deactivate_expired_ads
+from applications.vehicle import models as vehicle_models
+from applications.vehicle_advertisement import views as vehicle_views
+
+# Бюджеты: (запросов, медиана в мс). Запросы - жесткий предел, время - на эталонной машине
+LIST_BUDGET = (3, 150)
+DETAIL_BUDGET = (9, 150)
+VEHICLE_DETAIL_BUDGET = (10, 150)
+CACHED_BUDGET = (1, 20)
+
+MAIN_FEED_SCENARIOS = (
+    ('без фильтров', {}, (3, 150)),
+    ('глубокая страница', {'page': 50}, (3, 200)),
+    ('курсор', {'pagination': 'cursor'}, (2, 100)),
+    ('тип и цена', {'property_type': 'apartments', 'min_price': 3_000_000, 'max_price': 6_000_000}, (3, 150)),
+    ('сортировка по цене', {'order_by': 'price'}, (3, 200)),
+    ('поиск', {'search': 'Бишкек'}, (3, 300)),
+    ('поиск с фильтрами', {'search': 'квартира', 'property_type': 'apartments', 'min_area': 40}, (3, 300)),
+)
+
+REAL_ESTATE_VIEWSETS = (
+    real_estate_views.ApartmentAdViewSet, real_estate_views.HouseAdViewSet,
+    real_estate_views.CommercialAdViewSet, real_estate_views.RoomAdViewSet, real_estate_views.DachaAdViewSet,
+    real_estate_views.PlotAdViewSet, real_estate_views.ParkingAdViewSet,
+)
+VEHICLE_VIEWSETS = (
+    vehicle_views.PassengerCarViewSet, vehicle_views.CommercialCarViewSet,
+    vehicle_views.SpecialCarViewSet, vehicle_views.MotoViewSet,
+)
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def repeated_queries(captured_queries):
+    """Сколько раз повторился самый частый запрос (без учета значений) - признак N+1"""
+    shapes = Counter(SQL_LITERALS.sub('?', query['sql']) for query in captured_queries)
+    return max(shapes.values(), default=0)
+
+
+def uncached(viewset):
+    """
+    Viewset без кэша ответов: фасеты кэшируются и для авторизованных (shared),
+    и без этого повторы меряли бы чтение из кэша, а не запрос с GROUPING SETS
+    """
+    return type(viewset.__name__, (viewset,), {'cache_group': None})
+
+
+class Scenario:
+    def __init__(self, group, name, run, budget, params=None):
+        self.group = group
+        self.name = name
+        self.run = run
+        self.max_queries, self.max_ms = budget
+        self.params = params or {}
+
+
+class Command(BaseCommand):
+    help = ('Замеряет горячие пути API на текущей базе (лента, списки и карточки объявлений, '
+            'снятие просроченных, сохранение) и проверяет бюджеты запросов и времени')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--group', action='append', help='Только указанные группы сценариев')
+        parser.add_argument('--report', help='Путь к JSON-отчету')
+        parser.add_argument('--time-scale', type=float, default=1.0,
+                            help='Множитель бюджетов времени для машины медленнее эталонной')
+        parser.add_argument('--no-time-check', action='store_true', help='Проверять только число запросов')
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        # Сохраненный пользователь не нужен: авторизованный запрос обходит кэш ответов и меряет базу
+        self.user = get_user_model()(email='benchmark@example.com')
+
+        scenarios = [
+            scenario for scenario in self.get_scenarios()
+            if not options['group'] or scenario.group in options['group']
+        ]
+        results = [self.measure(scenario, options) for scenario in scenarios]
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'time_scale': options['time_scale'],
+            'dataset': {
+                'real_estate_ads': RealEstateAd.objects.count(),
+                'listing_index': ListingIndex.objects.count(),
+                'vehicle_ads': vehicle_models.VehicleAd.objects.count(),
+            },
+            'scenarios': results,
+        }
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчет: {options['report']}")
+
+        failures = [f"{result['group']}: {result['name']}" for result in results if result['passed'] is False]
+        if failures:
+            raise CommandError(f"Превышены бюджеты: {'; '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Все сценарии укладываются в бюджеты.'))
+
+    def measure(self, scenario, options):
+        timings, queries, sql_ms, repeated = [], 0, 0.0, 0
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                skipped = scenario.run() is False
+                timings.append((time.perf_counter() - started) * 1000)
+            if skipped:
+                self.stdout.write(f"{scenario.group}: {scenario.name}: нет данных, пропущено")
+                return {'group': scenario.group, 'name': scenario.name, 'params': scenario.params, 'passed': None}
+            queries = len(context.captured_queries)
+            sql_ms = sum(float(query['time']) for query in context.captured_queries) * 1000
+            repeated = repeated_queries(context.captured_queries)
+
+        median_ms = statistics.median(timings)
+        max_ms = scenario.max_ms * options['time_scale']
+        passed = queries <= scenario.max_queries and (options['no_time_check'] or median_ms <= max_ms)
+        self.stdout.write(
+            f"{'OK ' if passed else 'FAIL'} {scenario.group}: {scenario.name}: "
+            f"запросов={queries}/{scenario.max_queries} повторов={repeated} sql={sql_ms:.1f}ms "
+            f"median={median_ms:.1f}/{max_ms:.0f}ms max={max(timings):.1f}ms"
+        )
+        return {
+            'group': scenario.group,
+            'name': scenario.name,
+            'params': scenario.params,
+            'queries': queries,
+            'max_queries': scenario.max_queries,
+            'max_repeated_query': repeated,
+            'sql_ms': round(sql_ms, 2),
+            'median_ms': round(median_ms, 2),
+            'p95_ms': round(statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0], 2),
+            'max_ms': round(max(timings), 2),
+            'time_budget_ms': max_ms,
+            'passed': passed,
+        }
+
+    def request_view(self, viewset, action, params=None, authenticated=True, **kwargs):
+        """Вызов действия viewset'а; False - если объект для карточки не найден"""
+        if kwargs and any(value is None for value in kwargs.values()):
+            return False
+        request = self.factory.get('/', params or {})
+        if authenticated:
+            force_authenticate(request, user=self.user)
+        response = viewset.as_view({'get': action})(request, **kwargs)
+        response.render()
+        if response.status_code != 200:
+            raise CommandError(f"{viewset.__name__}.{action}: ответ {response.status_code}")
+
+    def get_scenarios(self):
+        scenarios = []
+        main = real_estate_views.MainPageViewSet
+        for name, params, budget in MAIN_FEED_SCENARIOS:
+            scenarios.append(Scenario(
+                'лента', name, lambda params=params: self.request_view(main, 'list', params), budget, params
+            ))
+        # Повторный анонимный запрос отдается из кэша ответов
+        scenarios.append(Scenario(
+            'лента', 'из кэша', lambda: self.request_view(main, 'list', authenticated=False), CACHED_BUDGET
+        ))
+
+        for group, viewsets, detail_budget in (
+            ('недвижимость', REAL_ESTATE_VIEWSETS, DETAIL_BUDGET),
+            ('транспорт', VEHICLE_VIEWSETS, VEHICLE_DETAIL_BUDGET),
+        ):
+            for viewset in viewsets:
+                model = viewset.queryset.model
+                label = model._meta.verbose_name_plural
+                lookup = viewset.lookup_field
+                pk = viewset.queryset.order_by('-pk').values_list('pk', flat=True).first()
+                scenarios.extend([
+                    Scenario(group, f'{label}: список', lambda v=viewset: self.request_view(v, 'list'), LIST_BUDGET),
+                    Scenario(group, f'{label}: фасеты',
+                             lambda v=uncached(viewset): self.request_view(v, 'facets'), LIST_BUDGET),
+                    Scenario(group, f'{label}: карточка',
+                             lambda v=viewset, pk=pk: self.request_view(v, 'retrieve', **{lookup: pk}),
+                             detail_budget),
+                ])
+
+        scenarios.append(Scenario('задачи', 'снятие просроченных', self.run_deactivate_expired_ads, (40, 2000)))
+        for model in AD_MODELS:
+            scenarios.append(Scenario(
+                'сохранение', model._meta.verbose_name_plural, lambda model=model: self.run_ad_save(model), (6, 100)
+            ))
+        return scenarios
+
+    @staticmethod
+    def run_deactivate_expired_ads():
+        with transaction.atomic():
+            deactivate_expired_ads()
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def run_ad_save(model):
+        # Бюджет включает чтение объявления: один SELECT
+        ad = model.objects.order_by('pk').first()
+        if ad is None:
+            return False
+        with transaction.atomic():
+            ad.description = f"{ad.description or ''} "
+            ad.save()
+            transaction.set_rollback(True)
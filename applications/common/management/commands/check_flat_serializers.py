@@ -0,0 +1,100 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from applications.common.flat_serializers import get_flat_serializer
+from applications.real_estate_advertisement import views as real_estate_views
+from applications.vehicle_advertisement import views as vehicle_views
+
+VIEWSETS = (
+    real_estate_views.MainPageViewSet,
+    real_estate_views.ApartmentAdViewSet, real_estate_views.HouseAdViewSet,
+    real_estate_views.CommercialAdViewSet, real_estate_views.RoomAdViewSet, real_estate_views.DachaAdViewSet,
+    real_estate_views.PlotAdViewSet, real_estate_views.ParkingAdViewSet,
+    vehicle_views.PassengerCarViewSet, vehicle_views.CommercialCarViewSet,
+    vehicle_views.SpecialCarViewSet, vehicle_views.MotoViewSet,
+)
+
+
+def first_difference(expected, actual):
+    for name in dict.fromkeys([*expected, *actual]):
+        if name not in expected or name not in actual or expected[name] != actual[name]:
+            return name, expected.get(name), actual.get(name)
+    return 'порядок полей', list(expected), list(actual)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает вывод скомпилированных сериализаторов списков (FlatSerializer) с DRF '
+            'на объявлениях из базы; с --benchmark - замер строк в секунду')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Объявлений на список')
+        parser.add_argument('--benchmark', action='store_true')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        request = Request(APIRequestFactory().get('/', HTTP_HOST=host))
+        failures = []
+
+        for viewset in VIEWSETS:
+            view = viewset(request=request, format_kwarg=None, kwargs={}, action='list')
+            serializer_class = view.get_serializer_class()
+            label = f"{viewset.__name__} ({serializer_class.__name__})"
+            flat = get_flat_serializer(serializer_class, viewset.queryset.model)
+            if flat is None:
+                self.stdout.write(f"{label}: не компилируется, список отдает DRF")
+                continue
+
+            context = view.get_serializer_context()
+            ordered = view.get_queryset().order_by('-created_at', '-pk')
+            queryset, flat_queryset = ordered[:options['limit']], flat.values(ordered)[:options['limit']]
+            instances = list(queryset)
+            rows = list(flat_queryset)
+            expected = serializer_class(instances, many=True, context=context).data
+            actual = flat.bind(context).serialize(rows)
+
+            mismatches = [
+                (instance.pk, *first_difference(left, right))
+                for instance, left, right in zip(instances, expected, actual)
+                if left != right or list(left) != list(right)
+            ]
+            if len(expected) != len(actual):
+                mismatches.append(('-', 'число строк', len(expected), len(actual)))
+            if mismatches:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"{label}: расхождений {len(mismatches)} из {len(instances)}"))
+                for pk, field, left, right in mismatches[:5]:
+                    self.stdout.write(f"  {pk}: {field}: DRF={left!r} flat={right!r}")
+            else:
+                self.stdout.write(f"{label}: совпадает на {len(instances)} объявлениях")
+
+            if options['benchmark'] and instances:
+                self.benchmark(label, options['repeat'], len(instances), [
+                    ('DRF', lambda: serializer_class(instances, many=True, context=context).data),
+                    ('flat', lambda: flat.bind(context).serialize(rows)),
+                    ('DRF + запрос', lambda: serializer_class(list(queryset.all()), many=True, context=context).data),
+                    ('flat + запрос', lambda: flat.bind(context).serialize(list(flat_queryset.all()))),
+                ])
+
+        if failures:
+            raise CommandError(f"Вывод отличается от DRF: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Скомпилированные сериализаторы совпадают с DRF.'))
+
+    def benchmark(self, label, repeat, count, runs):
+        results = {}
+        for name, run in runs:
+            best = min(self.measure(run) for _ in range(repeat))
+            results[name] = count / best
+        self.stdout.write(f"  {label}: " + ', '.join(f"{name} {rate:,.0f} строк/с" for name, rate in results.items()))
+        self.stdout.write(f"  ускорение сериализации x{results['flat'] / results['DRF']:.1f}, "
+                          f"с запросом x{results['flat + запрос'] / results['DRF + запрос']:.1f}")
+
+    @staticmethod
+    def measure(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from applications.common.profiling import PROFILE_HEADER, make_profiling_token
+
+
+class Command(BaseCommand):
+    help = 'Выдает подписанный заголовок для профилирования запросов (результат - в админке, "Профили запросов")'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{PROFILE_HEADER}: {make_profiling_token()}')
+        self.stdout.write(f'Действует {settings.PROFILING_TOKEN_MAX_AGE} с')
@@ -0,0 +1,602 @@
+import math
+import multiprocessing
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import shortuuid
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from applications.common.cache import reference_cache
+from applications.common.images import build_image_variants
+from applications.common.models import City, Currency, District, ExchangeRate, Region, Subscription
+from applications.real_estate import models as real_estate_models
+from applications.real_estate.models import RealEstateAd, RealEstateAdImage
+from applications.real_estate_advertisement.models import ListingIndex
+from applications.real_estate_advertisement.signals import AD_MODELS
+from applications.vehicle import models as vehicle_models
+from applications.vehicle.models import VehicleAd, VehicleImage
+from applications.vehicle_advertisement.models import CommercialCar, Moto, PassengerCar, SpecialCar
+
+# Курс на случай пустой таблицы курсов
+DEFAULT_RATE = Decimal('87.50')
+
+# Регион, города: (название, доля объявлений, широта, долгота, коэффициент цены, районы)
+GEOGRAPHY = (
+    ('Чуйская область', (
+        ('Бишкек', 55, 42.8746, 74.5698, 1.0,
+         ('Октябрьский район', 'Первомайский район', 'Свердловский район', 'Ленинский район')),
+        ('Токмок', 3, 42.8421, 75.3015, 0.35, ()),
+        ('Кант', 3, 42.8912, 74.8508, 0.4, ()),
+    )),
+    ('Ошская область', (
+        ('Ош', 15, 40.5283, 72.7985, 0.6, ('Центр Оша', 'Черемушки', 'Южный')),
+        ('Узген', 2, 40.7699, 73.3007, 0.3, ()),
+    )),
+    ('Иссык-Кульская область', (
+        ('Каракол', 5, 42.4907, 78.3936, 0.45, ()),
+        ('Чолпон-Ата', 6, 42.6496, 77.0828, 0.7, ()),
+        ('Балыкчы', 2, 42.4606, 76.1870, 0.3, ()),
+    )),
+    ('Джалал-Абадская область', (('Джалал-Абад', 5, 40.9333, 73.0000, 0.4, ()),)),
+    ('Нарынская область', (('Нарын', 1, 41.4287, 75.9911, 0.25, ()),)),
+    ('Таласская область', (('Талас', 1, 42.5228, 72.2427, 0.25, ()),)),
+    ('Баткенская область', (('Баткен', 1, 40.0625, 70.8194, 0.2, ()),)),
+)
+
+STREETS = (
+    'пр. Чуй', 'пр. Манаса', 'ул. Киевская', 'ул. Токтогула', 'ул. Ахунбаева', 'ул. Ленина',
+    'ул. Курманжан Датка', 'мкр. Джал', 'мкр. Асанбай', 'мкр. Восток-5', 'ул. Фрунзе', 'ул. Исанова',
+)
+FIRST_NAMES = ('Айбек', 'Нурлан', 'Азамат', 'Айгерим', 'Бермет', 'Алина', 'Эрлан', 'Жылдыз', 'Тимур', 'Асель')
+LAST_NAMES = ('Асанов', 'Мамытов', 'Жумабаев', 'Токтогулов', 'Исаков', 'Садыков', 'Абдыкадыров', 'Ким')
+OPERATOR_CODES = ('700', '701', '555', '557', '770', '777', '505', '990', '220', '550')
+DESCRIPTIONS = (
+    'Собственник, торг уместен.', 'Рядом школа, детский сад и остановка.', 'Тихий двор, хорошие соседи.',
+    'Документы готовы, быстрый выход на сделку.', 'Свежий ремонт, заезжай и живи.', 'Развитая инфраструктура.',
+    'Возможен обмен.', 'Звоните в любое время.',
+)
+
+# Справочники недвижимости: (модель, поле названия, значения)
+REAL_ESTATE_DICTIONARIES = (
+    (real_estate_models.Telephone, 'telephone', ('Есть', 'Нет', 'Возможно подключение')),
+    (real_estate_models.Internet, 'internet', ('Оптика', 'ADSL', 'Wi-Fi', 'Нет')),
+    (real_estate_models.BathRoom, 'bathroom', ('Раздельный', 'Совмещенный', '2 и более санузла')),
+    (real_estate_models.Gas, 'gas', ('Магистральный', 'Автономный', 'Нет')),
+    (real_estate_models.Balcony, 'balcony', ('Балкон', 'Лоджия', 'Застекленный балкон', 'Нет')),
+    (real_estate_models.MainDoor, 'main_door', ('Металлическая', 'Деревянная', 'Бронированная')),
+    (real_estate_models.Parking, 'parking', ('Рядом с домом', 'Подземный паркинг', 'Гараж', 'Нет')),
+    (real_estate_models.Furniture, 'furniture', ('Полностью меблирована', 'Частично меблирована', 'Без мебели')),
+    (real_estate_models.FloorType, 'floor_type', ('Ламинат', 'Паркет', 'Линолеум', 'Плитка')),
+    (real_estate_models.Safety, 'safety', ('Домофон', 'Видеонаблюдение', 'Охрана', 'Кодовый замок', 'Сигнализация')),
+    (real_estate_models.Other, 'other',
+     ('Пластиковые окна', 'Кондиционер', 'Бытовая техника', 'Кладовка', 'Новая сантехника', 'Тихий двор')),
+    (real_estate_models.Document, 'document',
+     ('Красная книга', 'Договор купли-продажи', 'Технический паспорт', 'Зеленая книга')),
+    (real_estate_models.Developer, 'name', ('Имарат Строй', 'Авангард Стиль', 'Элита Строй', 'Кут Билдинг')),
+    (real_estate_models.Series, 'name', ('104 серия', '105 серия', '106 серия', 'Элитка', 'Хрущевка', 'Сталинка')),
+    (real_estate_models.BuildingType, 'name', ('Кирпичный', 'Панельный', 'Монолитный', 'Блочный', 'Деревянный')),
+    (real_estate_models.HeatingType, 'name', ('Центральное', 'Автономное', 'Газовое', 'Электрическое')),
+    (real_estate_models.ConditionType, 'name', ('Евроремонт', 'Хорошее', 'Среднее', 'Требует ремонта', 'ПСО')),
+    (real_estate_models.ObjectType, 'name', ('Офис', 'Магазин', 'Склад', 'Кафе', 'Гостиница', 'Производство')),
+    (real_estate_models.RoomLocation, 'name', ('В квартире', 'В доме', 'В общежитии')),
+)
+RESIDENTIAL_COMPLEXES = ('ЖК Ала-Тоо', 'ЖК Асанбай Сити', 'ЖК Премьер', 'ЖК Восток', 'ЖК Гранд Парк', 'ЖК Ихлас')
+M2M_SHARE = {'safety': 0.6, 'other': 0.7, 'document': 0.8}
+
+# Профили типов недвижимости: доля, медиана и разброс площади (у участков - сотки),
+# цена за единицу площади в USD для Бишкека, доля аренды
+PROPERTY_PROFILES = {
+    'apartments': {'share': 45, 'area': (62, 0.35), 'unit_price': 1150, 'rent_share': 0.3},
+    'houses': {'share': 18, 'area': (160, 0.4), 'unit_price': 800, 'rent_share': 0.15},
+    'commercials': {'share': 8, 'area': (120, 0.7), 'unit_price': 1300, 'rent_share': 0.5},
+    'rooms': {'share': 5, 'area': (18, 0.25), 'unit_price': 900, 'rent_share': 0.7},
+    'plots': {'share': 12, 'area': (8, 0.5), 'unit_price': 9000, 'rent_share': 0.02},
+    'dachas': {'share': 5, 'area': (70, 0.4), 'unit_price': 400, 'rent_share': 0.2},
+    'parkings': {'share': 7, 'area': (15, 0.1), 'unit_price': 700, 'rent_share': 0.4},
+}
+
+VEHICLE_DICTIONARIES = (
+    (vehicle_models.Fuel, 'fuel', ('Бензин', 'Дизель', 'Газ', 'Гибрид', 'Электро')),
+    (vehicle_models.Drive, 'drive', ('Передний', 'Задний', 'Полный')),
+    (vehicle_models.Transmission, 'transmission', ('Механика', 'Автомат', 'Вариатор', 'Робот')),
+    (vehicle_models.VehicleBodyType, 'name',
+     ('Седан', 'Хэтчбек', 'Универсал', 'Внедорожник', 'Кроссовер', 'Минивэн', 'Купе')),
+    (vehicle_models.VehicleColor, 'color', ('Белый', 'Черный', 'Серебристый', 'Серый', 'Синий', 'Красный')),
+    (vehicle_models.Appearance, 'name', ('Литые диски', 'Люк', 'Тонировка', 'Рейлинги')),
+    (vehicle_models.Salon, 'name', ('Кожа', 'Велюр', 'Подогрев сидений', 'Электросиденья')),
+    (vehicle_models.Media, 'name', ('Мультимедиа', 'Bluetooth', 'Навигация', 'Камера заднего вида')),
+    (vehicle_models.Safety, 'name', ('ABS', 'Подушки безопасности', 'ESP', 'Датчики парковки')),
+    (vehicle_models.Option, 'name', ('Кондиционер', 'Климат-контроль', 'Круиз-контроль', 'Бесключевой доступ')),
+    (vehicle_models.CommercialType, 'name', ('Фургон', 'Грузовик', 'Микроавтобус', 'Самосвал')),
+    (vehicle_models.SpecialType, 'name', ('Экскаватор', 'Погрузчик', 'Автокран', 'Трактор')),
+    (vehicle_models.MotoType, 'name', ('Спортбайк', 'Круизер', 'Эндуро', 'Скутер', 'Квадроцикл')),
+)
+VEHICLE_MAKES = {
+    'passenger': {
+        'Toyota': ('Camry', 'Corolla', 'RAV4', 'Land Cruiser', 'Prius'), 'Lexus': ('RX', 'LX', 'GX'),
+        'Honda': ('Fit', 'CR-V', 'Accord', 'Stepwgn'), 'Mercedes-Benz': ('C-Класс', 'E-Класс', 'S-Класс'),
+        'Hyundai': ('Sonata', 'Elantra', 'Tucson'), 'Kia': ('K5', 'Sportage', 'Rio'),
+        'Volkswagen': ('Golf', 'Passat', 'Polo'), 'Lada': ('Granta', 'Vesta', 'Niva'),
+        'Subaru': ('Forester', 'Outback', 'Legacy'), 'BMW': ('3 серия', '5 серия', 'X5'),
+    },
+    'commercial': {
+        'Mercedes-Benz': ('Sprinter', 'Vito'), 'ГАЗ': ('Газель', 'ГАЗон Next'),
+        'Hyundai': ('Porter', 'County'), 'Isuzu': ('Elf', 'Forward'),
+    },
+    'special': {'Caterpillar': ('320', '432'), 'Komatsu': ('PC200', 'WA380'), 'МТЗ': ('Беларус 82.1', 'Беларус 1221')},
+    'moto': {
+        'Honda': ('CB400', 'Africa Twin'), 'Yamaha': ('YZF-R6', 'MT-07'),
+        'Suzuki': ('GSX-R600', 'V-Strom'), 'Kawasaki': ('Ninja 400', 'Z900'),
+    },
+}
+# Категории транспорта: модель, доля, цена нового в USD, годовой пробег
+VEHICLE_PROFILES = {
+    'passenger': {'model': PassengerCar, 'share': 70, 'price': 22000, 'mileage': 15000},
+    'commercial': {'model': CommercialCar, 'share': 12, 'price': 28000, 'mileage': 30000},
+    'special': {'model': SpecialCar, 'share': 5, 'price': 70000, 'mileage': 1000},
+    'moto': {'model': Moto, 'share': 13, 'price': 7000, 'mileage': 4000},
+}
+VEHICLE_M2M = ('appearance', 'salon', 'media', 'safety', 'option')
+
+# Контекст воркера: идентификаторы справочников, заполняется до запуска пула
+context = {}
+
+
+def ensure(model, field, values, scope=None, **defaults):
+    """
+    Недостающие записи справочника одним bulk_create; {значение: pk} для всех значений.
+    scope - условие уникальности значений (например, марка в пределах категории).
+    """
+    scope = scope or {}
+    rows = model.objects.filter(**scope)
+    existing = dict(rows.filter(**{f'{field}__in': values}).values_list(field, 'pk'))
+    missing = [value for value in values if value not in existing]
+    if missing:
+        model.objects.bulk_create([model(**{field: value}, **scope, **defaults) for value in missing])
+        reference_cache.invalidate(model)
+        existing = dict(rows.filter(**{f'{field}__in': values}).values_list(field, 'pk'))
+    return existing
+
+
+def pick_weighted(rng, items):
+    """items - последовательность (значение, вес)"""
+    values, weights = zip(*items)
+    return rng.choices(values, weights=weights)[0]
+
+
+def lognormal(rng, median, sigma):
+    return median * math.exp(rng.gauss(0, sigma))
+
+
+def encode_index(index, width=6):
+    alphabet = shortuuid.get_alphabet()
+    digits = []
+    for _ in range(width):
+        index, digit = divmod(index, len(alphabet))
+        digits.append(alphabet[digit])
+    return ''.join(reversed(digits))
+
+
+def insert_multi_table(parent, objs):
+    """
+    INSERT объявлений с наследованием таблиц: по запросу на таблицу родителя и на
+    таблицу каждого наследника. bulk_create для таких моделей недоступен, а save()
+    выполняет по запросу на строку и пересчитывает производные поля.
+    """
+    parent._base_manager._insert(objs, fields=parent._meta.local_concrete_fields, raw=True)
+    by_model = {}
+    for obj in objs:
+        by_model.setdefault(type(obj), []).append(obj)
+    for model, model_objs in by_model.items():
+        model._base_manager._insert(model_objs, fields=model._meta.local_concrete_fields, raw=True)
+
+
+def build_m2m(model, field_name, ad_id, value_ids):
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    return [
+        through(**{f'{field.m2m_field_name()}_id': ad_id, f'{field.m2m_reverse_field_name()}_id': value_id})
+        for value_id in value_ids
+    ]
+
+
+def phone_number(rng):
+    return f"+996{rng.choice(OPERATOR_CODES)}{rng.randrange(10 ** 6):06d}"
+
+
+def life_dates(rng, now, duration_days):
+    """Дата создания, одобрения и активность с учетом срока подписки"""
+    created_at = now - timedelta(seconds=rng.uniform(0, duration_days * 1.5 * 86400))
+    is_approved = rng.random() < 0.93
+    approved_at = created_at + timedelta(minutes=rng.uniform(5, 600)) if is_approved else None
+    is_active = bool(approved_at and approved_at + timedelta(days=duration_days) > now)
+    return created_at, approved_at, is_active and is_approved, is_active
+
+
+def seed_real_estate(rng, start, count):
+    now = context['now']
+    rate = context['rate']
+    image_field = RealEstateAdImage._meta.get_field('image')
+    ads, images, phones, relations, index = [], [], [], [], []
+
+    for number in range(start, start + count):
+        property_type = pick_weighted(rng, [(key, value['share']) for key, value in PROPERTY_PROFILES.items()])
+        profile = PROPERTY_PROFILES[property_type]
+        model = context['ad_models'][property_type]
+        city = pick_weighted(rng, [(city, city['share']) for city in context['cities']])
+        created_at, approved_at, is_approved, is_active = life_dates(rng, now, context['duration_days'])
+
+        area = max(1, round(lognormal(rng, *profile['area'])))
+        price_usd = area * profile['unit_price'] * city['price_factor'] * lognormal(rng, 1, 0.2)
+        ad_type = 'rent' if rng.random() < profile['rent_share'] else 'sell'
+        if ad_type == 'rent':
+            # Аренда в месяц - около 0.6% стоимости, чаще в сомах
+            price_usd *= 0.006
+        currency = 'USD' if rng.random() < (0.85 if ad_type == 'sell' else 0.3) else 'KGS'
+        if currency == 'USD':
+            price = Decimal(round(price_usd, -2 if price_usd >= 1000 else 0))
+            price_kgs = (price * rate).quantize(Decimal('0.01'))
+        else:
+            price = Decimal(round(price_usd * float(rate), -3))
+            price_kgs = price
+
+        rooms = min(5, max(1, round(area / 25))) if property_type in ('apartments', 'houses', 'dachas') else 1
+        max_floor = rng.choice((5, 9, 12, 16, 20))
+        latitude = round(city['latitude'] + rng.gauss(0, 0.03), 6)
+        longitude = round(city['longitude'] + rng.gauss(0, 0.04), 6)
+        image_count = 0 if rng.random() < 0.08 else rng.randint(3, 12)
+        public_id = f"{context['token']}{encode_index(number)}"
+        title = {
+            'apartments': f'{rooms}-комн. квартира, {area} м²',
+            'houses': f'Дом {area} м², {rooms} комн.',
+            'commercials': f'Коммерческое помещение {area} м²',
+            'rooms': f'Комната {area} м²',
+            'plots': f'Участок {area} соток',
+            'dachas': f'Дача {area} м²',
+            'parkings': 'Место на парковке',
+        }[property_type]
+
+        values = {
+            'public_id': public_id, 'realestatead_ptr_id': public_id, 'user_id': rng.choice(context['users']),
+            'is_approved': is_approved, 'approved_at': approved_at, 'ad_type': ad_type,
+            'rent_period': rng.choice(('monthly', 'long_term', 'daily')) if ad_type == 'rent' else None,
+            'region_id': city['region_id'], 'city_id': city['city_id'],
+            'district_id': rng.choice(city['district_ids']) if city['district_ids'] else None,
+            'address': f"{rng.choice(STREETS)}, {rng.randint(1, 250)}",
+            'latitude': Decimal(str(latitude)), 'longitude': Decimal(str(longitude)),
+            'location': Point(longitude, latitude, srid=4326),
+            'created_at': created_at, 'updated_at': approved_at or created_at, 'is_active': is_active,
+            'subscription_id': context['subscription_id'], 'is_featured': rng.random() < 0.05,
+            'view_count': int(lognormal(rng, 40, 1.0)),
+            'description': f"{title} в городе {city['name']}. {' '.join(rng.sample(DESCRIPTIONS, 3))}",
+            'currency': currency, 'price': price, 'price_kgs': price_kgs, 'is_total_price': True,
+            'installment': rng.random() < 0.1, 'mortgage': rng.random() < 0.2, 'elevator': max_floor > 5,
+            'ceiling_height': rng.choice((2.5, 2.7, 2.8, 3.0)),
+            'image_count': image_count, 'has_main_image': bool(image_count),
+            'title': title, 'rooms_id': context['room_types'].get(rooms),
+            'total_area': area, 'living_area': round(area * 0.6), 'kitchen_area': max(5, round(area * 0.15)),
+            'area': area, 'floor_id': context['floors'].get(rng.randint(1, max_floor)),
+            'max_floor_id': context['floors'].get(max_floor),
+            'construction_year_id': rng.choice(context['years']),
+            'residential_complex_id': rng.choice(context['complexes']) if rng.random() < 0.4 else None,
+        }
+        if property_type in ('houses', 'dachas'):
+            values['total_area'] = rng.randint(4, 12)
+        for name, ids in context['real_estate_choices'].items():
+            values[f'{name}_id'] = rng.choice(ids)
+        ad = model(**{name: value for name, value in values.items() if name in context['ad_fields'][model]})
+
+        for position in range(image_count):
+            image = RealEstateAdImage(ad_id=public_id, image=f'seed/real_estate/{public_id}_{position}',
+                                      is_main=position == 0)
+            image.variants = build_image_variants(image_field.to_python(image.image))
+            images.append(image)
+            if position == 0:
+                ad.main_image_url = image.variants['card']
+        for _ in range(1 if rng.random() < 0.7 else 2):
+            phones.append(real_estate_models.PhoneNumber(ad_id=public_id, phone_number=phone_number(rng)))
+        for name, share in M2M_SHARE.items():
+            if rng.random() < share:
+                ids = context['real_estate_m2m'][name]
+                relations.extend(build_m2m(RealEstateAd, name, public_id, rng.sample(ids, rng.randint(1, len(ids)))))
+
+        ad.search_vector = ad.build_search_vector()
+        ads.append(ad)
+        index.append(ListingIndex.objects.build(ad))
+
+    insert_multi_table(RealEstateAd, ads)
+    RealEstateAdImage.objects.bulk_create(images)
+    real_estate_models.PhoneNumber.objects.bulk_create(phones)
+    for model, rows in group_by_model(relations).items():
+        model.objects.bulk_create(rows)
+    ListingIndex.objects.bulk_create(index)
+
+
+def seed_vehicles(rng, start, count):
+    now = context['now']
+    rate = context['rate']
+    current_year = now.year
+    vehicle_image_field = VehicleImage._meta.get_field('image')
+    ads, images, phones, relations = [], [], [], []
+
+    for number in range(start, start + count):
+        category = pick_weighted(rng, [(key, value['share']) for key, value in VEHICLE_PROFILES.items()])
+        profile = VEHICLE_PROFILES[category]
+        model = profile['model']
+        make_id, make_name, make_models = rng.choice(context['makes'][category])
+        model_id, model_name = rng.choice(make_models)
+        city = pick_weighted(rng, [(city, city['share']) for city in context['cities']])
+        created_at, _, _, is_active = life_dates(rng, now, context['duration_days'])
+
+        age = min(30, int(rng.expovariate(1 / 8)))
+        year = current_year - age
+        price_usd = profile['price'] * 0.9 ** age * lognormal(rng, 1, 0.3)
+        currency = 'USD' if rng.random() < 0.9 else 'KGS'
+        if currency == 'USD':
+            price = Decimal(round(price_usd, -2))
+            price_kgs = (price * rate).quantize(Decimal('0.01'))
+        else:
+            price = Decimal(round(price_usd * float(rate), -3))
+            price_kgs = price
+        image_count = 0 if rng.random() < 0.05 else rng.randint(4, 15)
+        public_id = f"{context['token']}{encode_index(number)}"
+
+        values = {
+            'public_id': public_id, 'vehiclead_ptr_id': public_id, 'user_id': rng.choice(context['users']),
+            'make_id': make_id, 'model_id': model_id, 'year_id': context['vehicle_years'].get(year),
+            'condition': 'new' if age == 0 else rng.choice(('good', 'good', 'ideal', 'crushed')),
+            'mileage': 0 if age == 0 else int(age * profile['mileage'] * lognormal(rng, 1, 0.35)),
+            'description': f"{make_name} {model_name} {year} года, {city['name']}. {rng.choice(DESCRIPTIONS)}",
+            'availability_in_KG': 'in_stock' if rng.random() < 0.85 else rng.choice(('on_order', 'on_way')),
+            'cleared_in_KG': rng.random() < 0.9, 'price': price, 'currency_id': context['currencies'][currency],
+            'price_kgs': price_kgs, 'installment_payment': rng.random() < 0.1, 'is_featured': rng.random() < 0.05,
+            'view_count': int(lognormal(rng, 60, 1.0)), 'created_at': created_at, 'updated_at': created_at,
+            'is_active': is_active, 'subscription_id': context['subscription_id'],
+            'region_id': city['region_id'], 'city_id': city['city_id'], 'category': category,
+            'title': f"{make_name} {model_name}, {year}",
+            'steering': 'left' if rng.random() < 0.8 else 'right',
+        }
+        for name, ids in context['vehicle_choices'].items():
+            values[f'{name}_id'] = rng.choice(ids)
+        ads.append(model(**{name: value for name, value in values.items() if name in context['ad_fields'][model]}))
+
+        for position in range(image_count):
+            image = VehicleImage(vehicle_id=public_id, image=f'seed/vehicle/{public_id}_{position}',
+                                 is_main=position == 0)
+            image.variants = build_image_variants(vehicle_image_field.to_python(image.image))
+            images.append(image)
+        phones.append(vehicle_models.PhoneNumber(ad_id=public_id, phone_number=phone_number(rng)))
+        for name in VEHICLE_M2M:
+            if rng.random() < 0.5:
+                ids = context['vehicle_m2m'][name]
+                relations.extend(build_m2m(VehicleAd, name, public_id, rng.sample(ids, rng.randint(1, len(ids)))))
+
+    insert_multi_table(VehicleAd, ads)
+    VehicleImage.objects.bulk_create(images)
+    vehicle_models.PhoneNumber.objects.bulk_create(phones)
+    for model, rows in group_by_model(relations).items():
+        model.objects.bulk_create(rows)
+
+
+def group_by_model(objs):
+    grouped = {}
+    for obj in objs:
+        grouped.setdefault(type(obj), []).append(obj)
+    return grouped
+
+
+SEEDERS = {'real_estate': seed_real_estate, 'vehicle': seed_vehicles}
+
+
+def init_worker(worker_context):
+    context.update(worker_context)
+
+
+def seed_chunk(task):
+    """Пачка объявлений в своей транзакции; у каждой пачки свой генератор случайных чисел"""
+    kind, start, count, seed = task
+    with transaction.atomic():
+        SEEDERS[kind](random.Random(seed), start, count)
+    return kind, count
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими объявлениями недвижимости и транспорта вместе со справочниками '
+            'и пользователями для нагрузочного тестирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ads', type=int, required=True, help='Количество объявлений недвижимости')
+        parser.add_argument('--vehicles', type=int, help='Количество объявлений транспорта (по умолчанию ads / 4)')
+        parser.add_argument('--users', type=int, help='Количество пользователей (по умолчанию ads / 25)')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['ads'] < 0 or options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('Некорректные параметры')
+        vehicles = options['vehicles'] if options['vehicles'] is not None else options['ads'] // 4
+        started = time.perf_counter()
+        rng = random.Random(options['seed'])
+
+        worker_context = self.prepare_dictionaries()
+        worker_context['users'] = self.create_users(rng, options['users'] or max(10, options['ads'] // 25))
+        worker_context['token'] = ''.join(rng.choices(shortuuid.get_alphabet(), k=2))
+        worker_context['now'] = timezone.now()
+        self.stdout.write(f"Справочники и пользователи: {time.perf_counter() - started:.1f}s")
+
+        tasks = []
+        for kind, total in (('real_estate', options['ads']), ('vehicle', vehicles)):
+            for start in range(0, total, options['chunk_size']):
+                count = min(options['chunk_size'], total - start)
+                tasks.append((kind, start, count, rng.getrandbits(64)))
+
+        done = {'real_estate': 0, 'vehicle': 0}
+        if options['workers'] == 1:
+            init_worker(worker_context)
+            results = map(seed_chunk, tasks)
+            self.report_progress(results, done, started)
+        else:
+            # Соединения не должны переходить в дочерние процессы
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(
+                options['workers'], initializer=init_worker, initargs=(worker_context,)
+            ) as pool:
+                self.report_progress(pool.imap_unordered(seed_chunk, tasks), done, started)
+
+        self.finish()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано объявлений недвижимости: {done['real_estate']}, транспорта: {done['vehicle']} "
+            f"за {elapsed:.1f}s ({sum(done.values()) / max(elapsed, 0.001):.0f} объявлений/с)"
+        ))
+
+    def report_progress(self, results, done, started):
+        reported = 0
+        for kind, count in results:
+            done[kind] += count
+            total = sum(done.values())
+            if total - reported >= 50000:
+                reported = total
+                self.stdout.write(f"  {total} объявлений, {time.perf_counter() - started:.0f}s")
+
+    def prepare_dictionaries(self):
+        """Справочники заполняются в основном процессе; воркерам передаются только идентификаторы"""
+        cities = []
+        for region_name, region_cities in GEOGRAPHY:
+            region_id = ensure(Region, 'region', [region_name])[region_name]
+            city_ids = ensure(City, 'city', [city[0] for city in region_cities], region_id=region_id)
+            for name, share, latitude, longitude, price_factor, districts in region_cities:
+                district_ids = ensure(District, 'district', list(districts), city_id=city_ids[name])
+                cities.append({
+                    'name': name, 'share': share, 'region_id': region_id, 'city_id': city_ids[name],
+                    'district_ids': list(district_ids.values()), 'latitude': latitude, 'longitude': longitude,
+                    'price_factor': price_factor,
+                })
+
+        real_estate_ids = {
+            model: list(ensure(model, field, list(values)).values())
+            for model, field, values in REAL_ESTATE_DICTIONARIES
+        }
+        developers = real_estate_ids[real_estate_models.Developer]
+        complexes = [
+            ensure(real_estate_models.ResidentialComplex, 'name', [name],
+                   developer_id=developers[position % len(developers)])[name]
+            for position, name in enumerate(RESIDENTIAL_COMPLEXES)
+        ]
+        room_types = {}
+        for room_count in range(1, 6):
+            name = f'{room_count}-комнатная' if room_count < 5 else '5 и более комнат'
+            room_types[room_count] = ensure(real_estate_models.RoomType, 'name', [name], room_count=room_count)[name]
+        floors = {}
+        for number in range(1, 21):
+            name = f'{number} этаж'
+            floors[number] = ensure(real_estate_models.Floor, 'name', [name], floor=number)[name]
+        current_year = timezone.now().year
+        years = list(ensure(real_estate_models.Year, 'year', list(range(1960, current_year + 1))).values())
+
+        vehicle_ids = {model: list(ensure(model, field, list(values)).values())
+                       for model, field, values in VEHICLE_DICTIONARIES}
+        vehicle_years = ensure(vehicle_models.VehicleYear, 'year', list(range(current_year - 30, current_year + 1)))
+        makes = {}
+        for category, category_makes in VEHICLE_MAKES.items():
+            make_ids = ensure(vehicle_models.VehicleMake, 'name', list(category_makes), scope={'category': category})
+            makes[category] = [
+                (make_ids[name], name, [
+                    (model_id, model_name) for model_name, model_id in ensure(
+                        vehicle_models.VehicleModel, 'name', list(model_names), scope={'make_id': make_ids[name]}
+                    ).items()
+                ])
+                for name, model_names in category_makes.items()
+            ]
+
+        subscription = Subscription.objects.order_by('pk').first() or Subscription.objects.create()
+        rate = ExchangeRate.get_current_rate()
+        if rate is None:
+            self.stdout.write(self.style.WARNING(f"Курс не задан, цены в сомах по курсу {DEFAULT_RATE}"))
+            rate = DEFAULT_RATE
+
+        return {
+            'rate': rate,
+            'duration_days': subscription.duration_days,
+            'subscription_id': subscription.pk,
+            'cities': cities,
+            'ad_models': {model._meta.get_field('property_type').default: model for model in AD_MODELS},
+            'ad_fields': {
+                model: {field.attname for field in model._meta.concrete_fields} | {'public_id'}
+                for model in (*AD_MODELS, *(profile['model'] for profile in VEHICLE_PROFILES.values()))
+            },
+            'real_estate_choices': {
+                field: real_estate_ids[getattr(real_estate_models, name)]
+                for field, name in (
+                    ('telephone', 'Telephone'), ('internet', 'Internet'), ('bathroom', 'BathRoom'), ('gas', 'Gas'),
+                    ('balcony', 'Balcony'), ('main_door', 'MainDoor'), ('parking', 'Parking'),
+                    ('furniture', 'Furniture'), ('floor_type', 'FloorType'), ('heating_type', 'HeatingType'),
+                    ('condition', 'ConditionType'), ('series', 'Series'), ('building_type', 'BuildingType'),
+                    ('object_type', 'ObjectType'), ('room_location', 'RoomLocation'),
+                )
+            },
+            'real_estate_m2m': {
+                'safety': real_estate_ids[real_estate_models.Safety],
+                'other': real_estate_ids[real_estate_models.Other],
+                'document': real_estate_ids[real_estate_models.Document],
+            },
+            'complexes': complexes,
+            'room_types': room_types,
+            'floors': floors,
+            'years': years,
+            'vehicle_choices': {
+                field: vehicle_ids[getattr(vehicle_models, name)]
+                for field, name in (
+                    ('color', 'VehicleColor'), ('body_type', 'VehicleBodyType'), ('fuel_type', 'Fuel'),
+                    ('drive_type', 'Drive'), ('transmission', 'Transmission'), ('commercial_type', 'CommercialType'),
+                    ('special_type', 'SpecialType'), ('moto_type', 'MotoType'),
+                )
+            },
+            'vehicle_m2m': {
+                name: vehicle_ids[getattr(vehicle_models, model_name)]
+                for name, model_name in (
+                    ('appearance', 'Appearance'), ('salon', 'Salon'), ('media', 'Media'),
+                    ('safety', 'Safety'), ('option', 'Option'),
+                )
+            },
+            'vehicle_years': vehicle_years,
+            'makes': makes,
+            'currencies': ensure(Currency, 'currency', ['USD', 'KGS']),
+        }
+
+    def create_users(self, rng, count):
+        """Пользователи без пароля (вход невозможен), bulk_create пачками"""
+        User = get_user_model()
+        token = ''.join(rng.choices(shortuuid.get_alphabet(), k=6)).lower()
+        password = make_password(None)
+        emails = [f'seed-{token}-{number}@example.kg' for number in range(count)]
+        User.objects.bulk_create(
+            [
+                User(email=email, password=password, is_active=True,
+                     full_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', phone_number=phone_number(rng))
+                for email in emails
+            ],
+            batch_size=5000,
+        )
+        return emails
+
+    def finish(self):
+        """Сброс кэша ответов и статистика планировщика для новых объемов"""
+        RealEstateAd.invalidate_responses()
+        VehicleAd.invalidate_responses()
+        tables = {
+            model._meta.db_table
+            for model in (RealEstateAd, *AD_MODELS, RealEstateAdImage, ListingIndex, real_estate_models.PhoneNumber,
+                          VehicleAd, VehicleImage, vehicle_models.PhoneNumber)
+        }
+        with connection.cursor() as cursor:
+            for table in sorted(tables):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
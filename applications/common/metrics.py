@@ -0,0 +1,265 @@
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+import redis
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# Имя: (тип, описание, границы интервалов гистограммы)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Время обработки запроса', DURATION_BUCKETS),
+    'http_request_db_queries': ('histogram', 'SQL-запросов за запрос', QUERY_BUCKETS),
+    'http_request_db_seconds': ('histogram', 'Время SQL за запрос', DURATION_BUCKETS),
+    'http_request_serializer_seconds': ('histogram', 'Время сериализаторов DRF за запрос', DURATION_BUCKETS),
+    'http_request_cache_total': ('counter', 'Обращения к кэшам приложения', None),
+    'celery_task_duration_seconds': ('histogram', 'Время выполнения задачи Celery', DURATION_BUCKETS),
+    'celery_task_db_queries': ('histogram', 'SQL-запросов за задачу', QUERY_BUCKETS),
+    'celery_task_db_seconds': ('histogram', 'Время SQL за задачу', DURATION_BUCKETS),
+    'celery_task_cache_total': ('counter', 'Обращения к кэшам приложения из задач', None),
+    'image_pipeline_images_total': ('counter', 'Фото, обработанные оптимизацией', None),
+    'image_pipeline_bytes_saved_total': ('counter', 'Экономия байт полного размера против исходников', None),
+}
+
+current_measurement = contextvars.ContextVar('current_measurement', default=None)
+
+
+class Measurement:
+    """
+    Счетчики одного запроса или задачи: SQL (через execute_wrapper на всех
+    соединениях), обращения к кэшам, время сериализаторов и общее время.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.duration = 0.0
+        self.cache = Counter()
+        self._serializer_depth = 0
+        self._stack = None
+        self._token = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self.sql_wrapper))
+        self._token = current_measurement.set(self)
+        return self
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._started
+        current_measurement.reset(self._token)
+        self._stack.close()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def samples(self, prefix, labels, **duration_labels):
+        """Наблюдения для MetricsRegistry.record"""
+        result = [
+            (f'{prefix}_duration_seconds', {**labels, **duration_labels}, self.duration),
+            (f'{prefix}_db_queries', labels, self.queries),
+            (f'{prefix}_db_seconds', labels, self.db_seconds),
+        ]
+        if f'{prefix}_serializer_seconds' in METRICS:
+            result.append((f'{prefix}_serializer_seconds', labels, self.serializer_seconds))
+        for (cache, result_name), count in self.cache.items():
+            result.append((f'{prefix}_cache_total', {**labels, 'cache': cache, 'result': result_name}, count))
+        return result
+
+    def server_timing(self):
+        hits = sum(count for (_, result), count in self.cache.items() if result == 'hit')
+        misses = sum(count for (_, result), count in self.cache.items() if result == 'miss')
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serializer_seconds * 1000:.1f}',
+            f'cache;desc="{hits} hit, {misses} miss"',
+            f'total;dur={self.duration * 1000:.1f}',
+        ])
+
+
+def record_cache(cache, hit):
+    """Попадание или промах кэша в текущем запросе/задаче"""
+    measurement = current_measurement.get()
+    if measurement is not None:
+        measurement.cache[cache, 'hit' if hit else 'miss'] += 1
+
+
+@contextmanager
+def measure_serializer():
+    """Учесть время блока как время сериализации (вложенные замеры не суммируются)"""
+    measurement = current_measurement.get()
+    if measurement is None or measurement._serializer_depth:
+        yield
+        return
+    measurement._serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        measurement._serializer_depth -= 1
+        measurement.serializer_seconds += time.perf_counter() - started
+
+
+def timed_serializer_data(fget):
+    @functools.wraps(fget)
+    def wrapper(self):
+        with measure_serializer():
+            return fget(self)
+
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_serializers():
+    """Замер serializer.data: через него views получают данные ответа (вложенные сериализаторы - внутри)"""
+    fget = serializers.BaseSerializer.data.fget
+    if not getattr(fget, 'timed', False):
+        serializers.BaseSerializer.data = property(timed_serializer_data(fget))
+
+
+def format_number(value):
+    if value == '+Inf':
+        return value
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return ','.join(f'{name}="{escape(value)}"' for name, value in sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Гистограммы и счетчики в формате Prometheus.
+
+    Значения копятся в хэше Redis (HINCRBYFLOAT, один pipeline на запрос), чтобы
+    /metrics показывал сумму по всем процессам gunicorn и Celery; без Redis - в
+    памяти процесса. Интервалы гистограммы хранятся без накопления и
+    суммируются при выводе, поэтому наблюдение меняет три поля, а не все.
+    """
+
+    key = 'metrics'
+
+    def __init__(self, redis_url=None):
+        self.redis_url = redis_url
+        self._client = None
+        self._local = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None and self.redis_url:
+            self._client = redis.Redis.from_url(self.redis_url)
+        return self._client
+
+    @staticmethod
+    def increments(samples):
+        result = Counter()
+        for name, labels, value in samples:
+            kind, _, buckets = METRICS[name]
+            series = f'{name}|{format_labels(labels)}'
+            if kind == 'counter':
+                result[f'{series}|total'] += value
+                continue
+            bound = next((bound for bound in buckets if value <= bound), '+Inf')
+            result[f'{series}|le={format_number(bound)}'] += 1
+            result[f'{series}|sum'] += value
+            result[f'{series}|count'] += 1
+        return result
+
+    def record(self, samples):
+        increments = self.increments(samples)
+        try:
+            if self.client is None:
+                with self._lock:
+                    self._local.update(increments)
+                return
+            pipeline = self.client.pipeline(transaction=False)
+            for field, value in increments.items():
+                pipeline.hincrbyfloat(self.key, field, value)
+            pipeline.execute()
+        except redis.RedisError as exc:
+            # Метрики не критичны: не роняем запрос
+            logger.warning(f"Не удалось записать метрики: {exc}")
+
+    def snapshot(self):
+        if self.client is None:
+            with self._lock:
+                return dict(self._local)
+        return {field.decode(): float(value) for field, value in self.client.hgetall(self.key).items()}
+
+    def render(self):
+        """Текстовый формат Prometheus (exposition format 0.0.4)"""
+        series = {}
+        for field, value in self.snapshot().items():
+            name, labels, part = field.split('|')
+            series.setdefault(name, {}).setdefault(labels, {})[part] = value
+
+        lines = []
+        for name, (kind, description, buckets) in METRICS.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+            for labels, parts in sorted(series.get(name, {}).items()):
+                if kind == 'counter':
+                    lines.append(f'{name}{{{labels}}} {format_number(parts.get("total", 0))}')
+                    continue
+                separator = ',' if labels else ''
+                cumulative = 0
+                for bound in (*buckets, '+Inf'):
+                    cumulative += parts.get(f'le={format_number(bound)}', 0)
+                    lines.append(f'{name}_bucket{{{labels}{separator}le="{format_number(bound)}"}} '
+                                 f'{format_number(cumulative)}')
+                lines.append(f'{name}_sum{{{labels}}} {format_number(parts.get("sum", 0))}')
+                lines.append(f'{name}_count{{{labels}}} {format_number(parts.get("count", 0))}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry(redis_url=getattr(settings, 'METRICS_REDIS_URL', None))
+
+
+class RequestMetricsMiddleware:
+    """Замер каждого запроса: заголовок Server-Timing и гистограммы по имени view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with Measurement() as measurement:
+            response = self.get_response(request)
+
+        resolver_match = request.resolver_match
+        view = (resolver_match.view_name or resolver_match._func_path) if resolver_match else 'unresolved'
+        metrics_registry.record(measurement.samples(
+            'http_request', {'view': view, 'method': request.method}, status=f'{response.status_code // 100}xx'
+        ))
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = measurement.server_timing()
+        return response
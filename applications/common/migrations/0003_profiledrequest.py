@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_exchangerate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfiledRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=2000, verbose_name='Адрес')),
+                ('view_name', models.CharField(blank=True, max_length=255, verbose_name='View')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Код ответа')),
+                ('trigger', models.CharField(choices=[('header', 'подписанный заголовок'), ('sample', 'выборка')], max_length=10, verbose_name='Причина')),
+                ('duration_ms', models.FloatField(verbose_name='Время, мс')),
+                ('sql_count', models.PositiveIntegerField(default=0, verbose_name='SQL-запросов')),
+                ('sql_ms', models.FloatField(default=0, verbose_name='Время SQL, мс')),
+                ('queries', models.JSONField(blank=True, default=list, verbose_name='SQL-запросы')),
+                ('profile', models.TextField(blank=True, verbose_name='Профиль')),
+                ('flame_graph', models.TextField(blank=True, verbose_name='Свернутые стеки (flame graph)')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
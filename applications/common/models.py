@@ -1,9 +1,13 @@
 import shortuuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Round
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 
+from .cache import TwoLevelCache
+
 
 def generate_short_id():
     return shortuuid.ShortUUID().random(length=8)
@@ -166,5 +170,72 @@ class ExchangeRate(models.Model):
 
     @classmethod
     def get_current_rate(cls):
-        """Получить текущий курс валюты"""
-        return cls.objects.latest('updated_at').usd_to_kgs
\ No newline at end of file
+        """Текущий курс (None, если курс не задан; кэшируется так же до rate_changed); хранится в памяти процесса"""
+        return exchange_rate_cache.get(
+            'current', lambda: cls.objects.order_by('-updated_at').values_list('rate', flat=True).first()
+        )
+
+    @staticmethod
+    def price_kgs_expression(rate, price_field='price'):
+        """Цена в сомах для долларовой цены, для UPDATE/фильтров на стороне базы"""
+        return Round(F(price_field) * rate, 2)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.rate_changed()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.rate_changed()
+        return result
+
+    @staticmethod
+    def rate_changed():
+        """Сбрасываем кэш курса и пересчитываем цены в сомах после коммита"""
+        from .tasks import recompute_normalized_prices
+
+        exchange_rate_cache.invalidate()
+        transaction.on_commit(recompute_normalized_prices.delay)
+
+
+exchange_rate_cache = TwoLevelCache('exchange_rate')
+
+
+class ProfiledRequest(models.Model):
+    """Профиль медленного запроса (кольцевой буфер последних PROFILING_BUFFER_SIZE записей)"""
+    TRIGGER_HEADER = 'header'
+    TRIGGER_SAMPLE = 'sample'
+    TRIGGER_CHOICES = (
+        (TRIGGER_HEADER, 'подписанный заголовок'),
+        (TRIGGER_SAMPLE, 'выборка'),
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата')
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=2000, verbose_name='Адрес')
+    view_name = models.CharField(max_length=255, blank=True, verbose_name='View')
+    status_code = models.PositiveSmallIntegerField(verbose_name='Код ответа')
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES, verbose_name='Причина')
+    duration_ms = models.FloatField(verbose_name='Время, мс')
+    sql_count = models.PositiveIntegerField(default=0, verbose_name='SQL-запросов')
+    sql_ms = models.FloatField(default=0, verbose_name='Время SQL, мс')
+    queries = models.JSONField(default=list, blank=True, verbose_name='SQL-запросы')
+    profile = models.TextField(blank=True, verbose_name='Профиль')
+    flame_graph = models.TextField(blank=True, verbose_name='Свернутые стеки (flame graph)')
+
+    class Meta:
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} мс)'
+
+    @classmethod
+    def store(cls, buffer_size, **fields):
+        """Сохраняем профиль и удаляем записи старше последних buffer_size"""
+        entry = cls.objects.create(**fields)
+        threshold = cls.objects.order_by('-pk').values_list('pk', flat=True)[buffer_size:buffer_size + 1].first()
+        if threshold is not None:
+            cls.objects.filter(pk__lte=threshold).delete()
+        return entry
@@ -0,0 +1,197 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+from .models import ProfiledRequest
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+SIGNING_SALT = 'applications.common.profiling'
+MAX_QUERIES = 1000
+
+
+def make_profiling_token():
+    """Значение заголовка X-Profile; действует PROFILING_TOKEN_MAX_AGE секунд"""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def is_valid_profiling_token(token):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class CProfileCollector:
+    """Детерминированный профиль cProfile: сводка функций по суммарному времени"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def report(self):
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(80)
+        return stream.getvalue(), ''
+
+
+class StackSampler:
+    """
+    Выборка стеков потока запроса из отдельного потока раз в interval секунд.
+    Результат - свернутые стеки (формат flamegraph.pl / speedscope).
+    """
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{code.co_firstlineno})')
+                frame = frame.f_back
+            # Стек, снятый во время остановки, - это ожидание самого семплера
+            if stack and not self._stopped.is_set():
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def report(self):
+        total = sum(self.stacks.values())
+        functions = Counter()
+        for stack, count in self.stacks.items():
+            functions[stack.rsplit(';', 1)[-1]] += count
+        summary = '\n'.join(
+            f'{count * 100 / total:6.1f}%  {name}' for name, count in functions.most_common(80)
+        ) if total else ''
+        flame_graph = '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+        return summary, flame_graph
+
+
+COLLECTORS = {'cprofile': CProfileCollector, 'stack': StackSampler}
+
+
+class QueryRecorder:
+    """Список SQL запроса с длительностью (execute_wrapper на всех соединениях)"""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.total_ms += duration_ms
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'params': repr(params)[:1000],
+                    'duration_ms': round(duration_ms, 3),
+                })
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов в production.
+
+    Запрос профилируется по подписанному заголовку X-Profile (manage.py
+    profiling_token) или по выборке с вероятностью PROFILING_SAMPLE_RATE.
+    Сохраняются запросы по заголовку и медленнее PROFILING_SLOW_MS; остальные
+    запросы проходят без замеров.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_ms = settings.PROFILING_SLOW_MS
+        self.buffer_size = settings.PROFILING_BUFFER_SIZE
+        self.collector_class = COLLECTORS[settings.PROFILING_MODE]
+
+    def get_trigger(self, request):
+        token = request.headers.get(PROFILE_HEADER)
+        if token and is_valid_profiling_token(token):
+            return ProfiledRequest.TRIGGER_HEADER
+        if self.sample_rate and random.random() < self.sample_rate:
+            return ProfiledRequest.TRIGGER_SAMPLE
+        return None
+
+    def __call__(self, request):
+        trigger = self.get_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        collector = self.collector_class()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            started = time.perf_counter()
+            collector.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                collector.stop()
+                duration_ms = (time.perf_counter() - started) * 1000
+
+        if trigger == ProfiledRequest.TRIGGER_HEADER or duration_ms >= self.slow_ms:
+            self.store(request, response, trigger, duration_ms, recorder, collector)
+        return response
+
+    def store(self, request, response, trigger, duration_ms, recorder, collector):
+        profile, flame_graph = collector.report()
+        try:
+            entry = ProfiledRequest.store(
+                self.buffer_size,
+                method=request.method,
+                path=request.get_full_path()[:2000],
+                view_name=(request.resolver_match.view_name or '') if request.resolver_match else '',
+                status_code=response.status_code,
+                trigger=trigger,
+                duration_ms=round(duration_ms, 2),
+                sql_count=recorder.count,
+                sql_ms=round(recorder.total_ms, 2),
+                queries=recorder.queries,
+                profile=profile,
+                flame_graph=flame_graph,
+            )
+        except Exception as exc:
+            # Профиль не должен ломать ответ
+            logger.warning(f"Не удалось сохранить профиль запроса {request.path}: {exc}")
+            return
+        if trigger == ProfiledRequest.TRIGGER_HEADER:
+            response['X-Profile-Id'] = str(entry.pk)
@@ -0,0 +1,158 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .metrics import record_cache
+
+# Служебные параметры, не влияющие на ответ
+IGNORED_PARAMS = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'fbclid', 'gclid'}
+
+
+ALL_CATEGORIES = '*'
+
+
+def generation_key(group, category=None):
+    return f'resp_gen:{group}:{category}' if category else f'resp_gen:{group}'
+
+
+def get_generation(group, category=None):
+    """
+    Поколение ответов: общее поколение группы плюс поколение категории.
+    Ответы без категории (общая лента) зависят от поколения ALL_CATEGORIES,
+    которое растет при изменении в любой категории.
+    """
+    keys = [generation_key(group), generation_key(group, category or ALL_CATEGORIES)]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, 1, timeout=None)
+            values[key] = cache.get(key, 1)
+    return '.'.join(str(values[key]) for key in keys)
+
+
+def bump_generation(group, *categories):
+    """Сбрасываем закэшированные ответы категорий; без категорий - всей группы"""
+    categories = [category for category in categories if category]
+    if categories:
+        keys = [generation_key(group, category) for category in {*categories, ALL_CATEGORIES}]
+    else:
+        keys = [generation_key(group)]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 2, timeout=None)
+
+
+def normalize_query_params(query_params):
+    """Параметры запроса в каноническом виде: отсортированы, без пустых и служебных"""
+    return sorted(
+        (key, value)
+        for key, values in query_params.lists()
+        if key not in IGNORED_PARAMS
+        for value in values
+        if value != ''
+    )
+
+
+class ResponseCacheStats:
+    """Счетчики попаданий и промахов кэша ответов по категориям (в общем кэше)"""
+    key_prefix = 'resp_stats'
+
+    def __init__(self):
+        self._known_names = set()
+
+    def register_name(self, name):
+        # Список категорий храним в кэше, чтобы статистику видели все процессы
+        if name in self._known_names:
+            return
+        names_key = f'{self.key_prefix}:names'
+        names = set(cache.get(names_key) or ())
+        if name not in names:
+            cache.set(names_key, sorted(names | {name}), timeout=None)
+        self._known_names.add(name)
+
+    def record(self, name, hit):
+        record_cache('response', hit)
+        self.register_name(name)
+        key = f"{self.key_prefix}:{name}:{'hit' if hit else 'miss'}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+    def snapshot(self):
+        names = cache.get(f'{self.key_prefix}:names') or []
+        keys = [f'{self.key_prefix}:{name}:{kind}' for name in names for kind in ('hit', 'miss')]
+        values = cache.get_many(keys)
+        result = {}
+        for name in names:
+            hits = values.get(f'{self.key_prefix}:{name}:hit', 0)
+            misses = values.get(f'{self.key_prefix}:{name}:miss', 0)
+            total = hits + misses
+            result[name] = {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+        return result
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+class CachedResponseMixin:
+    """
+    Кэш ответов для анонимных GET-запросов (list - CachedListMixin,
+    retrieve - CachedRetrieveMixin).
+
+    Ключ включает поколение группы и категории, нормализованные параметры
+    запроса и идентификатор объекта. Изменение объявлений увеличивает
+    поколение (bump_generation), и старые ключи просто перестают читаться.
+    """
+    cache_group = None
+    cache_category = None
+    response_cache_timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 5 * 60)
+
+    def get_cache_category(self):
+        return self.cache_category
+
+    def get_response_cache_key(self, request, action):
+        category = self.get_cache_category()
+        generation = get_generation(self.cache_group, category)
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        params = hashlib.md5(repr(normalize_query_params(request.query_params)).encode()).hexdigest()
+        return f'resp:{self.cache_group}:{category}:{generation}:{action}:{lookup}:{params}'
+
+    def is_response_cacheable(self, request, shared=False):
+        if self.cache_group is None or request.method != 'GET':
+            return False
+        return shared or not request.user.is_authenticated
+
+    def cached_response(self, request, action, render, shared=False):
+        """shared - ответ не зависит от пользователя и кэшируется для всех"""
+        if not self.is_response_cacheable(request, shared):
+            return render()
+
+        stats_name = f'{self.cache_group}:{self.get_cache_category() or "all"}'
+        cache_key = self.get_response_cache_key(request, action)
+        data = cache.get(cache_key)
+        if data is not None:
+            response_cache_stats.record(stats_name, hit=True)
+            return Response(data)
+
+        response_cache_stats.record(stats_name, hit=False)
+        response = render()
+        if response.status_code == 200:
+            cache.set(cache_key, response.data, timeout=self.response_cache_timeout)
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    def list(self, request, *args, **kwargs):
+        render = super().list
+        return self.cached_response(request, 'list', lambda: render(request, *args, **kwargs))
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    def retrieve(self, request, *args, **kwargs):
+        render = super().retrieve
+        return self.cached_response(request, 'retrieve', lambda: render(request, *args, **kwargs))
@@ -1,7 +1,30 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+
+from .cache import reference_cache
 from .models import Region, City, District, Currency, Exchange, Subscription, CountryName
 
 
+@extend_schema_field(OpenApiTypes.STR)
+class ReferenceField(serializers.Field):
+    """Значение поля справочника по внешнему ключу (source='<fk>_id') из кэша, без JOIN"""
+
+    def __init__(self, model, attribute, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('allow_null', True)
+        self.model = model
+        self.attribute = attribute
+        super().__init__(**kwargs)
+        reference_cache.register(model)
+
+    def to_representation(self, value):
+        obj = reference_cache.get(self.model, value)
+        if obj is None:
+            return None
+        return str(getattr(obj, self.attribute))
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
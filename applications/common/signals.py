@@ -0,0 +1,20 @@
+from celery.signals import task_postrun, task_prerun
+
+from .metrics import Measurement, metrics_registry
+
+# Замеры выполняющихся задач по task_id (prerun и postrun приходят в одном процессе)
+task_measurements = {}
+
+
+@task_prerun.connect
+def start_task_measurement(task_id=None, task=None, **kwargs):
+    task_measurements[task_id] = Measurement().start()
+
+
+@task_postrun.connect
+def record_task_measurement(task_id=None, task=None, state=None, **kwargs):
+    measurement = task_measurements.pop(task_id, None)
+    if measurement is None:
+        return
+    measurement.stop()
+    metrics_registry.record(measurement.samples('celery_task', {'task': task.name}, state=state or 'UNKNOWN'))
@@ -0,0 +1,41 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+from .counters import view_counter
+from .models import ExchangeRate
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def flush_view_counts():
+    """Переносим накопленные просмотры в view_count"""
+    flushed = {}
+    for label in settings.VIEW_COUNTER_MODELS:
+        flushed[label] = view_counter.flush(apps.get_model(label))
+        logger.info(f"{label}: обновлено просмотров у {flushed[label]} объявлений")
+    return flushed
+
+
+@shared_task
+def recompute_normalized_prices():
+    """Пересчитываем цены в сомах по текущему курсу: один UPDATE на таблицу"""
+    rate = ExchangeRate.objects.order_by('-updated_at').values_list('rate', flat=True).first()
+    if rate is None:
+        return {}
+    models = {label: apps.get_model(label) for label in settings.NORMALIZED_PRICE_MODELS}
+    updated = {}
+    with transaction.atomic():
+        for label, model in models.items():
+            updated[label] = model.recompute_price_kgs(rate)
+            logger.info(f"{label}: пересчитаны цены у {updated[label]} объявлений по курсу {rate}")
+    # Кэш ответов сбрасываем один раз, когда пересчитаны все таблицы: иначе ответ,
+    # собранный между UPDATE, закэшировался бы с ценами из еще не пересчитанной таблицы
+    if any(updated.values()):
+        for model in models.values():
+            if hasattr(model, 'invalidate_responses'):
+                model.invalidate_responses()
+    return updated
@@ -1,3 +1,177 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from bisect import bisect_right
+from collections import Counter
+from io import StringIO
 
-# Create your tests here.
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from applications.real_estate.models import RealEstateAd
+from applications.real_estate_advertisement.models import ApartmentAd
+from applications.real_estate_advertisement.views import ApartmentAdViewSet
+from .counters import ViewCounter
+from .facets import RangeFacet
+from .flat_serializers import get_flat_serializer
+from .management.commands.check_flat_serializers import VIEWSETS
+from .models import City, ExchangeRate, Region, exchange_rate_cache
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('viewset', VIEWSETS, ids=lambda viewset: viewset.__name__)
+def test_flat_serializer_matches_drf(viewset, listings):
+    """Скомпилированный сериализатор списка отдает то же, что DRF: значения и порядок полей"""
+    view = viewset(request=Request(APIRequestFactory().get('/')), format_kwarg=None, kwargs={}, action='list')
+    serializer_class = view.get_serializer_class()
+    flat = get_flat_serializer(serializer_class, viewset.queryset.model)
+    if flat is None:
+        pytest.skip(f'{serializer_class.__name__} не компилируется, список отдает DRF')
+
+    context = view.get_serializer_context()
+    ordered = view.get_queryset().order_by('-created_at', '-pk')
+    expected = serializer_class(list(ordered), many=True, context=context).data
+    actual = flat.bind(context).serialize(list(flat.values(ordered)))
+
+    assert expected
+    assert actual == expected
+    assert [list(row) for row in actual] == [list(row) for row in expected]
+
+
+@pytest.mark.django_db
+def test_benchmark_api_runs(listings, tmp_path):
+    """Все сценарии бенчмарка выполняются и укладываются в бюджеты запросов (время не проверяется)"""
+    report_path = tmp_path / 'benchmark.json'
+    # Два повтора: замеряется последний, и сценарий "из кэша" попадает в кэш ответов
+    call_command('benchmark_api', repeat=2, no_time_check=True, report=str(report_path), stdout=StringIO())
+
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+    assert report['dataset']['listing_index'] == len(listings[0])
+    assert report['scenarios']
+    assert all(scenario['passed'] for scenario in report['scenarios'])
+
+
+@pytest.fixture
+def facet_ads(listings):
+    """Квартиры в двух регионах и разных интервалах цены (в дополнение к квартире из listings)"""
+    apartment = listings[0][0]
+    osh = Region.objects.create(region='Ошская область')
+    common = {
+        'user': apartment.user, 'subscription': apartment.subscription, 'is_approved': True,
+        'approved_at': timezone.now(), 'currency': 'KGS', 'total_area': 50,
+    }
+    for region, city, price in (
+        (apartment.region, apartment.city, 900_000),
+        (apartment.region, apartment.city, 4_500_000),
+        (osh, City.objects.create(region=osh, city='Ош'), 4_800_000),
+        (osh, City.objects.get(city='Ош'), 12_000_000),
+        (osh, None, 2_000_000),
+    ):
+        ApartmentAd.objects.create(**common, region=region, city=city, price=price)
+    return apartment.region, apartment.city, osh
+
+
+def plain_facet_counts(params, facet):
+    """Счетчики фасета обычным запросом: все фильтры, кроме параметров самого фасета"""
+    data = {key: value for key, value in params.items() if key not in facet.params}
+    queryset = ApartmentAdViewSet.filterset_class(data, queryset=ApartmentAdViewSet.queryset.all()).qs.order_by()
+    if isinstance(facet, RangeFacet):
+        values = queryset.values_list(facet.field, flat=True)
+        return dict(Counter(bisect_right(facet.bounds, value) for value in values if value is not None))
+    rows = queryset.values(facet.field).annotate(count=Count('pk'))
+    return {row[facet.field]: row['count'] for row in rows if row[facet.field] is not None}
+
+
+@pytest.mark.django_db
+def test_facets_match_plain_counts(facet_ads):
+    """GROUPING SETS дает те же счетчики, что отдельные запросы по каждому фасету"""
+    chui, bishkek, osh = facet_ads
+    facets = ApartmentAdViewSet().get_facet_fields()
+    cases = [
+        {},
+        {'region': chui.pk},
+        {'region': osh.pk, 'min_price': 3_000_000},
+        {'city': bishkek.pk, 'max_price': 5_000_000},
+    ]
+    for params in cases:
+        data = APIClient().get('/api/real-estate/apartments/facets/', params).json()
+
+        filtered = ApartmentAdViewSet.filterset_class(params, queryset=ApartmentAdViewSet.queryset.all()).qs
+        assert data['total'] == filtered.count(), params
+        for name, facet in facets.items():
+            counts = {item['value']: item['count'] for item in data['facets'][name]}
+            assert counts == plain_facet_counts(params, facet), (params, name)
+
+
+@pytest.mark.django_db
+def test_facet_ignores_its_own_filter(facet_ads):
+    """Выбранный регион не скрывает другие регионы в своем фасете, но сужает остальные фасеты"""
+    chui, bishkek, osh = facet_ads
+    data = APIClient().get('/api/real-estate/apartments/facets/', {'region': osh.pk, 'min_price': 3_000_000}).json()
+
+    regions = {item['value']: item for item in data['facets']['region']}
+    # Ош: 4,8 и 12 млн; Чуйская: 4,5 млн и квартира в долларах из listings (5,7 млн сом)
+    assert {pk: item['count'] for pk, item in regions.items()} == {osh.pk: 2, chui.pk: 2}
+    assert regions[osh.pk]['label'] == 'Ошская область'
+    assert {item['value']: item['count'] for item in data['facets']['city']} == {
+        City.objects.get(city='Ош').pk: 2
+    }
+    # Фасет цены учитывает регион, но не свой min_price: 2 млн в Оше тоже виден
+    assert {item['value']: item['count'] for item in data['facets']['price']} == {1: 1, 2: 1, 4: 1}
+    assert data['total'] == 2
+
+
+@pytest.fixture
+def viewed_ad(user):
+    return ApartmentAd.objects.create(user=user, price=4_500_000, currency='KGS', total_area=54)
+
+
+def view_count(ad):
+    return RealEstateAd.objects.values_list('view_count', flat=True).get(pk=ad.pk)
+
+
+@pytest.mark.django_db
+def test_view_counter_counts_each_viewer_once(viewed_ad):
+    counter = ViewCounter(unique_ttl=60)
+    recorded = [counter.record(viewed_ad, viewer) for viewer in ('user:1', 'ip:10.0.0.1', 'user:1', 'user:2')]
+
+    assert recorded == [True, True, False, True]
+    assert counter.flush(RealEstateAd) == 1
+    assert view_count(viewed_ad) == 3
+
+    # Буфер после сброса пуст, повторный просмотр в пределах unique_ttl не учитывается
+    assert counter.record(viewed_ad, 'ip:10.0.0.1') is False
+    assert counter.flush(RealEstateAd) == 0
+    assert view_count(viewed_ad) == 3
+
+
+@pytest.mark.django_db
+def test_view_counter_resumes_interrupted_flush(viewed_ad):
+    """Прерванный сброс: переименованный буфер переносится первым, новые просмотры - следующим сбросом"""
+    counter = ViewCounter()
+    counter.record(viewed_ad)
+    counter.drain(RealEstateAd)
+    counter.record(viewed_ad)
+    counter.record(viewed_ad)
+
+    assert counter.flush(RealEstateAd) == 1
+    assert view_count(viewed_ad) == 1
+    assert counter.flush(RealEstateAd) == 1
+    assert view_count(viewed_ad) == 3
+
+
+@pytest.mark.django_db
+def test_missing_exchange_rate_is_cached(django_assert_num_queries):
+    """Без курса база читается один раз; новый курс сбрасывает закэшированный None"""
+    with django_assert_num_queries(1):
+        assert ExchangeRate.get_current_rate() is None
+    # Другой процесс: локальной копии нет, значение берется из общего кэша
+    exchange_rate_cache._local.clear()
+    with django_assert_num_queries(0):
+        assert ExchangeRate.get_current_rate() is None
+
+    ExchangeRate.objects.create(rate=Decimal('87.5'))
+    assert ExchangeRate.get_current_rate() == Decimal('87.5')
@@ -1,3 +1,31 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import metrics_registry
+from .response_cache import response_cache_stats
+
+
+class ResponseCacheStatsView(APIView):
+    """Попадания и промахи кэша ответов API по категориям"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache_stats.snapshot())
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus; доступ по токену METRICS_TOKEN (Bearer) или для персонала"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    allowed = (
+        hmac.compare_digest(authorization, f'Bearer {token}') if token
+        else request.user.is_authenticated and request.user.is_staff
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0015_marketingimage_alter_realestatead_price_kgs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='realestatead',
+            index=models.Index(fields=['is_active', '-created_at', '-public_id'], name='real_estate_is_acti_b2b398_idx'),
+        ),
+    ]
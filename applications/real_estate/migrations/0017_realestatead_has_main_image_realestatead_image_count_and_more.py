@@ -0,0 +1,47 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+def backfill_image_summary(apps, schema_editor):
+    RealEstateAd = apps.get_model('real_estate', 'RealEstateAd')
+    RealEstateAdImage = apps.get_model('real_estate', 'RealEstateAdImage')
+
+    summaries = {}
+    for image in RealEstateAdImage.objects.order_by('ad_id', '-is_main', 'uploaded_at').iterator():
+        summary = summaries.setdefault(image.ad_id, {
+            'image_count': 0,
+            'has_main_image': False,
+            'main_image_url': image.image.url if image.image else None,
+        })
+        summary['image_count'] += 1
+        summary['has_main_image'] = summary['has_main_image'] or image.is_main
+
+    for ad_id, summary in summaries.items():
+        RealEstateAd.objects.filter(pk=ad_id).update(**summary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0016_realestatead_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realestatead',
+            name='has_main_image',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Есть главное фото'),
+        ),
+        migrations.AddField(
+            model_name='realestatead',
+            name='image_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Количество фото'),
+        ),
+        migrations.AddField(
+            model_name='realestatead',
+            name='main_image_url',
+            field=models.URLField(blank=True, editable=False, max_length=900, null=True, verbose_name='Главное фото'),
+        ),
+        migrations.RunPython(backfill_image_summary, migrations.RunPython.noop),
+    ]
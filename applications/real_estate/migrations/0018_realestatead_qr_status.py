@@ -0,0 +1,24 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+def mark_existing_qr_codes_ready(apps, schema_editor):
+    RealEstateAd = apps.get_model('real_estate', 'RealEstateAd')
+    RealEstateAd.objects.exclude(qr_code__isnull=True).exclude(qr_code='').update(qr_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0017_realestatead_has_main_image_realestatead_image_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realestatead',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'в очереди'), ('ready', 'готов'), ('failed', 'ошибка')], default='pending', editable=False, max_length=10, verbose_name='Статус QR-кода'),
+        ),
+        migrations.RunPython(mark_existing_qr_codes_ready, migrations.RunPython.noop),
+    ]
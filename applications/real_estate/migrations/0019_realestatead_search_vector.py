@@ -0,0 +1,24 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0018_realestatead_qr_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realestatead',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый индекс'),
+        ),
+        migrations.AddIndex(
+            model_name='realestatead',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='real_estate_search_gin'),
+        ),
+    ]
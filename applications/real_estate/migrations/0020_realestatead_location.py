@@ -0,0 +1,27 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:31
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0019_realestatead_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realestatead',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, geography=True, null=True, srid=4326, verbose_name='Точка на карте'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE real_estate_realestatead
+            SET location = ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND location IS NULL
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
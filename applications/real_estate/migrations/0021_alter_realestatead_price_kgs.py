@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0020_realestatead_location'),
+        ('common', '0002_exchangerate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='realestatead',
+            name='price_kgs',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=12, null=True, verbose_name='Цена в сомах'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE real_estate_realestatead
+            SET price_kgs = ROUND(price * rate.rate, 2)
+            FROM (SELECT rate FROM common_exchangerate ORDER BY updated_at DESC LIMIT 1) AS rate
+            WHERE currency = 'USD' AND price_kgs IS DISTINCT FROM ROUND(price * rate.rate, 2)
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0022_realestateadimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realestateadimage',
+            name='original_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Размер исходника, байт'),
+        ),
+        migrations.AddField(
+            model_name='realestateadimage',
+            name='optimized_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Полный размер в WebP', null=True, verbose_name='Размер после оптимизации, байт'),
+        ),
+        migrations.AddField(
+            model_name='realestateadimage',
+            name='optimized_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Оптимизировано'),
+        ),
+    ]
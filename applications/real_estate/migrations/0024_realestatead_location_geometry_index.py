@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0023_realestateadimage_optimization'),
+    ]
+
+    operations = [
+        # Тайлы карты сравнивают location::geometry с границей тайла
+        migrations.RunSQL(
+            """
+            CREATE INDEX IF NOT EXISTS real_estate_location_geometry_idx
+            ON real_estate_realestatead USING gist ((location::geometry))
+            """,
+            "DROP INDEX IF EXISTS real_estate_location_geometry_idx",
+        ),
+    ]
@@ -1,28 +1,32 @@
 from datetime import timedelta
 
 import qrcode
-import cloudinary.uploader
 from io import BytesIO
 
-from PIL import Image, ImageDraw, ImageFont
 from cloudinary_storage.storage import RawMediaCloudinaryStorage
 from django.contrib.gis.db.models import PointField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from qrcode.image.styledpil import StyledPilImage
 
-from applications.common.models import Currency, Exchange, Region, City, District, \
+from applications.common.cache import TwoLevelCache, reference_cache
+from applications.common.response_cache import bump_generation
+from applications.common.counters import view_counter
+from applications.common.images import build_image_variants, process_image_files
+from applications.common.models import Exchange, Region, City, District, \
     generate_short_id, Subscription, ExchangeRate
 from django.contrib.auth import get_user_model
 
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Value
 from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
 from cloudinary.models import CloudinaryField
 
-from applications.user.tasks import logger
 from django.core.cache import cache
 
 import logging
@@ -318,6 +322,14 @@ class RealEstateAd(models.Model):
         ('USD', 'Доллар США'),
         ('KGS', 'Кыргызский сом'),
     ]
+    QR_STATUS_PENDING = 'pending'
+    QR_STATUS_READY = 'ready'
+    QR_STATUS_FAILED = 'failed'
+    QR_STATUS_CHOICES = (
+        (QR_STATUS_PENDING, 'в очереди'),
+        (QR_STATUS_READY, 'готов'),
+        (QR_STATUS_FAILED, 'ошибка'),
+    )
     public_id = models.CharField(
         primary_key=True,
         max_length=8,
@@ -381,7 +393,7 @@ class RealEstateAd(models.Model):
     address = models.CharField(
         max_length=255, verbose_name="Адресс", null=True, blank=True, db_index=True
     )
-    location = PointField(blank=True, null=True, srid=4326, verbose_name='Точка на карте'),
+    location = PointField(geography=True, blank=True, null=True, srid=4326, verbose_name='Точка на карте')
     latitude = models.DecimalField(
         max_digits=18,
         decimal_places=15,
@@ -550,6 +562,13 @@ class RealEstateAd(models.Model):
         blank=True,
         null=True
     )
+    qr_status = models.CharField(
+        max_length=10,
+        choices=QR_STATUS_CHOICES,
+        default=QR_STATUS_PENDING,
+        editable=False,
+        verbose_name="Статус QR-кода"
+    )
     currency = models.CharField(
         max_length=3,
         choices=CURRENCY_CHOICES,
@@ -567,6 +586,7 @@ class RealEstateAd(models.Model):
         decimal_places=2,
         null=True,
         blank=True,
+        db_index=True,
         verbose_name="Цена в сомах",
     )
     is_total_price = models.BooleanField(
@@ -603,7 +623,38 @@ class RealEstateAd(models.Model):
         blank=True,
         null=True
     )
+    image_count = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество фото'
+    )
+    has_main_image = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Есть главное фото'
+    )
+    main_image_url = models.URLField(
+        max_length=900,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Главное фото'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый индекс'
+    )
     _qr_needs_regeneration = False
+    # Поля, значения которых запоминаются при загрузке для отслеживания изменений
+    TRACKED_FIELDS = ('qr_code', 'price', 'currency', 'latitude', 'longitude')
+    # Поля, из которых собирается поисковый индекс
+    SEARCH_SOURCE_FIELDS = {'title', 'description', 'address', 'region', 'city', 'district', 'rooms',
+                            'residential_complex'}
+    # Поля, вычисляемые в save()
+    DERIVED_FIELDS = ('is_active', 'is_approved', 'price_kgs', 'latitude', 'longitude', 'location', 'qr_status')
+    # Группа поколений кэша ответов API, категория - property_type
+    RESPONSE_CACHE_GROUP = 'real_estate'
 
     def get_measurements_docs_url(self):
         if self.measurements_docs and self.is_active:
@@ -623,7 +674,7 @@ class RealEstateAd(models.Model):
             raise ValidationError({'rent_period': 'Поле "rent_period" должно быть пустым.'})
 
     def days_remaining(self):
-        if self.subscription and self.approved_at:
+        if self.approved_at and self.subscription_id and self.subscription:
             expiration_date = self.approved_at + timedelta(days=self.subscription.duration_days)
             remaining = (expiration_date - timezone.now()).days
             return max(0, remaining)
@@ -677,125 +728,130 @@ class RealEstateAd(models.Model):
             logger.error(f"Error in _get_property_display_text: {str(e)}")
             return ["ОБЪЯВЛЕНИЕ"]
 
-    def _generate_qr_code_pdf(self):
-        try:
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
-            from reportlab.lib.styles import ParagraphStyle
-            from reportlab.platypus import Paragraph
-            
-            # Регистрируем шрифт
-            font_path = 'templates/fonts/Arial Bold.ttf'
-            pdfmetrics.registerFont(TTFont('ArialBold', font_path))
-            
-            # Создаем PDF
-            buffer = BytesIO()
-            width, height = A4[1], A4[0]  # Альбомная ориентация
-            
-            pdf = canvas.Canvas(buffer, pagesize=(width, height))
-            pdf._doc.setProducer('eesi.kg PDF Generator')
-            pdf._doc.setAuthor('eesi.kg')
-            
-            # Желтый фон
-            pdf.setFillColor(colors.HexColor('#FFD700'))
-            pdf.rect(0, 0, width, height, fill=True)
-            
-            # QR код размеры и позиция
-            qr_size = 400
-            qr_x = width - qr_size - 60
-            qr_y = (height - qr_size) // 2
-            
-            # Создаем QR код
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_H,
-                box_size=12,
-                border=2,
-            )
-            qr.add_data(self.get_qr_url())
-            qr.make(fit=True)
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Единый стиль для всего текста
-            style = ParagraphStyle(
-                'UnifiedStyle',
-                fontName='ArialBold',
-                fontSize=55,
-                leading=60,
-                alignment=0,
-                textColor=colors.white,
-                spaceAfter=0,
-            )
-            
-            # Получаем текст для отображения
-            display_texts = self._get_property_display_text()
-            
-            # Расчет позиций для точного выравнивания по высоте QR кода
-            num_lines = len([text for text in display_texts if text.strip()])
-            line_height = qr_size / num_lines  # Равномерно распределяем по высоте QR кода
-            
-            # Отрисовка текста
-            left_margin = 60
-            available_width = qr_x - left_margin - 50
-            
-            # Начинаем с того же уровня, где начинается QR код
-            y_position = qr_y + qr_size  # Начальная позиция совпадает с верхней границей QR кода
-            
-            for text in display_texts:
-                if text.strip():
-                    p = Paragraph(text.encode('utf-8').decode('utf-8'), style)
-                    w, h = p.wrap(available_width, line_height)
-                    p.drawOn(pdf, left_margin, y_position - h)  # Отрисовываем текст
-                    y_position -= line_height  # Смещаемся вниз на высоту строки
-            
-            # Логотип
-            pdf.setFont('ArialBold', 55)
-            pdf.setFillColor(colors.white)
-            logo_text = 'eesi.kg'.encode('utf-8').decode('utf-8')
-            pdf.drawString(left_margin, 50, logo_text)
-            
-            # Белый фон под QR код
-            pdf.setFillColor(colors.white)
-            pdf.rect(qr_x - 10, qr_y - 10, qr_size + 20, qr_size + 20, fill=True)
-            
-            # Размещаем QR код
-            qr_buffer = BytesIO()
-            qr_img.save(qr_buffer, format='PNG')
-            qr_buffer.seek(0)
-            pdf.drawImage(ImageReader(qr_buffer), qr_x, qr_y, width=qr_size, height=qr_size)
-            
-            # Инструкция для QR кода
-            pdf.setFont('ArialBold', 14)
-            instruction = "наведите камеру на QR-код, чтобы открыть объявление"
-            instruction = instruction.encode('utf-8').decode('utf-8')
-            text_width = pdf.stringWidth(instruction, 'ArialBold', 14)
-            x_position = qr_x + (qr_size - text_width) / 2
-            pdf.drawString(x_position, qr_y + qr_size + 25, instruction)
-            
-            # Сохраняем PDF
-            pdf.save()
-            buffer.seek(0)
-            
-            # Загружаем в Cloudinary
-            result = cloudinary.uploader.upload(
-                buffer,
-                resource_type="raw",
-                public_id=f"qr_codes/{self.public_id}",
-                format="pdf",
-                overwrite=True,
-                type="upload",
-                access_mode="public",
-                use_filename=True,
-                unique_filename=False,
-                content_type="application/pdf"
-            )
-            
-            self.qr_code = result['secure_url']
-            self._qr_needs_regeneration = False
-            
-        except Exception as e:
-            logger.error(f"Failed to generate QR code PDF for {self.public_id}: {str(e)}")
-            raise ValidationError(f"QR code PDF generation failed: {str(e)}")
+    def _render_qr_code_pdf(self):
+        """Рисуем PDF с QR-кодом и возвращаем его содержимое"""
+        # Регистрируем шрифт (один раз на процесс)
+        if 'ArialBold' not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont('ArialBold', 'templates/fonts/Arial Bold.ttf'))
+        
+        # Создаем PDF
+        buffer = BytesIO()
+        width, height = A4[1], A4[0]  # Альбомная ориентация
+        
+        pdf = canvas.Canvas(buffer, pagesize=(width, height))
+        pdf._doc.setProducer('eesi.kg PDF Generator')
+        pdf._doc.setAuthor('eesi.kg')
+        
+        # Желтый фон
+        pdf.setFillColor(colors.HexColor('#FFD700'))
+        pdf.rect(0, 0, width, height, fill=True)
+        
+        # QR код размеры и позиция
+        qr_size = 400
+        qr_x = width - qr_size - 60
+        qr_y = (height - qr_size) // 2
+        
+        # Создаем QR код
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_H,
+            box_size=12,
+            border=2,
+        )
+        qr.add_data(self.get_qr_url())
+        qr.make(fit=True)
+        qr_img = qr.make_image(fill_color="black", back_color="white")
+        
+        # Единый стиль для всего текста
+        style = ParagraphStyle(
+            'UnifiedStyle',
+            fontName='ArialBold',
+            fontSize=55,
+            leading=60,
+            alignment=0,
+            textColor=colors.white,
+            spaceAfter=0,
+        )
+        
+        # Получаем текст для отображения
+        display_texts = self._get_property_display_text()
+        
+        # Расчет позиций для точного выравнивания по высоте QR кода
+        num_lines = len([text for text in display_texts if text.strip()])
+        line_height = qr_size / num_lines  # Равномерно распределяем по высоте QR кода
+        
+        # Отрисовка текста
+        left_margin = 60
+        available_width = qr_x - left_margin - 50
+        
+        # Начинаем с того же уровня, где начинается QR код
+        y_position = qr_y + qr_size  # Начальная позиция совпадает с верхней границей QR кода
+        
+        for text in display_texts:
+            if text.strip():
+                p = Paragraph(text.encode('utf-8').decode('utf-8'), style)
+                w, h = p.wrap(available_width, line_height)
+                p.drawOn(pdf, left_margin, y_position - h)  # Отрисовываем текст
+                y_position -= line_height  # Смещаемся вниз на высоту строки
+        
+        # Логотип
+        pdf.setFont('ArialBold', 55)
+        pdf.setFillColor(colors.white)
+        logo_text = 'eesi.kg'.encode('utf-8').decode('utf-8')
+        pdf.drawString(left_margin, 50, logo_text)
+        
+        # Белый фон под QR код
+        pdf.setFillColor(colors.white)
+        pdf.rect(qr_x - 10, qr_y - 10, qr_size + 20, qr_size + 20, fill=True)
+        
+        # Размещаем QR код
+        qr_buffer = BytesIO()
+        qr_img.save(qr_buffer, format='PNG')
+        qr_buffer.seek(0)
+        pdf.drawImage(ImageReader(qr_buffer), qr_x, qr_y, width=qr_size, height=qr_size)
+        
+        # Инструкция для QR кода
+        pdf.setFont('ArialBold', 14)
+        instruction = "наведите камеру на QR-код, чтобы открыть объявление"
+        instruction = instruction.encode('utf-8').decode('utf-8')
+        text_width = pdf.stringWidth(instruction, 'ArialBold', 14)
+        x_position = qr_x + (qr_size - text_width) / 2
+        pdf.drawString(x_position, qr_y + qr_size + 25, instruction)
+        
+        # Сохраняем PDF
+        pdf.save()
+        return buffer.getvalue()
+
+    @property
+    def qr_code_name(self):
+        return f"qr_codes/{self.public_id}.pdf"
+
+    def generate_qr_code(self):
+        """Генерируем PDF с QR-кодом и сохраняем его в хранилище (выполняется в Celery)"""
+        from applications.real_estate.storage import get_qr_code_storage
+
+        storage = get_qr_code_storage()
+        content = self._render_qr_code_pdf()
+        storage.delete(self.qr_code_name)
+        name = storage.save(self.qr_code_name, ContentFile(content))
+
+        self.qr_code = storage.url(name)
+        self.qr_status = self.QR_STATUS_READY
+        self._qr_needs_regeneration = False
+        RealEstateAd.objects.filter(pk=self.pk).update(qr_code=self.qr_code, qr_status=self.qr_status)
+
+    def schedule_qr_code(self):
+        """Ставим генерацию QR-кода в очередь после коммита транзакции"""
+        from applications.real_estate.tasks import async_regenerate_qr
+
+        ad_id, model_label = self.pk, self._meta.label
+        transaction.on_commit(lambda: async_regenerate_qr.delay(ad_id, model_label))
+
+    def regenerate_qr_code(self):
+        """Явная перегенерация QR-кода"""
+        self.qr_status = self.QR_STATUS_PENDING
+        RealEstateAd.objects.filter(pk=self.pk).update(qr_status=self.qr_status)
+        self.schedule_qr_code()
 
     def get_qr_pdf_url(self):
         """Получить URL PDF файла с QR кодом"""
@@ -807,80 +863,209 @@ class RealEstateAd(models.Model):
         """Установка координат"""
         from django.contrib.gis.geos import Point
         if lat is not None and lon is not None:
-            self.location = Point(float(lon), float(lat))
+            self.location = Point(float(lon), float(lat), srid=4326)
             self.latitude = lat
             self.longitude = lon
             
     def calculate_price_kgs(self):
         """Calculate price in KGS based on current exchange rate"""
-        try:
-            exchange_rate = ExchangeRate.objects.latest('updated_at')
-            if self.currency == 'USD':
-                self.price_kgs = self.price * exchange_rate.rate
-            else:
-                self.price_kgs = self.price
-        except ExchangeRate.DoesNotExist:
-            # If no exchange rate is set, keep the existing value
-            pass
+        if self.currency != 'USD':
+            self.price_kgs = self.price
+            return
+        rate = ExchangeRate.get_current_rate()
+        if rate is not None:
+            self.price_kgs = self.price * rate
+        # If no exchange rate is set, keep the existing value
+
+    @classmethod
+    def recompute_price_kgs(cls, rate):
+        """Цены в сомах долларовых объявлений по новому курсу одним UPDATE"""
+        price_kgs = ExchangeRate.price_kgs_expression(rate)
+        return cls.objects.filter(currency='USD').exclude(price_kgs=price_kgs).update(price_kgs=price_kgs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные значения, чтобы save() обходился без повторного чтения строки
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+
+    def has_changed(self, field_name):
+        """Изменилось ли поле с момента загрузки из базы (для новых объектов - всегда True)"""
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None or field_name not in loaded_values:
+            return True
+        return loaded_values[field_name] != getattr(self, field_name)
+
+    def _update_derived_fields(self):
+        """Вычисляем производные поля до записи; возвращаем имена изменившихся полей"""
+        before = {name: getattr(self, name) for name in self.DERIVED_FIELDS}
 
-    def save(self, *args, **kwargs):
-        if self.is_approved and self.approved_at:
-            self.is_active = True
-        
         if self.is_expired:
             self.is_active = False
             self.is_approved = False
+        elif self.is_approved:
+            self.is_active = True
+
+        if self.latitude is not None and self.longitude is not None:
+            if not self.location or self.has_changed('latitude') or self.has_changed('longitude'):
+                self.set_location(self.latitude, self.longitude)
+        elif self.location and (self.has_changed('latitude') or self.has_changed('longitude')):
+            self.location = None
+
+        if self.price is not None and (
+            self.price_kgs is None or self.has_changed('price') or self.has_changed('currency')
+        ):
+            self.calculate_price_kgs()
 
-        if self.latitude and self.longitude and not self.location:
-            self.set_location(self.latitude, self.longitude)
-        
-        is_new = not self.pk or self._qr_needs_regeneration
         # Проверяем, был ли удален QR код
-        if self.pk:
-            old_instance = RealEstateAd.objects.get(pk=self.pk)
-            if old_instance.qr_code and not self.qr_code:
-                self._qr_needs_regeneration = True
-        
-        super().save(*args, **kwargs)
-        
-        # Генерируем QR код если нужно
-        if self._qr_needs_regeneration or not self.qr_code:
-            self._generate_qr_code_pdf()
-            if not kwargs.get('update_fields'):
-                super().save(update_fields=['qr_code'])
+        loaded_values = getattr(self, '_loaded_values', {})
+        if loaded_values.get('qr_code') and not self.qr_code:
+            self._qr_needs_regeneration = True
+        if self._qr_needs_regeneration or (
+            not self.qr_code and (self._state.adding or self.qr_status == self.QR_STATUS_FAILED)
+        ):
+            self.qr_status = self.QR_STATUS_PENDING
+            self._qr_needs_regeneration = True
+
+        return {name for name, value in before.items() if getattr(self, name) != value}
+
+    def get_search_document(self):
+        """Текст для поиска: описание (русская морфология) и названия/адрес (без морфологии)"""
+        text = ' '.join(filter(None, [getattr(self, 'title', None), self.description]))
+        names = [self.address]
+        for model, attribute, value in (
+            (Region, 'region', self.region_id),
+            (City, 'city', self.city_id),
+            (District, 'district', self.district_id),
+            (RoomType, 'name', getattr(self, 'rooms_id', None)),
+            (ResidentialComplex, 'name', getattr(self, 'residential_complex_id', None)),
+        ):
+            obj = reference_cache.get(model, value) if value else None
+            names.append(getattr(obj, attribute, None))
+        return text, ' '.join(filter(None, names))
+
+    def build_search_vector(self):
+        text, names = self.get_search_document()
+        return (
+            SearchVector(Value(text), config='russian', weight='A')
+            + SearchVector(Value(names), config='simple', weight='B')
+        )
+
+    # Справочники в поисковом индексе: поле объявления, модель и атрибут с названием
+    SEARCH_REFERENCES = (
+        ('region', Region, 'region'),
+        ('city', City, 'city'),
+        ('district', District, 'district'),
+        ('rooms', RoomType, 'name'),
+        ('residential_complex', ResidentialComplex, 'name'),
+    )
 
-        if self.is_approved and self.approved_at:
-            self.is_active = True
-        
-        if self.is_expired:
-            self.is_active = False
-            self.is_approved = False
-        elif self.is_approved:
-            self.is_active = True
+    @classmethod
+    def update_search_vectors(cls, model, missing=False, **lookups):
+        """
+        Поисковый индекс объявлений типа model одним UPDATE: тот же документ,
+        что у build_search_vector, но собирается в базе. lookups - равенства по
+        полям объявления (region=pk и т.п.), missing - только объявления без индекса.
+        Возвращает число обновленных объявлений.
+        """
+        quote = connection.ops.quote_name
+        fields = {field.name: field for field in model._meta.concrete_fields}
+        local_fields = {field.name for field in model._meta.local_concrete_fields}
+
+        def column(name):
+            return f"{'child' if name in local_fields else 'ad'}.{quote(fields[name].column)}"
+
+        names = [column('address')]
+        for name, reference, attribute in cls.SEARCH_REFERENCES:
+            if name in fields:
+                names.append(
+                    f"(SELECT {quote(attribute)} FROM {quote(reference._meta.db_table)} "
+                    f"WHERE {quote(reference._meta.pk.column)} = {column(name)})"
+                )
+        text = [column('title')] if 'title' in fields else []
+
+        conditions = [f"ad.{quote(cls._meta.pk.column)} = child.{quote(model._meta.pk.column)}"]
+        params = []
+        if missing:
+            conditions.append('ad.search_vector IS NULL')
+        for name, value in lookups.items():
+            conditions.append(f"{column(name)} = %s")
+            params.append(value)
+
+        sql = (
+            f"UPDATE {quote(cls._meta.db_table)} AS ad SET search_vector = "
+            f"setweight(to_tsvector('russian'::regconfig, concat_ws(' ', {', '.join([*text, 'ad.description'])})), 'A') "
+            f"|| setweight(to_tsvector('simple'::regconfig, concat_ws(' ', {', '.join(names)})), 'B') "
+            f"FROM {quote(model._meta.db_table)} AS child WHERE {' AND '.join(conditions)}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
 
-        if self.latitude and self.longitude and not self.location:
-            self.set_location(self.latitude, self.longitude)
-        
-        cache_keys = [
-            f'real_estate_list_{self.ad_type}',
-            f'real_estate_detail_{self.public_id}'
-        ]
-        cache.delete_many(cache_keys)
-        self.calculate_price_kgs()
+    def save(self, *args, **kwargs):
+        changed_fields = self._update_derived_fields()
+        needs_qr_code = self._qr_needs_regeneration
+
+        # Поисковый индекс считается в том же UPDATE
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.SEARCH_SOURCE_FIELDS.intersection(update_fields):
+            self.search_vector = self.build_search_vector()
+            changed_fields.add('search_vector')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | changed_fields
+
+        # Одна запись в каждую таблицу наследования
         super().save(*args, **kwargs)
+        # Выражение не держим на объекте, сам вектор читается только базой
+        self.search_vector = None
+
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+        self.invalidate_responses(getattr(self, 'property_type', None))
+
+        if needs_qr_code:
+            self._qr_needs_regeneration = False
+            self.schedule_qr_code()
+
+    def increment_view(self, viewer=None):
+        """Просмотр попадает в буфер, view_count обновит задача flush_view_counts"""
+        return view_counter.record(self, viewer)
+
+    @classmethod
+    def invalidate_responses(cls, *property_types):
+        """Новое поколение кэша ответов API по типам недвижимости (без типов - для всех)"""
+        bump_generation(cls.RESPONSE_CACHE_GROUP, *property_types)
 
     def delete_qr_code(self):
         """Метод для удаления QR кода"""
         if self.qr_code:
             try:
-                # Получаем public_id из URL
-                public_id = self.qr_code.split('/')[-1].split('.')[0]
-                cloudinary.uploader.destroy(f"qr_codes/{public_id}", resource_type="raw")
+                from applications.real_estate.storage import get_qr_code_storage
+
+                get_qr_code_storage().delete(self.qr_code_name)
                 self.qr_code = None
                 self.save(update_fields=['qr_code'])
             except Exception as e:
                 logger.error(f"Failed to delete QR code for {self.public_id}: {str(e)}")
 
+    @classmethod
+    def update_image_summary(cls, ad_id):
+        """Пересчитываем сводку по фотографиям объявления; updated_at меняется вместе с ней (ETag карточки)"""
+        images = RealEstateAdImage.objects.filter(ad_id=ad_id)
+        summary = images.aggregate(
+            image_count=models.Count('pk'),
+            main_count=models.Count('pk', filter=models.Q(is_main=True)),
+        )
+        main_image = images.first()
+        cls.objects.filter(pk=ad_id).update(
+            image_count=summary['image_count'],
+            has_main_image=summary['main_count'] > 0,
+            main_image_url=main_image.get_url('card') if main_image else None,
+            updated_at=timezone.now(),
+        )
+
     def get_price_display(self):
         """Метод для отображения цены в обеих валютах"""
         if self.currency == 'USD' and self.price_kgs:
@@ -893,8 +1078,10 @@ class RealEstateAd(models.Model):
         indexes = [
             models.Index(fields=['ad_type', 'is_active']),
             models.Index(fields=['created_at', 'is_active']),
+            models.Index(fields=['is_active', '-created_at', '-public_id']),
             models.Index(fields=['price', 'currency']),
             models.Index(fields=['city', 'district']),       
+            GinIndex(fields=['search_vector'], name='real_estate_search_gin'),
         ]
 
 
@@ -943,6 +1130,32 @@ class RealEstateAdImage(models.Model):
         auto_now_add=True,
         verbose_name='Дата загрузки'
     )
+    variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Размеры фото',
+        help_text='URL превью, карточки и полного размера и srcset по ним'
+    )
+    original_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Размер исходника, байт'
+    )
+    optimized_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Размер после оптимизации, байт',
+        help_text='Полный размер в WebP'
+    )
+    optimized_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Оптимизировано'
+    )
 
     class Meta:
         verbose_name = 'Фотография'
@@ -952,6 +1165,57 @@ class RealEstateAdImage(models.Model):
     def __str__(self):
         return f"Фото к объявлению #{self.ad.public_id}"
 
+    def store_variants(self):
+        """Сохраняем URL размеров после загрузки фото; пишем только при изменении"""
+        if self.optimized_at:
+            # Размеры уже сделаны оптимизацией (optimize)
+            return
+        variants = build_image_variants(self.image)
+        if variants != self.variants:
+            self.variants = variants
+            RealEstateAdImage.objects.filter(pk=self.pk).update(variants=variants)
+
+    def get_url(self, variant='full'):
+        """URL размера фото; у фото без сохраненных размеров - исходный"""
+        return self.variants.get(variant) or (self.image.url if self.image else None)
+
+    @property
+    def bytes_saved(self):
+        if self.original_size is None or self.optimized_size is None:
+            return None
+        return self.original_size - self.optimized_size
+
+    def get_source(self):
+        """Исходник для оптимизации: оригинал в Cloudinary без трансформаций"""
+        return self.image.build_url(secure=True)
+
+    @classmethod
+    def optimize(cls, images):
+        """
+        Оптимизация фото пулом процессов (process_image_files) и сохранение
+        размеров одним UPDATE. Возвращает (обработанные фото, ошибки по id).
+        """
+        jobs = [
+            {'id': image.pk, 'source': image.get_source(),
+             'prefix': f"optimized/real_estate/{image.ad_id}/{image.pk}"}
+            for image in images if image.image
+        ]
+        by_id = {image.pk: image for image in images}
+        optimized, errors = [], {}
+        now = timezone.now()
+        for result in process_image_files(jobs):
+            if result['error']:
+                errors[result['id']] = result['error']
+                continue
+            image = by_id[result['id']]
+            image.variants = result['variants']
+            image.original_size = result['original_size']
+            image.optimized_size = result['sizes']['full']
+            image.optimized_at = now
+            optimized.append(image)
+        cls.objects.bulk_update(optimized, ['variants', 'original_size', 'optimized_size', 'optimized_at'])
+        return optimized, errors
+
     def clean(self):
         if self.is_main and RealEstateAdImage.objects.filter(
             ad=self.ad,
@@ -997,3 +1261,18 @@ class MarketingImage(models.Model):
 
     def __str__(self):
         return f"Реклама для {self.get_property_type_display()}"
+
+    @classmethod
+    def get_active_urls(cls, property_type):
+        """Ссылки на активные рекламные изображения для типа недвижимости (из кэша)"""
+        return marketing_images_cache.get(
+            property_type,
+            lambda: [
+                marketing_image.image.url
+                for marketing_image in cls.objects.filter(is_active=True, property_type=property_type)
+                if marketing_image.image
+            ]
+        )
+
+
+marketing_images_cache = TwoLevelCache('marketing_images')
@@ -161,7 +161,7 @@ class RealEstateAdImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = RealEstateAdImage
-        fields = ['image', ]
+        fields = ['image', 'variants']
 
     @extend_schema_field(OpenApiTypes.STR)
     def get_image(self, obj):
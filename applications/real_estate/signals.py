@@ -1,9 +1,15 @@
+from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import pre_save, post_delete, post_save
-from django.dispatch import receiver
-from .models import RealEstateAdImage, RealEstateAd
+from django.dispatch import receiver, Signal
+from .models import RealEstateAdImage, RealEstateAd, MarketingImage, marketing_images_cache
+from .storage import get_qr_code_storage
 import cloudinary.uploader
 from applications.user.tasks import send_approval_email
 
+# Фото объявления оптимизированы одним UPDATE в обход save(): ad_id
+images_optimized = Signal()
+
 
 @receiver(pre_save, sender=RealEstateAdImage)
 def handle_main_image(sender, instance, **kwargs):
@@ -29,13 +35,31 @@ def delete_cloudinary_image(sender, instance, **kwargs):
             next_image.is_main = True
             next_image.save()
 
+    RealEstateAd.update_image_summary(instance.ad_id)
+
+
+@receiver(post_save, sender=RealEstateAdImage)
+def update_image_summary(sender, instance, **kwargs):
+    # Размеры нужны сводке: главное фото в списках - размер карточки
+    instance.store_variants()
+    RealEstateAd.update_image_summary(instance.ad_id)
+
+
+@receiver(post_save, sender=RealEstateAdImage)
+def schedule_image_optimization(sender, instance, created, **kwargs):
+    if created and settings.IMAGE_PIPELINE_ON_UPLOAD:
+        from applications.real_estate.tasks import process_real_estate_images
+
+        ad_id = instance.ad_id
+        transaction.on_commit(lambda: process_real_estate_images.delay(ad_id))
+
 
 @receiver(post_delete, sender=RealEstateAd)
 def delete_associated_files(sender, instance, **kwargs):
     # Delete QR code
     if instance.qr_code:
         try:
-            cloudinary.uploader.destroy(instance.qr_code.public_id)
+            get_qr_code_storage().delete(instance.qr_code_name)
         except:
             pass
 
@@ -52,4 +76,10 @@ def delete_associated_files(sender, instance, **kwargs):
 def notify_on_approval(sender, instance, **kwargs):
     update_fields = kwargs.get('update_fields', None)
     if instance.is_approved and update_fields and 'is_approved' in update_fields:
-        send_approval_email.delay(instance.user.email, instance.public_id)
\ No newline at end of file
+        send_approval_email.delay(instance.user.email, instance.public_id)
+
+
+@receiver(post_save, sender=MarketingImage)
+@receiver(post_delete, sender=MarketingImage)
+def invalidate_marketing_images(sender, instance, **kwargs):
+    marketing_images_cache.invalidate()
@@ -0,0 +1,57 @@
+import cloudinary.uploader
+import cloudinary.utils
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+
+@deconstructible
+class QRCodeStorage(Storage):
+    """
+    Сырые файлы в Cloudinary под фиксированным именем: повторная загрузка
+    перезаписывает файл. Только публичный API cloudinary и хуки Storage Django;
+    префикс имен - как у cloudinary_storage (CLOUDINARY_STORAGE['PREFIX'] или
+    MEDIA_URL), чтобы старые QR-коды удалялись по тем же именам.
+    """
+    resource_type = 'raw'
+
+    def __init__(self, prefix=None):
+        if prefix is None:
+            prefix = getattr(settings, 'CLOUDINARY_STORAGE', {}).get('PREFIX', settings.MEDIA_URL)
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+
+    def public_id(self, name):
+        return name if name.startswith(self.prefix) else f'{self.prefix}{name}'
+
+    def _open(self, name, mode='rb'):
+        raise NotImplementedError('QR-коды отдаются по URL из Cloudinary')
+
+    def _save(self, name, content):
+        content.seek(0)
+        response = cloudinary.uploader.upload(
+            content,
+            public_id=self.public_id(name),
+            resource_type=self.resource_type,
+            overwrite=True,
+            invalidate=True,
+        )
+        return response['public_id']
+
+    def exists(self, name):
+        # Файл перезаписывается, поэтому имя всегда свободно и не получает суффикс
+        return False
+
+    def delete(self, name):
+        response = cloudinary.uploader.destroy(
+            self.public_id(name), resource_type=self.resource_type, invalidate=True
+        )
+        return response.get('result') == 'ok'
+
+    def url(self, name):
+        return cloudinary.utils.cloudinary_url(self.public_id(name), resource_type=self.resource_type, secure=True)[0]
+
+
+def get_qr_code_storage():
+    """Хранилище PDF с QR-кодами (settings.QR_CODE_STORAGE), в тестах - FileSystemStorage"""
+    return import_string(settings.QR_CODE_STORAGE)()
@@ -1,22 +1,92 @@
 from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.apps import apps
+from django.core.cache import cache
 
-from applications.real_estate.models import RealEstateAd
+from applications.common.metrics import metrics_registry
+from applications.real_estate.models import RealEstateAd, RealEstateAdImage
+from applications.real_estate.signals import images_optimized
 
+logger = get_task_logger(__name__)
 
-@shared_task
-def async_regenerate_qr(ad_id):
-    ad = RealEstateAd.objects.get(pk=ad_id)
-    ad.regenerate_qr_code()
 
-    
+@shared_task(bind=True, max_retries=3)
+def async_regenerate_qr(self, ad_id, model_label='real_estate.RealEstateAd'):
+    """Генерация PDF с QR-кодом; повторный запуск для готового QR-кода ничего не делает"""
+    model = apps.get_model(model_label)
+    try:
+        ad = model.objects.get(pk=ad_id)
+    except model.DoesNotExist:
+        logger.error(f"Объявление {ad_id} не найдено")
+        return
+
+    if ad.qr_status == RealEstateAd.QR_STATUS_READY and ad.qr_code:
+        return
+
+    try:
+        ad.generate_qr_code()
+    except Exception as exc:
+        logger.error(f"Ошибка генерации QR-кода для {ad_id}: {exc}")
+        if self.request.retries >= self.max_retries:
+            RealEstateAd.objects.filter(pk=ad_id).update(qr_status=RealEstateAd.QR_STATUS_FAILED)
+            raise
+        raise self.retry(exc=exc, countdown=60)
+
+
+IMAGE_PIPELINE_LOCK_TIMEOUT = 30 * 60
+
+
+def optimize_ad_images(ad_id, images):
+    """Оптимизация фото одного объявления, сводка по фото и метрики"""
+    optimized, errors = RealEstateAdImage.optimize(images)
+    for image_id, error in errors.items():
+        logger.error(f"Не удалось оптимизировать фото {image_id} объявления {ad_id}: {error}")
+    if optimized:
+        # Главное фото в списках - размер карточки; UPDATE выше сигналы не вызывает
+        RealEstateAd.update_image_summary(ad_id)
+        images_optimized.send(sender=RealEstateAdImage, ad_id=ad_id)
+
+    bytes_saved = sum(image.bytes_saved for image in optimized)
+    metrics_registry.record([
+        ('image_pipeline_images_total', {'result': 'ok'}, len(optimized)),
+        ('image_pipeline_images_total', {'result': 'error'}, len(errors)),
+        ('image_pipeline_bytes_saved_total', {}, bytes_saved),
+    ])
+    logger.info(f"Объявление {ad_id}: оптимизировано фото {len(optimized)}, ошибок {len(errors)}, "
+                f"сэкономлено {bytes_saved} байт")
+    return optimized, errors
+
+
+@shared_task(bind=True, max_retries=10)
+def process_real_estate_images(self, ad_id):
+    """
+    Оптимизация новых фото объявления одной задачей: фото обрабатываются в пуле
+    процессов. Пока идет обработка объявления, повторные задачи откладываются и
+    потом забирают фото, загруженные за это время.
+    """
+    lock = f'image-pipeline:{ad_id}'
+    if not cache.add(lock, 1, IMAGE_PIPELINE_LOCK_TIMEOUT):
+        raise self.retry(countdown=30)
+    try:
+        attempted = set()
+        while True:
+            images = list(
+                RealEstateAdImage.objects.filter(ad_id=ad_id, optimized_at__isnull=True).exclude(pk__in=attempted)
+            )
+            if not images:
+                return
+            attempted.update(image.pk for image in images)
+            optimize_ad_images(ad_id, images)
+    finally:
+        cache.delete(lock)
 
-@shared_task
-def process_real_estate_images(ad_id):
-    ad = RealEstateAd.objects.get(public_id=ad_id)
-    for image in ad.images.all():
-        optimize_image.delay(image.id)
 
 @shared_task
 def optimize_image(image_id):
-    from PIL import Image
-    image = RealEstateAdImage.objects.get(id=image_id)      
\ No newline at end of file
+    """Повторная оптимизация одного фото (например, после замены файла)"""
+    try:
+        image = RealEstateAdImage.objects.get(pk=image_id)
+    except RealEstateAdImage.DoesNotExist:
+        logger.error(f"Фото {image_id} не найдено")
+        return
+    optimize_ad_images(image.ad_id, [image])
@@ -1,3 +1,157 @@
-from django.test import TestCase
+import pytest
+from PIL import Image
 
-# Create your tests here.
+from applications.common import images
+from applications.real_estate_advertisement.models import ApartmentAd
+from .models import RealEstateAd, RealEstateAdImage
+from .tasks import async_regenerate_qr, process_real_estate_images
+
+# Ориентация EXIF 6: камера повернута, пиксели нужно повернуть на 90° по часовой
+EXIF_ORIENTATION = 0x0112
+
+
+@pytest.fixture
+def pipeline(settings, tmp_path, monkeypatch):
+    """Оптимизация в процессе теста и в FileSystemStorage во временном каталоге"""
+    settings.IMAGE_PIPELINE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.MEDIA_URL = '/media/'
+    settings.IMAGE_PIPELINE_WORKERS = 1
+    settings.IMAGE_WATERMARK_PATH = ''
+    # Хранилище создается один раз на процесс: в каждом тесте - заново
+    monkeypatch.setattr(images, 'worker_context', {})
+    return tmp_path
+
+
+@pytest.fixture
+def photo(tmp_path):
+    """JPEG 2400x1600, снятый повернутой камерой: после поворота 1600x2400"""
+    path = tmp_path / 'photo.jpg'
+    image = Image.new('RGB', (2400, 1600), (200, 40, 40))
+    image.paste((40, 40, 200), (0, 0, 1200, 800))
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    image.save(path, 'JPEG', quality=95, exif=exif.tobytes())
+    return path
+
+
+def stored(pipeline, url):
+    return Image.open(pipeline / 'media' / url.removeprefix('/media/'))
+
+
+def test_process_image_files_writes_webp_variants(pipeline, photo):
+    [result] = images.process_image_files([{'id': 1, 'source': str(photo), 'prefix': 'optimized/test/1'}])
+
+    assert result['error'] is None
+    assert result['original_size'] == photo.stat().st_size
+    assert set(result['variants']) == {'thumbnail', 'card', 'full', 'srcset'}
+    expected_sizes = {'full': (1600, 2400), 'card': (640, 960), 'thumbnail': (320, 240)}
+    for name, size in expected_sizes.items():
+        assert result['variants'][name] == f'/media/optimized/test/1_{name}.webp'
+        with stored(pipeline, result['variants'][name]) as variant:
+            assert variant.format == 'WEBP'
+            assert variant.size == size
+            assert EXIF_ORIENTATION not in variant.getexif()
+        assert result['sizes'][name] == (pipeline / 'media' / f'optimized/test/1_{name}.webp').stat().st_size
+    assert result['sizes']['full'] < result['original_size']
+
+
+def test_process_image_files_in_process_pool(pipeline, photo, settings):
+    """Несколько процессов: результаты в порядке заданий, ошибка одного фото не мешает остальным"""
+    settings.IMAGE_PIPELINE_WORKERS = 2
+    results = images.process_image_files([
+        {'id': 1, 'source': str(photo), 'prefix': 'optimized/test/1'},
+        {'id': 2, 'source': str(pipeline / 'missing.jpg'), 'prefix': 'optimized/test/2'},
+    ])
+
+    assert [result['id'] for result in results] == [1, 2]
+    assert results[0]['error'] is None
+    assert results[1]['error'].startswith('FileNotFoundError')
+    with stored(pipeline, results[0]['variants']['card']) as card:
+        assert card.size == (640, 960)
+
+
+@pytest.mark.django_db
+def test_process_real_estate_images_saves_variants(pipeline, photo, user, monkeypatch):
+    monkeypatch.setattr(RealEstateAdImage, 'get_source', lambda image: str(photo))
+    ad = ApartmentAd.objects.create(user=user, price=4_500_000, currency='KGS', total_area=54)
+    image = RealEstateAdImage.objects.create(ad=ad, image='image/upload/v1/real_estate/photo.jpg', is_main=True)
+
+    process_real_estate_images(ad.pk)
+
+    image.refresh_from_db()
+    prefix = f'/media/optimized/real_estate/{ad.pk}/{image.pk}'
+    assert image.variants['full'] == f'{prefix}_full.webp'
+    assert image.variants['srcset'].startswith(f'{prefix}_thumbnail.webp 320w')
+    assert image.original_size == photo.stat().st_size
+    assert image.optimized_size == (pipeline / 'media' / image.variants['full'].removeprefix('/media/')).stat().st_size
+    assert image.optimized_at is not None
+    assert RealEstateAd.objects.get(pk=ad.pk).main_image_url == image.variants['card']
+
+    # Оптимизированные фото повторно не обрабатываются
+    monkeypatch.setattr(images, 'process_image_file', pytest.fail)
+    process_real_estate_images(ad.pk)
+
+
+@pytest.fixture
+def qr_storage(settings, tmp_path):
+    settings.QR_CODE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.MEDIA_URL = '/media/'
+    return tmp_path / 'media'
+
+
+@pytest.fixture
+def qr_ad(user):
+    ad = ApartmentAd.objects.create(user=user, price=4_500_000, currency='KGS', total_area=54)
+    assert ad.qr_status == RealEstateAd.QR_STATUS_PENDING
+    return ad
+
+
+def qr_state(ad):
+    return RealEstateAd.objects.values_list('qr_status', 'qr_code').get(pk=ad.pk)
+
+
+@pytest.mark.django_db
+def test_async_regenerate_qr_saves_pdf_once(qr_storage, qr_ad, monkeypatch):
+    async_regenerate_qr.apply(args=(qr_ad.pk, qr_ad._meta.label))
+
+    assert qr_state(qr_ad) == (RealEstateAd.QR_STATUS_READY, f'/media/qr_codes/{qr_ad.pk}.pdf')
+    assert (qr_storage / 'qr_codes' / f'{qr_ad.pk}.pdf').read_bytes().startswith(b'%PDF')
+
+    # Повторный запуск для готового QR-кода ничего не делает
+    monkeypatch.setattr(RealEstateAd, 'generate_qr_code', pytest.fail)
+    assert async_regenerate_qr.apply(args=(qr_ad.pk, qr_ad._meta.label)).successful()
+
+
+@pytest.mark.django_db
+def test_async_regenerate_qr_overwrites_file(qr_storage, qr_ad):
+    """Перегенерация пишет файл под тем же именем, без суффиксов хранилища"""
+    async_regenerate_qr.apply(args=(qr_ad.pk, qr_ad._meta.label))
+    RealEstateAd.objects.filter(pk=qr_ad.pk).update(qr_status=RealEstateAd.QR_STATUS_PENDING, qr_code=None)
+    async_regenerate_qr.apply(args=(qr_ad.pk, qr_ad._meta.label))
+
+    assert qr_state(qr_ad) == (RealEstateAd.QR_STATUS_READY, f'/media/qr_codes/{qr_ad.pk}.pdf')
+    assert [path.name for path in (qr_storage / 'qr_codes').iterdir()] == [f'{qr_ad.pk}.pdf']
+
+
+@pytest.mark.django_db
+def test_async_regenerate_qr_retries_then_fails(qr_storage, qr_ad, monkeypatch):
+    attempts = []
+
+    def broken_render(ad):
+        attempts.append(ad.pk)
+        raise OSError('хранилище недоступно')
+
+    monkeypatch.setattr(RealEstateAd, '_render_qr_code_pdf', broken_render)
+    result = async_regenerate_qr.apply(args=(qr_ad.pk, qr_ad._meta.label))
+
+    assert result.failed()
+    assert len(attempts) == async_regenerate_qr.max_retries + 1
+    assert qr_state(qr_ad) == (RealEstateAd.QR_STATUS_FAILED, None)
+
+    # После ошибки сохранение объявления снова ставит QR-код в очередь
+    monkeypatch.undo()
+    ad = ApartmentAd.objects.get(pk=qr_ad.pk)
+    ad.save()
+    assert qr_state(qr_ad) == (RealEstateAd.QR_STATUS_PENDING, None)
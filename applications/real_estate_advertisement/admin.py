@@ -10,7 +10,7 @@ from django import forms
 
 from applications.real_estate.models import RealEstateAd
 from applications.real_estate_advertisement.models import (
-    ApartmentAd, HouseAd, CommercialAd, RoomAd, PlotAd, DachaAd, ParkingAd
+    ApartmentAd, HouseAd, CommercialAd, RoomAd, PlotAd, DachaAd, ParkingAd, ListingIndex
 )
 from applications.real_estate.admin import RealEstateAdImageInline, RealEstatePhoneNumberInline
 
@@ -145,7 +145,7 @@ class BaseRealEstateAdmin(admin.ModelAdmin):
          'approve_ads', 'deactivate_ads'
     ]
     readonly_fields = ['user', 'is_active', 'public_id', 'created_at', 'updated_at',
-                       'display_latitude', 'display_longitude', 'qr_preview', 'property_type', 'is_active', 'view_count',
+                       'display_latitude', 'display_longitude', 'qr_preview', 'property_type', 'is_active', 'view_count', 'qr_status',
                        ]
     autocomplete_fields = ['region', 'city', 'district', 'telephone']
     date_hierarchy = 'created_at'
@@ -170,7 +170,7 @@ class BaseRealEstateAdmin(admin.ModelAdmin):
             'fields': ('price', 'currency', 'price_kgs', 'is_total_price', 'exchange', 'installment', 'mortgage')
         }),
         (_('Статус объявления'), {
-            'fields': ('subscription', 'is_featured', 'view_count', 'qr_code', )
+            'fields': ('subscription', 'is_featured', 'view_count', 'qr_code', 'qr_status', )
         }),
     )
 
@@ -201,12 +201,16 @@ class BaseRealEstateAdmin(admin.ModelAdmin):
             self.message_user(request, "У вас нет разрешения на одобрение рекламы", level='ERROR')
             return
 
+        # Список pk до обновления: фильтр списка по is_active после update уже не выберет эти объявления
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(
             is_approved=True,
             approved_by=request.user,
             approved_at=timezone.now(),
             is_active=True
         )
+        ListingIndex.objects.filter(ad_id__in=pks).update(is_active=True)
+        RealEstateAd.invalidate_responses(*ListingIndex.objects.property_types(pks))
         self.message_user(request, f"{updated} ads approved")
 
     @admin.action(description='Деактивировать выбранные объявления')
@@ -215,7 +219,10 @@ class BaseRealEstateAdmin(admin.ModelAdmin):
             self.message_user(request, "У вас нет разрешения на отключение рекламы", level='ERROR')
             return
 
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=False)
+        ListingIndex.objects.filter(ad_id__in=pks).update(is_active=False)
+        RealEstateAd.invalidate_responses(*ListingIndex.objects.property_types(pks))
         self.message_user(request, f"{updated} ads deactivated")
 
     def has_change_permission(self, request, obj=None):
@@ -240,7 +247,7 @@ class BaseRealEstateAdmin(admin.ModelAdmin):
 
     def qr_preview(self, obj):
         if obj.qr_code:
-            return obj.qr_code.image(transformation={'width': 100, 'crop': 'fill'})
+            return format_html('<a href="{}" target="_blank">PDF</a>', obj.qr_code)
         return "-"
 
     qr_preview.allow_tags = True
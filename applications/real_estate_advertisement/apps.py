@@ -6,3 +6,5 @@ class AdvertisementConfig(AppConfig):
     name = 'applications.real_estate_advertisement'
     verbose_name = '1. ОБЪЯВЛЕНИЯ НЕДВИЖИМОСТИ'
 
+    def ready(self):
+        import applications.real_estate_advertisement.signals
@@ -1,18 +1,33 @@
 import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
 from django_filters import rest_framework as filters
 
-from applications.common.models import Region, City, District, Currency, Exchange
+from applications.common.filters import CachedModelChoiceFilter, CachedModelMultipleChoiceFilter, DistanceFilter, \
+    BBoxFilter, PolygonFilter
+from applications.common.models import Region, City, District, Exchange
 from .models import (
     RealEstateAd, ApartmentAd, HouseAd, CommercialAd,
     RoomAd, DachaAd, PlotAd, ParkingAd, BuildingType, Series,
-    ResidentialComplex, RoomType
+    ResidentialComplex, RoomType, ListingIndex, PropertyTypeChoices
 )
 from ..real_estate.models import ConditionType, Document, ObjectType, Furniture, Developer
 
 
 class PriceRangeFilter(django_filters.FilterSet):
-    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
-    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    # Цена в сомах: объявления в USD и KGS сравниваются по одной шкале
+    min_price = django_filters.NumberFilter(field_name='price_kgs', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price_kgs', lookup_expr='lte')
+    order_by = django_filters.OrderingFilter(
+        fields=(
+            ('price_kgs', 'price'),
+            ('created_at', 'created_at'),
+        ),
+        field_labels={
+            'price_kgs': 'Цена',
+            'created_at': 'Дата создания',
+        }
+    )
 
     class Meta:
         model = RealEstateAd
@@ -28,24 +43,35 @@ class AreaFilter(django_filters.FilterSet):
         fields = ['min_area', 'max_area']
 
 
-class BaseRealEstateFilter(filters.FilterSet):
-    region = django_filters.ModelChoiceFilter(
+class GeoFilter(django_filters.FilterSet):
+    """Поиск на карте: радиус вокруг точки, видимая область и нарисованный полигон"""
+    near = DistanceFilter(field_name='location', label='Радиус: lat,lon,км')
+    bbox = BBoxFilter(field_name='location', label='Область карты: min_lon,min_lat,max_lon,max_lat')
+    polygon = PolygonFilter(field_name='location', label='Полигон (GeoJSON или WKT)')
+
+    class Meta:
+        model = RealEstateAd
+        fields = ['near', 'bbox', 'polygon']
+
+
+class BaseRealEstateFilter(GeoFilter, filters.FilterSet):
+    region = CachedModelChoiceFilter(
         field_name='region',
         queryset=Region.objects.all()
     )
-    city = django_filters.ModelChoiceFilter(
+    city = CachedModelChoiceFilter(
         field_name='city',
         queryset=City.objects.all()
     )
-    district = django_filters.ModelChoiceFilter(
+    district = CachedModelChoiceFilter(
         field_name='district',
         queryset=District.objects.all()
     )
-    condition = django_filters.ModelChoiceFilter(
+    condition = CachedModelChoiceFilter(
         field_name='condition',
         queryset=ConditionType.objects.all()
     )
-    documents = django_filters.ModelMultipleChoiceFilter(
+    documents = CachedModelMultipleChoiceFilter(
         field_name='document',
         queryset=Document.objects.all()
     )
@@ -59,20 +85,27 @@ class BaseRealEstateFilter(filters.FilterSet):
         ]
 
 
+class RealEstateMapFilter(BaseRealEstateFilter, PriceRangeFilter):
+    """Фильтр карты по всем типам недвижимости"""
+
+    class Meta(BaseRealEstateFilter.Meta):
+        model = RealEstateAd
+
+
 class ApartmentAdFilter(BaseRealEstateFilter, PriceRangeFilter, AreaFilter):
-    rooms = django_filters.ModelChoiceFilter(
+    rooms = CachedModelChoiceFilter(
         field_name='rooms',
         queryset=RoomType.objects.all()
     )
-    seria = django_filters.ModelChoiceFilter(
+    seria = CachedModelChoiceFilter(
         field_name='series',
         queryset=Series.objects.all()
     )
-    building_type = django_filters.ModelChoiceFilter(
+    building_type = CachedModelChoiceFilter(
         field_name='building_type',
         queryset=BuildingType.objects.all()
     )
-    residential_complex = django_filters.ModelChoiceFilter(
+    residential_complex = CachedModelChoiceFilter(
         field_name='residential_complex',
         queryset=ResidentialComplex.objects.all()
     )
@@ -89,13 +122,13 @@ class ApartmentAdFilter(BaseRealEstateFilter, PriceRangeFilter, AreaFilter):
 
 
 class HouseAdFilter(BaseRealEstateFilter, PriceRangeFilter, AreaFilter):
-    rooms = django_filters.ModelChoiceFilter(
+    rooms = CachedModelChoiceFilter(
         field_name='rooms',
         queryset=RoomType.objects.all()
     )
     floor = django_filters.RangeFilter()
     total_area = django_filters.RangeFilter()
-    building_type = django_filters.ModelChoiceFilter(
+    building_type = CachedModelChoiceFilter(
         field_name='building_type',
         queryset=BuildingType.objects.all()
     )
@@ -108,12 +141,12 @@ class HouseAdFilter(BaseRealEstateFilter, PriceRangeFilter, AreaFilter):
 
 
 class CommercialAdFilter(BaseRealEstateFilter, PriceRangeFilter, AreaFilter):
-    object_type = django_filters.ModelChoiceFilter(
+    object_type = CachedModelChoiceFilter(
         queryset=ObjectType.objects.all()
     )
     floor = django_filters.RangeFilter()
     max_floor = django_filters.RangeFilter()
-    building_type = django_filters.ModelChoiceFilter(
+    building_type = CachedModelChoiceFilter(
         field_name='building_type',
         queryset=BuildingType.objects.all()
     )
@@ -126,7 +159,7 @@ class CommercialAdFilter(BaseRealEstateFilter, PriceRangeFilter, AreaFilter):
 
 
 class RoomAdFilter(BaseRealEstateFilter, PriceRangeFilter):
-    rooms = django_filters.ModelChoiceFilter(
+    rooms = CachedModelChoiceFilter(
         field_name='rooms',
         queryset=RoomType.objects.all()
     )
@@ -141,11 +174,11 @@ class RoomAdFilter(BaseRealEstateFilter, PriceRangeFilter):
 
 
 class DachaAdFilter(BaseRealEstateFilter, PriceRangeFilter, AreaFilter):
-    rooms = django_filters.ModelChoiceFilter(
+    rooms = CachedModelChoiceFilter(
         field_name='rooms',
         queryset=RoomType.objects.all()
     )
-    building_type = django_filters.ModelChoiceFilter(
+    building_type = CachedModelChoiceFilter(
         field_name='building_type',
         queryset=BuildingType.objects.all()
     )
@@ -162,8 +195,8 @@ class PlotAdFilter(BaseRealEstateFilter, PriceRangeFilter):
         fields = BaseRealEstateFilter.Meta.fields
 
 
-class ParkingAdFilter(PriceRangeFilter):
-    residential_complex = django_filters.ModelChoiceFilter(
+class ParkingAdFilter(GeoFilter, PriceRangeFilter):
+    residential_complex = CachedModelChoiceFilter(
         queryset=ResidentialComplex.objects.all()
     )
 
@@ -173,97 +206,115 @@ class ParkingAdFilter(PriceRangeFilter):
 
 
 class MainPageFilter(PriceRangeFilter, AreaFilter):
-    PROPERTY_TYPE_CHOICES = (
-        ('apartment', 'Квартиры'),
-        ('house', 'Дома'),
-        ('commercial', 'Коммерческие'),
-        ('room', 'Комнаты'),
-        ('plot', 'Участки'),
-        ('dacha', 'Дачи'),
-        ('parking', 'Парковки/Гаражи'),
-    )
-    property_type = filters.ChoiceFilter(choices=PROPERTY_TYPE_CHOICES, method='filter_by_property_type')
-    region = django_filters.ModelChoiceFilter(
+    AD_FIELD_MODELS = {
+        'series': (ApartmentAd,),
+        'building_type': (ApartmentAd, HouseAd, CommercialAd, DachaAd),
+        'floor': (ApartmentAd, HouseAd, CommercialAd, RoomAd),
+        'max_floor': (ApartmentAd, CommercialAd, RoomAd),
+    }
+
+    search = django_filters.CharFilter(method='filter_search')
+    property_type = filters.ChoiceFilter(choices=PropertyTypeChoices.choices)
+    region = CachedModelChoiceFilter(
         field_name='region',
+        to_field_name='region',
         queryset=Region.objects.all()
     )
-    city = django_filters.ModelChoiceFilter(
+    city = CachedModelChoiceFilter(
         field_name='city',
+        to_field_name='city',
         queryset=City.objects.all()
     )
-    district = django_filters.ModelChoiceFilter(
+    district = CachedModelChoiceFilter(
         field_name='district',
+        to_field_name='district',
         queryset=District.objects.all()
     )
-    currency = django_filters.ModelChoiceFilter(
+    currency = django_filters.ChoiceFilter(
         field_name='currency',
-        queryset=Currency.objects.all()
+        choices=RealEstateAd.CURRENCY_CHOICES
     )
-    condition = django_filters.ModelChoiceFilter(
-        field_name='condition',
+    condition = CachedModelChoiceFilter(
+        field_name='ad__condition',
         queryset=ConditionType.objects.all()
     )
-    documents = django_filters.ModelMultipleChoiceFilter(
-        field_name='document',
+    documents = CachedModelMultipleChoiceFilter(
+        field_name='ad__document',
         queryset=Document.objects.all()
     )
-    ceiling_height = django_filters.RangeFilter()
-    rooms = django_filters.ModelChoiceFilter(
+    ceiling_height = django_filters.RangeFilter(field_name='ad__ceiling_height')
+    rooms = CachedModelChoiceFilter(
         field_name='rooms',
         queryset=RoomType.objects.all()
     )
-    seria = django_filters.ModelChoiceFilter(
+    seria = CachedModelChoiceFilter(
         field_name='series',
-        queryset=Series.objects.all()
+        queryset=Series.objects.all(),
+        method='filter_by_ad_field'
     )
-    exchange = django_filters.ModelChoiceFilter(
-        field_name='exchange',
+    exchange = CachedModelChoiceFilter(
+        field_name='ad__exchange',
         queryset=Exchange.objects.all()
     )
-    furniture = django_filters.ModelChoiceFilter(
-        field_name='furniture',
+    furniture = CachedModelChoiceFilter(
+        field_name='ad__furniture',
         queryset=Furniture.objects.all()
     )
-    building_type = django_filters.ModelChoiceFilter(
+    building_type = CachedModelChoiceFilter(
         field_name='building_type',
-        queryset=BuildingType.objects.all()
+        queryset=BuildingType.objects.all(),
+        method='filter_by_ad_field'
     )
-    developer = django_filters.ModelChoiceFilter(
-        field_name='developer',
+    developer = CachedModelChoiceFilter(
+        field_name='residential_complex__developer',
         queryset=Developer.objects.all()
     )
-    residential_complex = django_filters.ModelChoiceFilter(
+    residential_complex = CachedModelChoiceFilter(
         field_name='residential_complex',
         queryset=ResidentialComplex.objects.all()
     )
-    floor = django_filters.RangeFilter()
-    max_floor = django_filters.RangeFilter()
-    elevator = django_filters.BooleanFilter()
+    floor = django_filters.RangeFilter(field_name='floor__floor', method='filter_by_ad_field')
+    max_floor = django_filters.RangeFilter(field_name='max_floor__floor', method='filter_by_ad_field')
+    elevator = django_filters.BooleanFilter(field_name='ad__elevator')
 
     class Meta:
-        model = None  # Will be set dynamically
-        fields = ['region', 'city', 'district', 'currency', 'property_type', 'condition', 'furniture', 'floor',
-                  'max_floor', 'documents', 'exchange', 'seria', 'developer', 'residential_complex',  'rooms',
-                  'building_type', 'condition', 'ceiling_height', 'elevator']
-
-    def filter_by_property_type(self, queryset, name, value):
-        model_mappings = {
-            'apartment': (ApartmentAd, ApartmentAdFilter),
-            'house': (HouseAd, HouseAdFilter),
-            'commercial': (CommercialAd, CommercialAdFilter),
-            'room': (RoomAd, RoomAdFilter),
-            'plot': (PlotAd, PlotAdFilter),
-            'dacha': (DachaAd, DachaAdFilter),
-            'parking': (ParkingAd, ParkingAdFilter),
-        }
-
-        if value in model_mappings:
-            model_class, filter_class = model_mappings[value]
-            # Create a new queryset for the specific model
-            model_queryset = model_class.objects.filter(is_active=True)
-
-            # Apply model-specific filters
-            model_filter = filter_class(self.request.query_params, queryset=model_queryset)
-            return model_filter.qs
+        model = ListingIndex
+        fields = ['search', 'property_type', 'region', 'city', 'district', 'currency', 'condition', 'furniture',
+                  'floor', 'max_floor', 'documents', 'exchange', 'seria', 'developer', 'residential_complex',
+                  'rooms', 'building_type', 'ceiling_height', 'elevator']
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по индексу объявления, самые релевантные - первыми"""
+        query = (
+            SearchQuery(value, config='russian', search_type='websearch')
+            | SearchQuery(value, config='simple', search_type='websearch')
+        )
+        return queryset.filter(ad__search_vector=query).annotate(
+            rank=SearchRank(F('ad__search_vector'), query)
+        ).order_by('-rank', '-created_at')
+
+    def filter_by_ad_field(self, queryset, name, value):
+        """Фильтр по полю, которое есть только у части типов недвижимости"""
+        if isinstance(value, slice):
+            lookups = {}
+            if value.start is not None:
+                lookups[f'{name}__gte'] = value.start
+            if value.stop is not None:
+                lookups[f'{name}__lte'] = value.stop
+        else:
+            lookups = {name: value}
+        if not lookups:
+            return queryset
+
+        property_type = self.form.cleaned_data.get('property_type')
+        ad_models = [
+            model for model in self.AD_FIELD_MODELS[name.split('__')[0]]
+            if not property_type or model._meta.get_field('property_type').default == property_type
+        ]
+        if not ad_models:
+            return queryset.none()
 
-        return queryset.none()
+        condition = Q()
+        for model in ad_models:
+            condition |= Q(ad_id__in=model.objects.filter(**lookups).values('pk'))
+        return queryset.filter(condition)
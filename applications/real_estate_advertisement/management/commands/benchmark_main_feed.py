@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from applications.real_estate_advertisement.filters import MainPageFilter
+from applications.real_estate_advertisement.models import ListingIndex
+from applications.real_estate_advertisement.views import MainPageViewSet
+
+SCENARIOS = (
+    ('без фильтров', {}),
+    ('глубокая страница', {'page': 50}),
+    ('тип недвижимости', {'property_type': 'apartments'}),
+    ('диапазон цены', {'min_price': 30000, 'max_price': 60000}),
+    ('цена и площадь', {'property_type': 'apartments', 'min_price': 30000, 'max_price': 60000,
+                        'min_area': 40, 'max_area': 80}),
+    ('поиск', {'search': 'Бишкек'}),
+)
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время ответа ленты главной страницы на текущей базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--explain', action='store_true', help='Вывести план запроса для каждого сценария')
+
+    def handle(self, *args, **options):
+        view = MainPageViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        # Авторизованный запрос обходит кэш ответов: иначе повторы меряют чтение из кэша, а не запрос
+        user = get_user_model()(email='benchmark@example.com')
+
+        self.stdout.write(f"Объявлений в ленте: {ListingIndex.objects.count()}")
+        for name, params in SCENARIOS:
+            timings = []
+            sql_time = 0
+            queries = 0
+            count = None
+            for _ in range(options['repeat']):
+                request = factory.get('/api/real-estate/main/', params)
+                force_authenticate(request, user=user)
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries = len(context.captured_queries)
+                sql_time = sum(float(query['time']) for query in context.captured_queries) * 1000
+                count = response.data.get('count')
+
+            self.stdout.write(
+                f"{name}: найдено={count} запросов={queries} sql={sql_time:.1f}ms "
+                f"median={statistics.median(timings):.1f}ms max={max(timings):.1f}ms"
+            )
+            if options['explain']:
+                queryset = MainPageFilter(params, queryset=MainPageViewSet().get_queryset()).qs[:20]
+                self.stdout.write(queryset.explain(analyze=True))
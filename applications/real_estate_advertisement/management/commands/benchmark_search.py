@@ -0,0 +1,54 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from applications.real_estate_advertisement.filters import MainPageFilter
+from applications.real_estate_advertisement.views import MainPageViewSet
+
+QUERIES = ('Бишкек', 'квартира', 'Элитка', 'Джал', 'дом с ремонтом', 'Асанбай')
+
+
+def icontains_search(queryset, value):
+    """Прежняя реализация поиска: OR из icontains по ленте и связанным таблицам"""
+    return queryset.filter(
+        Q(title__icontains=value) |
+        Q(ad__description__icontains=value) |
+        Q(address__icontains=value) |
+        Q(region__region__icontains=value) |
+        Q(city__city__icontains=value) |
+        Q(rooms__name__icontains=value) |
+        Q(residential_complex__name__icontains=value)
+    ).distinct()
+
+
+def fulltext_search(queryset, value):
+    return MainPageFilter({'search': value}, queryset=queryset).qs
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает полнотекстовый поиск ленты с прежним поиском через icontains'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help='Поисковые запросы (по умолчанию - типовой набор)')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--explain', action='store_true', help='Вывести планы запросов')
+
+    def handle(self, *args, **options):
+        for value in options['queries'] or QUERIES:
+            for name, search in (('icontains', icontains_search), ('fulltext', fulltext_search)):
+                timings = []
+                for _ in range(options['repeat']):
+                    queryset = search(MainPageViewSet().get_queryset(), value)
+                    started = time.perf_counter()
+                    results = list(queryset[:20].values_list('ad_id', flat=True))
+                    count = queryset.count()
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                self.stdout.write(
+                    f"{value!r} {name}: найдено={count} первые={results[:3]} "
+                    f"median={statistics.median(timings):.1f}ms max={max(timings):.1f}ms"
+                )
+                if options['explain']:
+                    self.stdout.write(queryset[:20].explain(analyze=True))
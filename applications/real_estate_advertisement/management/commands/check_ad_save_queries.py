@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from applications.real_estate_advertisement.signals import AD_MODELS
+
+
+class Command(BaseCommand):
+    help = ('Проверяет число запросов при редактировании объявления: без повторного чтения строки '
+            'и не больше одной записи в каждую таблицу наследования. Изменения откатываются.')
+
+    def handle(self, *args, **options):
+        failures = []
+        for model in AD_MODELS:
+            ad = model.objects.select_related('subscription').order_by('pk').first()
+            if ad is None:
+                self.stdout.write(f"{model._meta.verbose_name_plural}: нет объявлений, пропущено")
+                continue
+
+            tables = {model._meta.db_table, *(parent._meta.db_table for parent in model._meta.get_parent_list())}
+            with transaction.atomic():
+                ad.description = f"{ad.description or ''} "
+                with CaptureQueriesContext(connection) as context:
+                    ad.save()
+                transaction.set_rollback(True)
+
+            reads, writes = 0, 0
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not any(f'"{table}"' in sql for table in tables):
+                    continue
+                if sql.startswith('SELECT') and f'FROM "{ad._meta.db_table}"' in sql:
+                    reads += 1
+                elif sql.startswith('UPDATE') or sql.startswith('INSERT'):
+                    writes += 1
+
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: запросов={len(context.captured_queries)} "
+                f"чтений объявления={reads} записей={writes} (таблиц={len(tables)})"
+            )
+            if reads or writes > len(tables):
+                failures.append(model.__name__)
+
+        if failures:
+            raise CommandError(f"Лишние запросы при сохранении: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Сохранение объявлений укладывается в бюджет запросов.'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from applications.real_estate_advertisement.models import ListingIndex
+from applications.real_estate_advertisement.signals import AD_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленту объявлений (ListingIndex) по всем типам недвижимости'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            ListingIndex.objects.all().delete()
+            for model in AD_MODELS:
+                batch = []
+                total = 0
+                queryset = model.objects.order_by('pk')
+                for ad in queryset.iterator(chunk_size=batch_size):
+                    batch.append(ListingIndex.objects.build(ad))
+                    if len(batch) >= batch_size:
+                        ListingIndex.objects.bulk_create(batch)
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    ListingIndex.objects.bulk_create(batch)
+                    total += len(batch)
+                self.stdout.write(f"{model._meta.verbose_name_plural}: {total}")
+
+        self.stdout.write(self.style.SUCCESS('Лента объявлений пересобрана.'))
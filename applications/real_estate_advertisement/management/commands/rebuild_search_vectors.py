@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from applications.real_estate.models import RealEstateAd
+from applications.real_estate_advertisement.signals import AD_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковый индекс (search_vector) объявлений недвижимости'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help='Только объявления без индекса')
+
+    def handle(self, *args, **options):
+        for model in AD_MODELS:
+            # Один UPDATE на тип недвижимости, минуя save() и его сигналы
+            with transaction.atomic():
+                total = RealEstateAd.update_search_vectors(model, missing=options['missing'])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {total}")
+
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересчитан.'))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate', '0015_marketingimage_alter_realestatead_price_kgs'),
+        ('common', '0002_exchangerate'),
+        ('real_estate_advertisement', '0003_remove_commercialad_area_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingIndex',
+            fields=[
+                ('ad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing_index', serialize=False, to='real_estate.realestatead', verbose_name='Объявление')),
+                ('property_type', models.CharField(choices=[('apartments', 'квартира'), ('houses', 'дом'), ('commercials', 'коммерция'), ('rooms', 'комната'), ('plots', 'участок'), ('dachas', 'дача'), ('parkings', 'паркинг/гараж')], max_length=255, verbose_name='тип недвижимости')),
+                ('ad_type', models.CharField(choices=[('sell', 'продажа'), ('rent', 'аренда')], max_length=255, verbose_name='тип сделки')),
+                ('title', models.CharField(blank=True, max_length=255, null=True, verbose_name='заголовок')),
+                ('currency', models.CharField(choices=[('USD', 'Доллар США'), ('KGS', 'Кыргызский сом')], max_length=3, verbose_name='Валюта')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Цена')),
+                ('price_kgs', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Цена в сомах')),
+                ('total_area', models.PositiveIntegerField(blank=True, null=True, verbose_name='площадь')),
+                ('address', models.CharField(blank=True, max_length=255, null=True, verbose_name='Адресс')),
+                ('main_image', models.URLField(blank=True, max_length=900, null=True, verbose_name='Главное фото')),
+                ('image_count', models.PositiveSmallIntegerField(default=0, verbose_name='Количество фото')),
+                ('is_active', models.BooleanField(default=False, verbose_name='Активный')),
+                ('is_featured', models.BooleanField(default=False, verbose_name='Премиум объявление')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('city', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='common.city', verbose_name='город/село')),
+                ('district', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='common.district', verbose_name='район')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='common.region', verbose_name='регион')),
+                ('residential_complex', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='real_estate.residentialcomplex', verbose_name='Жилой комплекс')),
+                ('rooms', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='real_estate.roomtype', verbose_name='Количество комнат')),
+            ],
+            options={
+                'verbose_name': 'Карточка объявления',
+                'verbose_name_plural': 'Лента объявлений',
+                'indexes': [models.Index(fields=['is_active', '-created_at'], name='real_estate_is_acti_181d54_idx'), models.Index(fields=['property_type', 'is_active', '-created_at'], name='real_estate_propert_1c311a_idx'), models.Index(fields=['price', 'currency'], name='real_estate_price_d06a32_idx')],
+            },
+        ),
+    ]
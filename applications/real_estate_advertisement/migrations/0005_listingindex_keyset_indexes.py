@@ -0,0 +1,29 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate_advertisement', '0004_listingindex'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listingindex',
+            name='real_estate_is_acti_181d54_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listingindex',
+            name='real_estate_propert_1c311a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['is_active', '-created_at', '-ad'], name='real_estate_is_acti_f1efea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['property_type', 'is_active', '-created_at', '-ad'], name='real_estate_propert_03e382_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate_advertisement', '0005_listingindex_keyset_indexes'),
+        ('real_estate', '0021_alter_realestatead_price_kgs'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listingindex',
+            name='real_estate_price_d06a32_idx',
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['is_active', 'price_kgs'], name='real_estate_is_acti_6a114b_idx'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE real_estate_advertisement_listingindex AS entry
+            SET price_kgs = ad.price_kgs
+            FROM real_estate_realestatead AS ad
+            WHERE entry.ad_id = ad.public_id AND entry.price_kgs IS DISTINCT FROM ad.price_kgs
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
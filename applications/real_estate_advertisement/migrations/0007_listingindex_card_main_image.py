@@ -0,0 +1,24 @@
+# Generated by Django 4.2.20 on 2026-10-18 14:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate_advertisement', '0006_listingindex_price_kgs_index'),
+        ('real_estate', '0022_realestateadimage_variants'),
+    ]
+
+    operations = [
+        # Главное фото ленты - размер карточки, как в сводке объявления
+        migrations.RunSQL(
+            """
+            UPDATE real_estate_advertisement_listingindex AS entry
+            SET main_image = ad.main_image_url
+            FROM real_estate_realestatead AS ad
+            WHERE entry.ad_id = ad.public_id AND entry.main_image IS DISTINCT FROM ad.main_image_url
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
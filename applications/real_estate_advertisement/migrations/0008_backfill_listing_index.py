@@ -0,0 +1,48 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:40
+
+from django.db import migrations
+
+AD_MODELS = ('ApartmentAd', 'HouseAd', 'CommercialAd', 'RoomAd', 'DachaAd', 'PlotAd', 'ParkingAd')
+
+
+def backfill_listing_index(apps, schema_editor):
+    """Карточки ленты для существующих объявлений: один INSERT ... SELECT на тип недвижимости"""
+    ListingIndex = apps.get_model('real_estate_advertisement', 'ListingIndex')
+    RealEstateAd = apps.get_model('real_estate', 'RealEstateAd')
+    quote = schema_editor.quote_name
+
+    for model_name in AD_MODELS:
+        model = apps.get_model('real_estate_advertisement', model_name)
+        columns = {field.name: field.column for field in model._meta.local_concrete_fields}
+
+        def child(name):
+            # Поля, которых нет у типа (площадь у паркинга и т.п.), в карточке пустые
+            return f'child.{quote(columns[name])}' if name in columns else 'NULL'
+
+        schema_editor.execute(f"""
+            INSERT INTO {quote(ListingIndex._meta.db_table)} (
+                ad_id, property_type, ad_type, title, currency, price, price_kgs, total_area, rooms_id,
+                residential_complex_id, region_id, city_id, district_id, address, main_image, image_count,
+                is_active, is_featured, created_at
+            )
+            SELECT
+                ad.public_id, child.property_type, ad.ad_type, {child('title')}, ad.currency, ad.price,
+                ad.price_kgs, {child('total_area')}, {child('rooms')}, {child('residential_complex')},
+                ad.region_id, ad.city_id, ad.district_id, ad.address, ad.main_image_url, ad.image_count,
+                ad.is_active, ad.is_featured, ad.created_at
+            FROM {quote(model._meta.db_table)} AS child
+            JOIN {quote(RealEstateAd._meta.db_table)} AS ad ON ad.public_id = child.{quote(model._meta.pk.column)}
+            ON CONFLICT (ad_id) DO NOTHING
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate_advertisement', '0007_listingindex_card_main_image'),
+    ]
+
+    operations = [
+        # Лента читает только ListingIndex: без заполнения она пуста до ручного rebuild_listing_index
+        migrations.RunPython(backfill_listing_index, migrations.RunPython.noop),
+    ]
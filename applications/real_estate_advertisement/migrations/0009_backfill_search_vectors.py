@@ -0,0 +1,63 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:55
+
+from django.db import migrations
+
+AD_MODELS = ('ApartmentAd', 'HouseAd', 'CommercialAd', 'RoomAd', 'DachaAd', 'PlotAd', 'ParkingAd')
+
+# Справочники в поисковом индексе на момент миграции: поле объявления, модель и атрибут с названием
+SEARCH_REFERENCES = (
+    ('region', 'common.Region', 'region'),
+    ('city', 'common.City', 'city'),
+    ('district', 'common.District', 'district'),
+    ('rooms', 'real_estate.RoomType', 'name'),
+    ('residential_complex', 'real_estate.ResidentialComplex', 'name'),
+)
+
+
+def backfill_search_vectors(apps, schema_editor):
+    """
+    Поисковый индекс объявлений, сохраненных до 0019: один UPDATE на тип
+    недвижимости (документ как в RealEstateAd.build_search_vector на момент миграции)
+    """
+    RealEstateAd = apps.get_model('real_estate', 'RealEstateAd')
+    quote = schema_editor.quote_name
+
+    for model_name in AD_MODELS:
+        model = apps.get_model('real_estate_advertisement', model_name)
+        fields = {field.name: field for field in model._meta.concrete_fields}
+        local_fields = {field.name for field in model._meta.local_concrete_fields}
+
+        def column(name):
+            return f"{'child' if name in local_fields else 'ad'}.{quote(fields[name].column)}"
+
+        names = [column('address')]
+        for name, label, attribute in SEARCH_REFERENCES:
+            if name in fields:
+                reference = apps.get_model(label)
+                names.append(
+                    f"(SELECT {quote(attribute)} FROM {quote(reference._meta.db_table)} "
+                    f"WHERE {quote(reference._meta.pk.column)} = {column(name)})"
+                )
+        text = [column('title')] if 'title' in fields else []
+
+        schema_editor.execute(
+            f"UPDATE {quote(RealEstateAd._meta.db_table)} AS ad SET search_vector = "
+            f"setweight(to_tsvector('russian'::regconfig, concat_ws(' ', {', '.join([*text, 'ad.description'])})), 'A') "
+            f"|| setweight(to_tsvector('simple'::regconfig, concat_ws(' ', {', '.join(names)})), 'B') "
+            f"FROM {quote(model._meta.db_table)} AS child "
+            f"WHERE ad.{quote(RealEstateAd._meta.pk.column)} = child.{quote(model._meta.pk.column)} "
+            f"AND ad.search_vector IS NULL"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_estate_advertisement', '0008_backfill_listing_index'),
+        ('common', '0002_exchangerate'),
+    ]
+
+    operations = [
+        # Поле search_vector добавлено без заполнения: поиск не находил старые объявления
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
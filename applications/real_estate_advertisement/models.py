@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from applications.common.models import Region, City, District, ExchangeRate
 from applications.real_estate.models import RealEstateAd, RoomType, ResidentialComplex, Series, BuildingType, Year, \
     Floor, ObjectType, RoomLocation
 from core import settings
@@ -416,3 +417,132 @@ class ParkingAd(RealEstateAd):
     class Meta:
         verbose_name = "Паркинг"
         verbose_name_plural = "Паркинг"
+
+
+class ListingIndexManager(models.Manager):
+    def build(self, ad):
+        """Собираем карточку объявления для ленты"""
+        return ListingIndex(
+            ad_id=ad.pk,
+            property_type=ad.property_type,
+            ad_type=ad.ad_type,
+            title=ad.title,
+            currency=ad.currency,
+            price=ad.price,
+            price_kgs=ad.price_kgs,
+            total_area=getattr(ad, 'total_area', None),
+            rooms_id=getattr(ad, 'rooms_id', None),
+            residential_complex_id=getattr(ad, 'residential_complex_id', None),
+            region_id=ad.region_id,
+            city_id=ad.city_id,
+            district_id=ad.district_id,
+            address=ad.address,
+            main_image=ad.main_image_url,
+            image_count=ad.image_count,
+            is_active=ad.is_active,
+            is_featured=ad.is_featured,
+            created_at=ad.created_at,
+        )
+
+    def sync(self, ad):
+        """Создаем или обновляем карточку объявления"""
+        entry = self.build(ad)
+        entry.save()
+        return entry
+
+    def property_types(self, ad_ids):
+        """Типы недвижимости объявлений - категории кэша ответов"""
+        return set(self.filter(ad_id__in=ad_ids).values_list('property_type', flat=True).distinct())
+
+    def sync_images(self, ad_id):
+        """Копируем сводку по фотографиям из объявления"""
+        ad = RealEstateAd.objects.filter(pk=ad_id).values('main_image_url', 'image_count').first()
+        if ad:
+            self.filter(ad_id=ad_id).update(main_image=ad['main_image_url'], image_count=ad['image_count'])
+
+
+class ListingIndex(models.Model):
+    """Денормализованная карточка объявления для ленты главной страницы"""
+    INDEXED_FIELDS = {
+        'property_type', 'ad_type', 'title', 'currency', 'price', 'price_kgs', 'total_area', 'rooms',
+        'residential_complex', 'region', 'city', 'district', 'address', 'is_active', 'is_featured',
+    }
+
+    ad = models.OneToOneField(
+        RealEstateAd,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='listing_index',
+        verbose_name='Объявление'
+    )
+    property_type = models.CharField(
+        verbose_name="тип недвижимости", max_length=255, choices=PropertyTypeChoices.choices
+    )
+    ad_type = models.CharField(
+        max_length=255, choices=RealEstateAd.AD_TYPE_CHOICES, verbose_name="тип сделки"
+    )
+    title = models.CharField(max_length=255, blank=True, null=True, verbose_name='заголовок')
+    currency = models.CharField(
+        max_length=3, choices=RealEstateAd.CURRENCY_CHOICES, verbose_name="Валюта"
+    )
+    price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Цена")
+    price_kgs = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True, verbose_name="Цена в сомах"
+    )
+    total_area = models.PositiveIntegerField(blank=True, null=True, verbose_name="площадь")
+    rooms = models.ForeignKey(
+        RoomType,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Количество комнат"
+    )
+    residential_complex = models.ForeignKey(
+        ResidentialComplex,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Жилой комплекс"
+    )
+    region = models.ForeignKey(
+        Region, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='регион'
+    )
+    city = models.ForeignKey(
+        City, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='город/село'
+    )
+    district = models.ForeignKey(
+        District, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='район'
+    )
+    address = models.CharField(max_length=255, null=True, blank=True, verbose_name="Адресс")
+    main_image = models.URLField(max_length=900, blank=True, null=True, verbose_name='Главное фото')
+    image_count = models.PositiveSmallIntegerField(default=0, verbose_name='Количество фото')
+    is_active = models.BooleanField(default=False, verbose_name='Активный')
+    is_featured = models.BooleanField(default=False, verbose_name='Премиум объявление')
+    created_at = models.DateTimeField(verbose_name="Дата создания")
+
+    objects = ListingIndexManager()
+
+    def __str__(self):
+        return f"{self.get_property_type_display()} {self.ad_id}"
+
+    def get_price_display(self):
+        if self.currency == 'USD' and self.price_kgs:
+            return f"{int(self.price)} USD / {int(self.price_kgs)} KGS"
+        return f"{int(self.price)} {self.currency}"
+
+    @classmethod
+    def recompute_price_kgs(cls, rate):
+        """Цены в сомах долларовых карточек по новому курсу одним UPDATE"""
+        price_kgs = ExchangeRate.price_kgs_expression(rate)
+        return cls.objects.filter(currency='USD').exclude(price_kgs=price_kgs).update(price_kgs=price_kgs)
+
+    class Meta:
+        verbose_name = "Карточка объявления"
+        verbose_name_plural = "Лента объявлений"
+        indexes = [
+            models.Index(fields=['is_active', '-created_at', '-ad']),
+            models.Index(fields=['property_type', 'is_active', '-created_at', '-ad']),
+            models.Index(fields=['is_active', 'price_kgs']),
+        ]
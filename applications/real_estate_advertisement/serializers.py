@@ -2,9 +2,12 @@ from django.core.exceptions import FieldDoesNotExist
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_serializer, OpenApiExample, extend_schema_field
 from rest_framework import serializers
-from .models import ApartmentAd, HouseAd, CommercialAd, RoomAd, DachaAd, PlotAd, ParkingAd
-from ..common.serializers import SubscriptionSerializer, ExchangeSerializer
-from ..real_estate.models import MarketingImage, ConditionType
+from .models import ApartmentAd, HouseAd, CommercialAd, RoomAd, DachaAd, PlotAd, ParkingAd, ListingIndex
+from ..common.cache import reference_cache
+from ..common.models import Region, City, District
+from ..common.serializers import SubscriptionSerializer, ExchangeSerializer, ReferenceField
+from ..real_estate.models import MarketingImage, ConditionType, RoomType, Series, BuildingType, Floor, \
+    ObjectType, RoomLocation, ResidentialComplex
 from ..real_estate.serializers import PhoneNumberRealEstateSerializer, \
     ResidentialComplexSerializer, OtherSerializer, DocumentSerializer, SafetyRealEstateSerializer
 
@@ -41,8 +44,16 @@ class LocationSerializer(serializers.Serializer):
         return getattr(obj.district, 'district', None)
 
 
+class ImageVariantsSerializer(serializers.Serializer):
+    thumbnail = serializers.URLField()
+    card = serializers.URLField()
+    full = serializers.URLField()
+    srcset = serializers.CharField()
+
+
 class ImageSerializer(serializers.Serializer):
     url = serializers.URLField()
+    variants = ImageVariantsSerializer(required=False)
     type = serializers.CharField()
     is_main = serializers.BooleanField(required=False)
     property_type = serializers.CharField(required=False)
@@ -77,12 +88,7 @@ class ImageSerializer(serializers.Serializer):
 )
 class BaseRealEstateAdSerializer(serializers.ModelSerializer):
     def get_marketing_images(self, obj):
-        return list(
-            MarketingImage.objects.filter(
-                is_active=True,
-                property_type=obj.property_type
-            ).order_by('-created_at').values('image')
-        )
+        return MarketingImage.get_active_urls(obj.property_type)
 
     public_id = serializers.CharField()
     user = serializers.CharField(source='user.email')
@@ -103,6 +109,7 @@ class BaseRealEstateAdSerializer(serializers.ModelSerializer):
     contact_number = PhoneNumberRealEstateSerializer(source='real_estate_phones', many=True, read_only=True)
     image_count = serializers.IntegerField(read_only=True)
     has_main_image = serializers.BooleanField(read_only=True)
+    main_image_url = serializers.URLField(read_only=True, allow_null=True)
 
     class Meta:
         abstract = True
@@ -111,23 +118,32 @@ class BaseRealEstateAdSerializer(serializers.ModelSerializer):
             'price', 'is_total_price', 'total_area', 'location', 'property_characteristics',
             'exchange', 'installment', 'mortgage', 'measurements_docs', 'designing_docs',
             'images', 'link_Youtube', 'created_at', 'is_featured', 'subscription', 'view_count',
-            'contact_number', 'image_count', 'has_main_image'
+            'contact_number', 'image_count', 'has_main_image', 'main_image_url'
         ]
 
+    @extend_schema_field(ImageSerializer(many=True))
     def get_images(self, obj):
         request = self.context.get('request')
         images = []
+        # URL размеров посчитаны при загрузке (RealEstateAdImage.variants)
         for image in obj.images.all():
-            if image.image and request:
+            if image.variants:
+                images.append({
+                    'url': image.variants['full'],
+                    'variants': image.variants,
+                    'is_main': image.is_main,
+                    'type': 'property'
+                })
+            elif image.image and request:
                 images.append({
                     'url': request.build_absolute_uri(image.image.url),
                     'is_main': image.is_main,
                     'type': 'property'
                 })
         for marketing_image in self.get_marketing_images(obj):
-            if marketing_image['image'] and request:
+            if request:
                 images.append({
-                    'url': request.build_absolute_uri(marketing_image['image']),
+                    'url': request.build_absolute_uri(marketing_image),
                     'type': 'marketing',
                     'property_type': obj.property_type
                 })
@@ -137,11 +153,11 @@ class BaseRealEstateAdSerializer(serializers.ModelSerializer):
 class ApartmentAdSerializer(BaseRealEstateAdSerializer):
     rooms = serializers.SerializerMethodField()
     residential_complex = ResidentialComplexSerializer()
-    series = serializers.CharField(source="series.name")
-    building_type = serializers.CharField(source="building_type.name")
+    series = ReferenceField(Series, 'name', source="series_id")
+    building_type = ReferenceField(BuildingType, 'name', source="building_type_id")
     construction_year = serializers.SerializerMethodField()
-    floor = serializers.CharField(source="floor.floor")
-    max_floor = serializers.CharField(source="max_floor.floor")
+    floor = ReferenceField(Floor, 'floor', source="floor_id")
+    max_floor = ReferenceField(Floor, 'floor', source="max_floor_id")
 
     class Meta(BaseRealEstateAdSerializer.Meta):
         model = ApartmentAd
@@ -156,13 +172,14 @@ class ApartmentAdSerializer(BaseRealEstateAdSerializer):
 
     @extend_schema_field(OpenApiTypes.STR)
     def get_rooms(self, obj):
-        return f"{obj.rooms.name}-{obj.rooms.room_count}"
+        rooms = reference_cache.get(RoomType, obj.rooms_id)
+        return f"{rooms.name}-{rooms.room_count}" if rooms else None
 
 
 class HouseAdSerializer(BaseRealEstateAdSerializer):
     rooms = serializers.SerializerMethodField()
-    building_type = serializers.CharField(source="building_type.name")
-    floor = serializers.CharField(source="floor.floor")
+    building_type = ReferenceField(BuildingType, 'name', source="building_type_id")
+    floor = ReferenceField(Floor, 'floor', source="floor_id")
     area = serializers.SerializerMethodField(
         help_text="В квадратных метрах m2",
     )
@@ -186,15 +203,16 @@ class HouseAdSerializer(BaseRealEstateAdSerializer):
 
     @extend_schema_field(OpenApiTypes.STR)
     def get_rooms(self, obj):
-        return f"{obj.rooms.name}-{obj.rooms.room_count}"
+        rooms = reference_cache.get(RoomType, obj.rooms_id)
+        return f"{rooms.name}-{rooms.room_count}" if rooms else None
 
 
 class CommercialAdSerializer(BaseRealEstateAdSerializer):
-    object_type = serializers.CharField(source="object_type.name")
-    building_type = serializers.CharField(source="building_type.name")
+    object_type = ReferenceField(ObjectType, 'name', source="object_type_id")
+    building_type = ReferenceField(BuildingType, 'name', source="building_type_id")
     construction_year = serializers.SerializerMethodField()
-    floor = serializers.CharField(source="floor.floor")
-    max_floor = serializers.CharField(source="max_floor.floor")
+    floor = ReferenceField(Floor, 'floor', source="floor_id")
+    max_floor = ReferenceField(Floor, 'floor', source="max_floor_id")
     total_area = serializers.SerializerMethodField(
         help_text="В квадратных метрах m2",
     )
@@ -217,9 +235,9 @@ class CommercialAdSerializer(BaseRealEstateAdSerializer):
 
 class RoomAdSerializer(BaseRealEstateAdSerializer):
     rooms = serializers.SerializerMethodField()
-    room_location = serializers.CharField(source="room_location.name")
-    floor = serializers.CharField(source="floor.floor")
-    max_floor = serializers.CharField(source="max_floor.floor")
+    room_location = ReferenceField(RoomLocation, 'name', source="room_location_id")
+    floor = ReferenceField(Floor, 'floor', source="floor_id")
+    max_floor = ReferenceField(Floor, 'floor', source="max_floor_id")
 
     class Meta(BaseRealEstateAdSerializer.Meta):
         model = RoomAd
@@ -229,7 +247,8 @@ class RoomAdSerializer(BaseRealEstateAdSerializer):
 
     @extend_schema_field(OpenApiTypes.STR)
     def get_rooms(self, obj):
-        return f"{obj.rooms.name}-{obj.rooms.room_count}"
+        rooms = reference_cache.get(RoomType, obj.rooms_id)
+        return f"{rooms.name}-{rooms.room_count}" if rooms else None
 
 
 class PlotAdSerializer(BaseRealEstateAdSerializer):
@@ -240,9 +259,9 @@ class PlotAdSerializer(BaseRealEstateAdSerializer):
 
 class DachaAdSerializer(BaseRealEstateAdSerializer):
     rooms = serializers.SerializerMethodField()
-    building_type = serializers.CharField(source="building_type.name")
+    building_type = ReferenceField(BuildingType, 'name', source="building_type_id")
     construction_year = serializers.SerializerMethodField()
-    floor = serializers.CharField(source="floor.floor")
+    floor = ReferenceField(Floor, 'floor', source="floor_id")
     area = serializers.SerializerMethodField(
         help_text="В квадратных метрах m2",
     )
@@ -270,7 +289,8 @@ class DachaAdSerializer(BaseRealEstateAdSerializer):
 
     @extend_schema_field(OpenApiTypes.STR)
     def get_rooms(self, obj):
-        return f"{obj.rooms.room_count}-{obj.rooms.name}"
+        rooms = reference_cache.get(RoomType, obj.rooms_id)
+        return f"{rooms.room_count}-{rooms.name}" if rooms else None
 
 
 class ParkingAdSerializer(BaseRealEstateAdSerializer):
@@ -290,3 +310,82 @@ class ParkingAdSerializer(BaseRealEstateAdSerializer):
                      field for field in BaseRealEstateAdSerializer.Meta.fields
                      if field not in ["total_area", "property_characteristics"]
                  ] + ["residential_complex"]
+
+
+class RealEstateCardSerializer(serializers.Serializer):
+    """Карточка объявления для списков: только поля из .only() и справочники из кэша"""
+    public_id = serializers.CharField()
+    property_type = serializers.CharField(allow_null=True, default=None)
+    ad_type = serializers.CharField()
+    title = serializers.CharField(allow_null=True, default=None)
+    price = serializers.CharField(source='get_price_display')
+    currency = serializers.CharField()
+    total_area = serializers.IntegerField(allow_null=True, default=None)
+    rooms = serializers.SerializerMethodField()
+    city = ReferenceField(City, 'city', source='city_id')
+    main_image = serializers.SerializerMethodField()
+    image_count = serializers.IntegerField()
+    is_featured = serializers.BooleanField()
+    created_at = serializers.DateTimeField()
+
+    class Meta:
+        # Атрибуты, которые читают методы (для FlatSerializer)
+        flat_values = ('price', 'price_kgs', 'currency', 'rooms_id', 'main_image_url')
+
+    @extend_schema_field(OpenApiTypes.STR)
+    def get_rooms(self, obj):
+        rooms_id = getattr(obj, 'rooms_id', None)
+        rooms = reference_cache.get(RoomType, rooms_id) if rooms_id else None
+        if rooms:
+            return f"{rooms.name}-{rooms.room_count}"
+        return None
+
+    @extend_schema_field(OpenApiTypes.STR)
+    def get_main_image(self, obj):
+        request = self.context.get('request')
+        if obj.main_image_url and request:
+            return request.build_absolute_uri(obj.main_image_url)
+        return obj.main_image_url
+
+
+class ListingIndexSerializer(serializers.ModelSerializer):
+    public_id = serializers.CharField(source='ad_id')
+    price = serializers.CharField(source='get_price_display')
+    rooms = serializers.SerializerMethodField()
+    residential_complex = ReferenceField(ResidentialComplex, 'name', source='residential_complex_id')
+    region = ReferenceField(Region, 'region', source='region_id')
+    city = ReferenceField(City, 'city', source='city_id')
+    district = ReferenceField(District, 'district', source='district_id')
+    main_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ListingIndex
+        fields = [
+            'public_id', 'ad_type', 'title', 'price', 'currency', 'total_area', 'rooms',
+            'residential_complex', 'region', 'city', 'district', 'address', 'main_image',
+            'image_count', 'is_featured', 'created_at'
+        ]
+        # Атрибуты, которые читают методы (для FlatSerializer)
+        flat_values = ('price', 'price_kgs', 'currency', 'rooms_id', 'main_image', 'property_type')
+
+    @extend_schema_field(OpenApiTypes.STR)
+    def get_rooms(self, obj):
+        rooms = reference_cache.get(RoomType, obj.rooms_id) if obj.rooms_id else None
+        return f"{rooms.name}-{rooms.room_count}" if rooms else None
+
+    @extend_schema_field(OpenApiTypes.STR)
+    def get_main_image(self, obj):
+        request = self.context.get('request')
+        if obj.main_image and request:
+            return request.build_absolute_uri(obj.main_image)
+        return obj.main_image
+
+    def to_representation(self, instance):
+        return self.wrap_representation(instance, super().to_representation(instance))
+
+    @staticmethod
+    def wrap_representation(instance, data):
+        return {
+            'type': instance.property_type,
+            'data': data
+        }
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver, Signal
+
+# Сводка по фотографиям в RealEstateAd должна пересчитываться раньше, чем ее копирует лента
+from applications.real_estate.signals import images_optimized
+from applications.real_estate.models import RealEstateAd, RealEstateAdImage
+from .models import ApartmentAd, HouseAd, CommercialAd, RoomAd, DachaAd, PlotAd, ParkingAd, ListingIndex
+
+AD_MODELS = (ApartmentAd, HouseAd, CommercialAd, RoomAd, DachaAd, PlotAd, ParkingAd)
+
+# Массовая деактивация объявлений в обход save(): ad_ids_by_model = {модель: [public_id, ...]}
+ads_deactivated = Signal()
+
+
+def sync_listing_index(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not ListingIndex.INDEXED_FIELDS.intersection(update_fields):
+        return
+    ListingIndex.objects.sync(instance)
+
+
+for ad_model in AD_MODELS:
+    post_save.connect(
+        sync_listing_index, sender=ad_model, dispatch_uid=f'sync_listing_index_{ad_model.__name__}'
+    )
+
+
+@receiver(post_save, sender=RealEstateAdImage)
+@receiver(post_delete, sender=RealEstateAdImage)
+def sync_listing_index_images(sender, instance, **kwargs):
+    ListingIndex.objects.sync_images(instance.ad_id)
+    RealEstateAd.invalidate_responses(*ListingIndex.objects.property_types([instance.ad_id]))
+
+
+@receiver(images_optimized)
+def sync_optimized_images(sender, ad_id, **kwargs):
+    ListingIndex.objects.sync_images(ad_id)
+    RealEstateAd.invalidate_responses(*ListingIndex.objects.property_types([ad_id]))
+
+
+@receiver(post_delete, sender=RealEstateAd)
+def invalidate_deleted_ad_responses(sender, instance, **kwargs):
+    RealEstateAd.invalidate_responses()
+
+
+@receiver(ads_deactivated)
+def sync_deactivated_ads(sender, ad_ids_by_model, **kwargs):
+    ad_ids = [ad_id for ids in ad_ids_by_model.values() for ad_id in ids]
+    if not ad_ids:
+        return
+    ListingIndex.objects.filter(ad_id__in=ad_ids).update(is_active=False)
+    RealEstateAd.invalidate_responses(*ListingIndex.objects.property_types(ad_ids))
+
+
+# Справочники в поисковом индексе: модель -> (поле объявления, атрибут с названием)
+SEARCH_REFERENCE_FIELDS = {
+    reference: (field, attribute) for field, reference, attribute in RealEstateAd.SEARCH_REFERENCES
+}
+
+
+def detect_reference_rename(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    attribute = SEARCH_REFERENCE_FIELDS[sender][1]
+    name = sender._default_manager.filter(pk=instance.pk).values_list(attribute, flat=True).first()
+    instance._search_renamed = name is not None and name != getattr(instance, attribute)
+
+
+def reindex_renamed_reference(sender, instance, created, **kwargs):
+    """Название справочника входит в поисковый индекс объявлений: пересчитываем их после переименования"""
+    if created or not getattr(instance, '_search_renamed', False):
+        return
+    instance._search_renamed = False
+    from .tasks import reindex_search_vectors
+
+    field, pk = SEARCH_REFERENCE_FIELDS[sender][0], instance.pk
+    transaction.on_commit(lambda: reindex_search_vectors.delay(field, pk))
+
+
+for reference in SEARCH_REFERENCE_FIELDS:
+    pre_save.connect(
+        detect_reference_rename, sender=reference, dispatch_uid=f'detect_rename_{reference.__name__}'
+    )
+    post_save.connect(
+        reindex_renamed_reference, sender=reference, dispatch_uid=f'reindex_search_{reference.__name__}'
+    )
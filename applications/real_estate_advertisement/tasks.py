@@ -1,24 +1,62 @@
 from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.db.models import F, ExpressionWrapper, DateTimeField, Value
 from django.utils.timezone import now
 from datetime import timedelta
 
+from applications.real_estate.models import RealEstateAd
 from .models import ApartmentAd, HouseAd, CommercialAd, RoomAd, PlotAd, DachaAd, ParkingAd
+from .signals import AD_MODELS, ads_deactivated
+
+logger = get_task_logger(__name__)
+
+# Дата окончания размещения: created_at + subscription.duration_days * interval '1 day'
+EXPIRES_AT = ExpressionWrapper(
+    F('created_at') + F('subscription__duration_days') * Value(timedelta(days=1)),
+    output_field=DateTimeField()
+)
 
 
 @shared_task
-def deactivate_expired_ads():
+def deactivate_expired_ads(batch_size=1000):
     ad_models = [ApartmentAd, HouseAd, CommercialAd, RoomAd, PlotAd, DachaAd, ParkingAd]
-    total_deactivated = 0
+    deactivated = {}
+    current_time = now()
 
     for model in ad_models:
-        ads = model.objects.filter(is_active=True, subscription__isnull=False)
+        expired = model.objects.filter(
+            is_active=True, subscription__isnull=False
+        ).alias(expires_at=EXPIRES_AT).filter(expires_at__lt=current_time).order_by('pk')
+
+        ad_ids = []
+        while True:
+            batch = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            # is_active хранится в родительской таблице, save() и его сигналы не нужны
+            RealEstateAd.objects.filter(pk__in=batch).update(is_active=False)
+            ad_ids.extend(batch)
+
+        if ad_ids:
+            deactivated[model] = ad_ids
+        logger.info(f"{model._meta.verbose_name_plural}: деактивировано {len(ad_ids)}")
 
-        for ad in ads:
-            if ad.created_at and ad.subscription:
-                expiration_date = ad.created_at + timedelta(days=ad.subscription.duration_days)
-                if now() > expiration_date:
-                    ad.is_active = False
-                    ad.save(update_fields=['is_active'])
-                    total_deactivated += 1
+    if deactivated:
+        ads_deactivated.send(sender=RealEstateAd, ad_ids_by_model=deactivated)
 
-    return f"{total_deactivated} объявлений деактивировано."
+    counts = {model._meta.model_name: len(ad_ids) for model, ad_ids in deactivated.items()}
+    total_deactivated = sum(counts.values())
+    return {'total': total_deactivated, 'by_model': counts}
+
+
+@shared_task
+def reindex_search_vectors(field, value):
+    """Поисковый индекс объявлений, ссылающихся на справочник (после переименования региона, города и т.п.)"""
+    updated = {}
+    for model in AD_MODELS:
+        if any(model_field.name == field for model_field in model._meta.concrete_fields):
+            updated[model._meta.model_name] = RealEstateAd.update_search_vectors(model, **{field: value})
+    if any(updated.values()):
+        RealEstateAd.invalidate_responses()
+    logger.info(f"Поисковый индекс по {field}={value}: {updated}")
+    return updated
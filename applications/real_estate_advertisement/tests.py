@@ -1,3 +1,148 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+import pytest
+from django.contrib.postgres.search import SearchQuery
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from applications.common.models import Region
+from applications.real_estate.models import RealEstateAd
+from .models import ApartmentAd, ListingIndex
+from .tasks import reindex_search_vectors
+
+
+@pytest.fixture
+def apartment_ad(user):
+    return ApartmentAd.objects.create(
+        user=user, price=4_500_000, currency='KGS', total_area=54, description='Квартира у парка'
+    )
+
+
+@pytest.mark.django_db
+def test_ad_save_writes_each_table_once(apartment_ad, django_assert_num_queries):
+    """Редактирование: UPDATE родителя, UPDATE наследника и UPDATE карточки ленты, без чтения объявления"""
+    ad = ApartmentAd.objects.select_related('subscription').get(pk=apartment_ad.pk)
+    ad.description = 'Квартира у парка, ремонт'
+
+    with django_assert_num_queries(3) as context:
+        ad.save()
+
+    statements = [query['sql'].split()[0] for query in context.captured_queries]
+    assert statements == ['UPDATE', 'UPDATE', 'UPDATE']
+    assert ListingIndex.objects.filter(ad_id=ad.pk, price_kgs=ad.price_kgs).exists()
+
+
+@pytest.mark.django_db
+def test_ad_save_with_update_fields_skips_listing_index(apartment_ad, django_assert_num_queries):
+    """Поле не из карточки ленты: один UPDATE родителя вместе с поисковым индексом"""
+    ad = ApartmentAd.objects.select_related('subscription').get(pk=apartment_ad.pk)
+    ad.description = 'Квартира у парка, ремонт'
+
+    with django_assert_num_queries(1):
+        ad.save(update_fields=['description'])
+
+
+def found(text):
+    query = SearchQuery(text, config='simple')
+    return set(RealEstateAd.objects.filter(search_vector=query).values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+def test_update_search_vectors_matches_save(apartment_ad):
+    """UPDATE по таблице строит тот же вектор, что save()"""
+    region = Region.objects.create(region='Чуйская область')
+    apartment_ad.region = region
+    apartment_ad.save()
+    saved = RealEstateAd.objects.values_list('search_vector', flat=True).get(pk=apartment_ad.pk)
+    RealEstateAd.objects.filter(pk=apartment_ad.pk).update(search_vector=None)
+
+    assert RealEstateAd.update_search_vectors(ApartmentAd, missing=True) == 1
+    assert RealEstateAd.objects.values_list('search_vector', flat=True).get(pk=apartment_ad.pk) == saved
+    assert found('Чуйская') == {apartment_ad.pk}
+
+
+@pytest.mark.django_db
+def test_region_rename_reindexes_ads(apartment_ad, monkeypatch, django_capture_on_commit_callbacks):
+    region = Region.objects.create(region='Чуйская область')
+    apartment_ad.region = region
+    apartment_ad.save()
+    monkeypatch.setattr(reindex_search_vectors, 'delay', reindex_search_vectors)
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        region.region = 'Таласская область'
+        region.save()
+
+    assert len(callbacks) == 1
+    assert found('Таласская') == {apartment_ad.pk}
+    assert found('Чуйская') == set()
+
+    # Сохранение без переименования индекс не пересчитывает
+    with django_capture_on_commit_callbacks() as callbacks:
+        region.save()
+    assert callbacks == []
+
+
+@pytest.fixture
+def tied_feed(listings):
+    """Лента из семи объявлений с одинаковым created_at: порядок внутри - только по pk"""
+    ListingIndex.objects.update(created_at=timezone.now() - timedelta(hours=1))
+    return list(ListingIndex.objects.order_by('-pk').values_list('pk', flat=True))
+
+
+def feed_page(url, params=None):
+    response = APIClient().get(url, params)
+    assert response.status_code == 200, response.content
+    data = response.json()
+    return [item['public_id'] for item in data['results']], data
+
+
+@pytest.mark.django_db
+def test_cursor_pages_are_stable_across_created_at_ties(tied_feed):
+    pages, previous_links = [], []
+    ids, data = feed_page('/api/real-estate/main/', {'pagination': 'cursor', 'page_size': 3})
+    assert data['previous'] is None
+    while True:
+        pages.append(ids)
+        previous_links.append(data['previous'])
+        if data['next'] is None:
+            break
+        ids, data = feed_page(data['next'])
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [pk for page in pages for pk in page] == tied_feed
+
+    # Ссылка previous возвращает ровно предыдущую страницу; у первой страницы previous нет
+    for number in (2, 1):
+        ids, data = feed_page(previous_links[number])
+        assert ids == pages[number - 1]
+        assert data['next'] is not None
+    assert data['previous'] is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, params', [
+    ('/api/real-estate/main/', {'pagination': 'cursor', 'search': 'квартира'}),
+    ('/api/real-estate/main/', {'pagination': 'cursor', 'order_by': 'price'}),
+    ('/api/real-estate/apartments/', {'pagination': 'cursor', 'order_by': '-price'}),
+])
+def test_cursor_rejects_other_orderings(listings, url, params):
+    response = APIClient().get(url, params)
+    assert response.status_code == 400
+    assert 'cursor' in response.json()
+
+
+@pytest.mark.django_db
+def test_page_number_pagination_accepts_order_by(listings):
+    response = APIClient().get('/api/real-estate/main/', {'order_by': 'price'})
+    assert response.status_code == 200
+    assert response.json()['count'] == len(listings[0])
+
+
+@pytest.mark.parametrize('url', [
+    '/api/real-estate/tiles/12/2950/1515.mvt',
+    '/api/real-estate/tiles/12/2950/1515/clusters/',
+])
+def test_map_tile_rejects_unknown_property_type(url):
+    response = APIClient().get(url, {'property_type': 'castles'})
+    assert response.status_code == 400
+    assert 'property_type' in response.json()
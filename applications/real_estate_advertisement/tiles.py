@@ -0,0 +1,154 @@
+import hashlib
+from math import atan, degrees, pi, sinh
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, BooleanField, Count, F, FloatField, Func, Min, Value
+from django.db.models.functions import Floor
+from rest_framework.exceptions import ValidationError
+
+from applications.common.response_cache import get_generation, normalize_query_params
+from applications.real_estate.models import RealEstateAd
+from .filters import (
+    ApartmentAdFilter, HouseAdFilter, CommercialAdFilter, RoomAdFilter, DachaAdFilter, PlotAdFilter,
+    ParkingAdFilter, RealEstateMapFilter
+)
+from .models import ApartmentAd, HouseAd, CommercialAd, RoomAd, DachaAd, PlotAd, ParkingAd
+
+MAX_ZOOM = 22
+TILE_LAYER = 'ads'
+TILE_EXTENT = 4096
+# Сетка кластеров: столько ячеек на сторону тайла
+CLUSTER_GRID = 8
+TILE_CACHE_TIMEOUT = 5 * 60
+
+MAP_FILTERS = {
+    'apartments': (ApartmentAd, ApartmentAdFilter),
+    'houses': (HouseAd, HouseAdFilter),
+    'commercials': (CommercialAd, CommercialAdFilter),
+    'rooms': (RoomAd, RoomAdFilter),
+    'dachas': (DachaAd, DachaAdFilter),
+    'plots': (PlotAd, PlotAdFilter),
+    'parkings': (ParkingAd, ParkingAdFilter),
+}
+
+
+class Longitude(Func):
+    template = 'ST_X(%(expressions)s::geometry)'
+    output_field = FloatField()
+
+
+class Latitude(Func):
+    template = 'ST_Y(%(expressions)s::geometry)'
+    output_field = FloatField()
+
+
+class InTile(Func):
+    """
+    Точка попадает в тайл z/x/y. Сравнение в геометрии, а не в географии: граница
+    тайла - прямая на плоской карте, а не дуга большого круга. Использует
+    GiST-индекс по location::geometry.
+    """
+    template = '%(expressions)s::geometry && ST_Transform(ST_TileEnvelope(%(z)d, %(x)d, %(y)d), 4326)'
+    output_field = BooleanField()
+
+
+class AsMVTGeom(Func):
+    """Геометрия точки в координатах тайла z/x/y"""
+    template = 'ST_AsMVTGeom(ST_Transform(%(expressions)s::geometry, 3857), ST_TileEnvelope(%(z)d, %(x)d, %(y)d))'
+
+
+def validate_tile(z, x, y):
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValidationError({'tile': f'Некорректный тайл {z}/{x}/{y}.'})
+
+
+def tile_bounds(z, x, y):
+    """Границы тайла (Web Mercator) в WGS84: (min_lon, min_lat, max_lon, max_lat)"""
+    n = 2 ** z
+
+    def longitude(tile_x):
+        return tile_x / n * 360 - 180
+
+    def latitude(tile_y):
+        return degrees(atan(sinh(pi * (1 - 2 * tile_y / n))))
+
+    return longitude(x), latitude(y + 1), longitude(x + 1), latitude(y)
+
+
+def get_map_queryset(params, z, x, y):
+    """Активные объявления в тайле с теми же фильтрами, что и у списков по типам; без property_type - все типы"""
+    validate_tile(z, x, y)
+    property_type = params.get('property_type')
+    if property_type and property_type not in MAP_FILTERS:
+        # Иначе тайл со всеми типами кэшировался бы под ключом неизвестного типа
+        raise ValidationError({'property_type': [
+            f"Неизвестный тип недвижимости: {property_type}. Допустимые: {', '.join(MAP_FILTERS)}."
+        ]})
+    model, filterset_class = MAP_FILTERS.get(property_type, (RealEstateAd, RealEstateMapFilter))
+
+    queryset = model.objects.filter(InTile(F('location'), z=z, x=x, y=y), is_active=True)
+    filterset = filterset_class(params, queryset=queryset)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+
+    kind = F('property_type') if model is not RealEstateAd else F('listing_index__property_type')
+    return filterset.qs.order_by().annotate(kind=kind)
+
+
+def render_tile(queryset, z, x, y):
+    """Mapbox Vector Tile со слоем объявлений (ST_AsMVT)"""
+    queryset = queryset.annotate(geom=AsMVTGeom(F('location'), z=z, x=x, y=y)).values(
+        'public_id', 'kind', 'price', 'currency', 'price_kgs', 'geom'
+    )
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT ST_AsMVT(tile, %s, %s, 'geom') FROM ({sql}) AS tile",
+            [TILE_LAYER, TILE_EXTENT, *params]
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+def cluster_tile(queryset, z, x, y):
+    """Группируем точки тайла по сетке CLUSTER_GRID x CLUSTER_GRID"""
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    cell_width = (max_lon - min_lon) / CLUSTER_GRID
+    cell_height = (max_lat - min_lat) / CLUSTER_GRID
+
+    clusters = queryset.annotate(
+        cell_x=Floor((Longitude('location') - Value(min_lon)) / Value(cell_width)),
+        cell_y=Floor((Latitude('location') - Value(min_lat)) / Value(cell_height)),
+    ).values('cell_x', 'cell_y').annotate(
+        count=Count('pk'),
+        min_price_kgs=Min('price_kgs'),
+        longitude=Avg(Longitude('location')),
+        latitude=Avg(Latitude('location')),
+        public_id=Min('pk'),
+    ).order_by()
+
+    return [
+        {
+            'latitude': cluster['latitude'],
+            'longitude': cluster['longitude'],
+            'count': cluster['count'],
+            'min_price_kgs': cluster['min_price_kgs'],
+            'public_id': cluster['public_id'] if cluster['count'] == 1 else None,
+        }
+        for cluster in clusters
+    ]
+
+
+def get_cached_tile(kind, request, z, x, y, builder):
+    """Кэш тайла по координатам и нормализованным параметрам фильтров"""
+    params = normalize_query_params(request.query_params)
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    generation = get_generation(RealEstateAd.RESPONSE_CACHE_GROUP)
+    cache_key = f'map_tile:{kind}:{generation}:{z}/{x}/{y}:{digest}'
+
+    content = cache.get(cache_key)
+    if content is None:
+        content = builder(get_map_queryset(request.query_params, z, x, y), z, x, y)
+        cache.set(cache_key, content, timeout=TILE_CACHE_TIMEOUT)
+    return content
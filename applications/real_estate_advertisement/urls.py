@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ApartmentAdViewSet, HouseAdViewSet, CommercialAdViewSet,
     RoomAdViewSet, DachaAdViewSet, PlotAdViewSet, ParkingAdViewSet,
-    MainPageViewSet
+    MainPageViewSet, MapTileView, MapClusterView
 )
 
 router = DefaultRouter()
@@ -17,5 +17,7 @@ router.register(r'parkings', ParkingAdViewSet)
 router.register(r'main', MainPageViewSet, basename='main')
 
 urlpatterns = [
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', MapTileView.as_view(), name='map-tile'),
+    path('tiles/<int:z>/<int:x>/<int:y>/clusters/', MapClusterView.as_view(), name='map-clusters'),
     path('', include(router.urls)),
 ]
@@ -1,52 +1,115 @@
-from rest_framework import viewsets
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from rest_framework import mixins, viewsets
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from django.db.models import Q, Count, Case, When, BooleanField
 from django.utils import timezone
 from datetime import timedelta
-from .models import ApartmentAd, HouseAd, CommercialAd, RoomAd, DachaAd, PlotAd, ParkingAd
+from .models import ApartmentAd, HouseAd, CommercialAd, RoomAd, DachaAd, PlotAd, ParkingAd, ListingIndex
 from .serializers import (
     ApartmentAdSerializer, HouseAdSerializer, CommercialAdSerializer,
-    RoomAdSerializer, DachaAdSerializer, PlotAdSerializer, ParkingAdSerializer
+    RoomAdSerializer, DachaAdSerializer, PlotAdSerializer, ParkingAdSerializer, ListingIndexSerializer,
+    RealEstateCardSerializer
 )
 from .filters import (
     ApartmentAdFilter, HouseAdFilter, CommercialAdFilter,
     RoomAdFilter, DachaAdFilter, PlotAdFilter, ParkingAdFilter,
     MainPageFilter
 )
+from applications.common.counters import get_viewer_id, view_counter
+from applications.common.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from applications.common.facets import Facet, FacetsMixin, RangeFacet
+from applications.common.flat_serializers import FlatListMixin
+from applications.common.response_cache import CachedListMixin, CachedRetrieveMixin
+from applications.real_estate.models import RealEstateAd, marketing_images_cache
+from .pagination import RealEstatePagination
+from .tiles import TILE_CACHE_TIMEOUT, cluster_tile, get_cached_tile, render_tile
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class StandardPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
-class BaseRealEstateViewSet(viewsets.ModelViewSet):
+# Интервалы цены в сомах для счетчиков фильтров
+PRICE_FACET_BOUNDS = (1_000_000, 3_000_000, 5_000_000, 10_000_000, 20_000_000)
+LOCATION_FACETS = {
+    'region': Facet('region', attribute='region'),
+    'city': Facet('city', attribute='city'),
+    'district': Facet('district', attribute='district'),
+}
+PRICE_FACETS = {
+    'price': RangeFacet('price_kgs', PRICE_FACET_BOUNDS, params=('min_price', 'max_price')),
+}
+
+
+class BaseRealEstateViewSet(FacetsMixin, ConditionalListMixin, ConditionalRetrieveMixin, CachedListMixin,
+                            CachedRetrieveMixin, FlatListMixin, viewsets.ModelViewSet):
+    """
+    Списки по типам недвижимости. Курсорная пагинация (?pagination=cursor)
+    идет только в порядке "новые первыми": с order_by ответ 400, для сортировки
+    по цене нужен постраничный вывод (?page=).
+    """
     http_method_names = ['get']
     filter_backends = [DjangoFilterBackend]
+    pagination_class = RealEstatePagination
+    lookup_field = 'public_id'
+    cache_group = RealEstateAd.RESPONSE_CACHE_GROUP
+    # Изменения фото (в том числе размеры после оптимизации) обновляют updated_at в update_image_summary
+    etag_probe_fields = ('updated_at',)
+    list_serializer_class = RealEstateCardSerializer
+    detail_serializer_class = None
+    retrieve_select_related = ()
+    facet_fields = {**LOCATION_FACETS, **PRICE_FACETS}
+    # Поля карточки в списке; названия справочников берутся из кэша, без JOIN
+    card_fields = (
+        'public_id', 'ad_type', 'price', 'currency', 'price_kgs', 'city', 'main_image_url',
+        'image_count', 'is_featured', 'created_at'
+    )
+    optional_card_fields = ('title', 'property_type', 'total_area', 'rooms')
+
+    def get_serializer_class(self):
+        return self.list_serializer_class if self.action == 'list' else self.detail_serializer_class
+
+    def get_cache_category(self):
+        return self.queryset.model._meta.get_field('property_type').default
+
+    def get_etag_extra(self):
+        return (marketing_images_cache.get_version(),)
 
     def get_queryset(self):
-        return self.queryset.select_related(
-            'region', 'city', 'district', 'subscription', 'telephone',
+        queryset = super().get_queryset()
+
+        if self.action == 'list':
+            return self.get_optimized_list_queryset(queryset)
+        queryset = self.get_optimized_detail_queryset(queryset)
+        if self.retrieve_select_related:
+            queryset = queryset.select_related(*self.retrieve_select_related)
+        return queryset
+
+    def get_card_fields(self):
+        field_names = {field.name for field in self.queryset.model._meta.get_fields()}
+        return self.card_fields + tuple(name for name in self.optional_card_fields if name in field_names)
+
+    def get_optimized_list_queryset(self, queryset):
+        return queryset.only(*self.get_card_fields())
+
+    def get_optimized_detail_queryset(self, queryset):
+        return queryset.select_related(
+            'user', 'region', 'city', 'district', 'subscription', 'telephone',
             'heating_type', 'condition', 'internet', 'bathroom', 'gas',
             'balcony', 'main_door', 'parking', 'furniture', 'floor_type', 'exchange'
         ).prefetch_related(
             'safety', 'other', 'document', 'real_estate_phones', 'images',
-        ).annotate(
-            image_count=Count('images'),
-            has_main_image=Case(
-                When(images__is_main=True, then=True),
-                default=False,
-                output_field=BooleanField()
-            )
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            # Просмотр попадает в буфер, в том числе когда ответ взят из кэша или не изменился
+            view_counter.record_pk(self.queryset.model, kwargs[self.lookup_field], get_viewer_id(request))
+        return response
+
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
 
@@ -55,186 +118,87 @@ class BaseRealEstateViewSet(viewsets.ModelViewSet):
 
 
 class ApartmentAdViewSet(BaseRealEstateViewSet):
-    queryset = ApartmentAd.objects.filter(is_active=True)\
-        .select_related(
-            'user', 'region', 'city', 'district', 'subscription', 'exchange', 'telephone',
-            'heating_type', 'condition', 'internet', 'bathroom', 'gas', 'balcony', 'main_door',
-            'parking', 'furniture', 'floor_type', 'rooms', 'residential_complex', 'series',
-            'building_type', 'construction_year', 'floor', 'max_floor'
-        )\
-        .prefetch_related(
-            'safety', 'other', 'document', 'images', 'real_estate_phones'
-        )
-    serializer_class = ApartmentAdSerializer
+    queryset = ApartmentAd.objects.filter(is_active=True)
+    detail_serializer_class = ApartmentAdSerializer
     filterset_class = ApartmentAdFilter
-    lookup_field = 'public_id'
+    facet_fields = {**LOCATION_FACETS, **PRICE_FACETS, 'rooms': Facet('rooms', attribute='name'),
+                    'building_type': Facet('building_type', attribute='name'),
+                    'seria': Facet('series', attribute='name'),
+                    'residential_complex': Facet('residential_complex', attribute='name')}
+    retrieve_select_related = ('residential_complex', 'construction_year')
 
 
 class HouseAdViewSet(BaseRealEstateViewSet):
-    queryset = HouseAd.objects.filter(is_active=True)\
-        .select_related(
-            'user', 'region', 'city', 'district', 'subscription', 'exchange', 'telephone',
-            'heating_type', 'condition', 'internet', 'bathroom', 'gas', 'balcony', 'main_door',
-            'parking', 'furniture', 'floor_type', 'rooms', 'building_type', 'floor'
-        )\
-        .prefetch_related(
-            'safety', 'other', 'document', 'images', 'real_estate_phones'
-        )
-    serializer_class = HouseAdSerializer
+    queryset = HouseAd.objects.filter(is_active=True)
+    detail_serializer_class = HouseAdSerializer
     filterset_class = HouseAdFilter
-    lookup_field = 'public_id'
+    facet_fields = {**LOCATION_FACETS, **PRICE_FACETS, 'rooms': Facet('rooms', attribute='name'),
+                    'building_type': Facet('building_type', attribute='name')}
 
 
 class CommercialAdViewSet(BaseRealEstateViewSet):
-    queryset = CommercialAd.objects.filter(is_active=True)\
-        .select_related(
-            'user', 'region', 'city', 'district', 'subscription', 'exchange', 'telephone',
-            'heating_type', 'condition', 'internet', 'bathroom', 'gas', 'balcony', 'main_door',
-            'parking', 'furniture', 'floor_type', 'object_type', 'residential_complex', 'building_type',
-            'construction_year', 'floor', 'max_floor'
-        )\
-        .prefetch_related(
-            'safety', 'other', 'document', 'images', 'real_estate_phones'
-        )
-    serializer_class = CommercialAdSerializer
+    queryset = CommercialAd.objects.filter(is_active=True)
+    detail_serializer_class = CommercialAdSerializer
     filterset_class = CommercialAdFilter
-    lookup_field = 'public_id'
+    facet_fields = {**LOCATION_FACETS, **PRICE_FACETS, 'object_type': Facet('object_type', attribute='name'),
+                    'building_type': Facet('building_type', attribute='name')}
+    retrieve_select_related = ('residential_complex', 'construction_year')
 
 
 class RoomAdViewSet(BaseRealEstateViewSet):
-    queryset = RoomAd.objects.filter(is_active=True)\
-        .select_related(
-            'user', 'region', 'city', 'district', 'subscription', 'exchange', 'telephone',
-            'heating_type', 'condition', 'internet', 'bathroom', 'gas', 'balcony', 'main_door',
-            'parking', 'furniture', 'floor_type', 'rooms', 'room_location', 'floor', 'max_floor'
-        )\
-        .prefetch_related(
-            'safety', 'other', 'document', 'images', 'real_estate_phones'
-        )
-    serializer_class = RoomAdSerializer
+    queryset = RoomAd.objects.filter(is_active=True)
+    detail_serializer_class = RoomAdSerializer
     filterset_class = RoomAdFilter
-    lookup_field = 'public_id'
+    facet_fields = {**LOCATION_FACETS, **PRICE_FACETS, 'rooms': Facet('rooms', attribute='name')}
 
 
 class DachaAdViewSet(BaseRealEstateViewSet):
-    queryset = DachaAd.objects.filter(is_active=True)\
-        .select_related(
-            'user', 'region', 'city', 'district', 'subscription', 'exchange', 'telephone',
-            'heating_type', 'condition', 'internet', 'bathroom', 'gas', 'balcony', 'main_door',
-            'parking', 'furniture', 'floor_type', 'rooms', 'building_type', 'floor'
-        )\
-        .prefetch_related(
-            'safety', 'other', 'document', 'images', 'real_estate_phones'
-        )
-    serializer_class = DachaAdSerializer
+    queryset = DachaAd.objects.filter(is_active=True)
+    detail_serializer_class = DachaAdSerializer
     filterset_class = DachaAdFilter
-    lookup_field = 'public_id'
+    facet_fields = {**LOCATION_FACETS, **PRICE_FACETS, 'rooms': Facet('rooms', attribute='name'),
+                    'building_type': Facet('building_type', attribute='name')}
 
 
 class PlotAdViewSet(BaseRealEstateViewSet):
-    queryset = PlotAd.objects.filter(is_active=True)\
-        .select_related(
-            'user', 'region', 'city', 'district', 'subscription', 'exchange', 'telephone',
-            'heating_type', 'condition', 'internet', 'bathroom', 'gas', 'balcony', 'main_door',
-            'parking', 'furniture', 'floor_type'
-        )\
-        .prefetch_related(
-            'safety', 'other', 'document', 'images', 'real_estate_phones'
-        )
-    serializer_class = PlotAdSerializer
+    queryset = PlotAd.objects.filter(is_active=True)
+    detail_serializer_class = PlotAdSerializer
     filterset_class = PlotAdFilter
-    lookup_field = 'public_id'
 
 
 class ParkingAdViewSet(BaseRealEstateViewSet):
-    queryset = ParkingAd.objects.filter(is_active=True)\
-        .select_related(
-            'user', 'region', 'city', 'district', 'subscription', 'exchange', 'telephone',
-            'heating_type', 'condition', 'internet', 'bathroom', 'gas', 'balcony', 'main_door',
-            'parking', 'furniture', 'floor_type', 'residential_complex'
-        )\
-        .prefetch_related(
-            'safety', 'other', 'document', 'images', 'real_estate_phones'
-        )
-    serializer_class = ParkingAdSerializer
+    queryset = ParkingAd.objects.filter(is_active=True)
+    detail_serializer_class = ParkingAdSerializer
     filterset_class = ParkingAdFilter
-    lookup_field = 'public_id'
-
-
-class MainPageViewSet(viewsets.ViewSet):
+    facet_fields = {**PRICE_FACETS, 'residential_complex': Facet('residential_complex', attribute='name')}
+    retrieve_select_related = ('residential_complex',)
+
+
+class MainPageViewSet(ConditionalListMixin, CachedListMixin, FlatListMixin, mixins.ListModelMixin,
+                      viewsets.GenericViewSet):
+    """
+    Лента главной страницы. Поиск сортирует по релевантности, поэтому вместе с
+    search курсорная пагинация недоступна (400) - только ?page=.
+    """
+    queryset = ListingIndex.objects.filter(is_active=True)
+    serializer_class = ListingIndexSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = MainPageFilter
-    pagination_class = StandardPagination
-
-    def get_querysets(self):
-        property_type = self.request.query_params.get('property_type')
-        search_query = self.request.query_params.get('search', '')
+    pagination_class = RealEstatePagination
+    cache_group = RealEstateAd.RESPONSE_CACHE_GROUP
 
+    def get_queryset(self):
         # Ограничиваем выборку по времени (последние 30 дней)
         date_limit = timezone.now() - timedelta(days=30)
 
-        # Определяем модели, их связи и property_type
-        models = [
-            (ApartmentAd, ['rooms', 'residential_complex', 'series', 'building_type', 'construction_year', 'floor', 'max_floor'], 'apartments'),
-            (HouseAd, ['rooms', 'building_type', 'floor'], 'houses'),
-            (CommercialAd, ['object_type', 'residential_complex', 'building_type', 'construction_year', 'floor', 'max_floor'], 'commercials'),
-            (RoomAd, ['rooms', 'room_location', 'floor', 'max_floor'], 'rooms'),
-            (DachaAd, ['rooms', 'building_type'], 'dachas'),
-            (PlotAd, [], 'plots'),
-            (ParkingAd, ['residential_complex'], 'parkings'),
-        ]
+        # Справочные поля (регион, город, комнаты...) сериализатор берет из кэша справочников
+        return super().get_queryset().filter(
+            created_at__gte=date_limit
+        ).order_by('-created_at')
 
-        querysets = []
-        for model, extra_selects, prop_type in models:
-            if property_type and prop_type != property_type:
-                continue
-
-            qs = model.objects.filter(
-                is_active=True,
-                created_at__gte=date_limit
-            ).select_related(
-                'region', 'city', 'district', 'subscription', 'telephone',
-                'heating_type', 'condition', 'internet', 'bathroom', 'gas',
-                'balcony', 'main_door', 'parking', 'furniture', 'floor_type', 'exchange',
-                *extra_selects
-            ).prefetch_related(
-                'safety', 'other', 'document', 'real_estate_phones', 'images',
-            ).annotate(
-                image_count=Count('images'),
-                has_main_image=Case(
-                    When(images__is_main=True, then=True),
-                    default=False,
-                    output_field=BooleanField()
-                )
-            )
-
-            if search_query:
-                qs = qs.filter(
-                    Q(title__icontains=search_query) |
-                    Q(description__icontains=search_query) |
-                    Q(address__icontains=search_query) |
-                    Q(region__region__icontains=search_query) |
-                    Q(city__city__icontains=search_query) |
-                    (Q(rooms__name__icontains=search_query) if 'rooms' in extra_selects else Q()) |
-                    (Q(residential_complex__name__icontains=search_query) if 'residential_complex' in extra_selects else Q())
-                )
-
-            querysets.append((qs, prop_type))
-
-        # Получаем последние объекты
-        all_objects = []
-        limit_per_model = 20  # Ограничиваем до 20 объектов на модель
-        for qs, prop_type in querysets:
-            objects = list(qs.order_by('-created_at')[:limit_per_model])
-            logger.debug(f"Fetched {len(objects)} objects for {prop_type}")
-            for obj in objects:
-                all_objects.append((obj, prop_type))
-
-        # Сортируем по created_at
-        all_objects.sort(key=lambda x: x[0].created_at, reverse=True)
-        logger.debug(f"Total objects after sorting: {len(all_objects)}")
-
-        return all_objects[:100]  # Ограничиваем общий список до 100
+    def get_list_etag_extra(self):
+        # Лента ограничена последними 30 днями: состав меняется и без изменений объявлений
+        return (timezone.localdate(),)
 
     @extend_schema(
         parameters=[
@@ -248,75 +212,40 @@ class MainPageViewSet(viewsets.ViewSet):
             OpenApiParameter(name='max_area', type=float, description='Maximum area'),
             OpenApiParameter(name='page', type=int, description='Page number', default=1),
             OpenApiParameter(name='page_size', type=int, description='Number of items per page', default=20),
-        ],
-        responses={
-            200: {
-                'type': 'object',
-                'properties': {
-                    'results': {'type': 'array', 'items': {'type': 'object'}},
-                    'count': {'type': 'integer'},
-                    'next': {'type': 'string', 'nullable': True},
-                    'previous': {'type': 'string', 'nullable': True}
-                }
-            }
-        }
+            OpenApiParameter(name='pagination', type=str, description='Set to "cursor" for keyset pagination '
+                                                                     '(newest first only; 400 with search or order_by)'),
+            OpenApiParameter(name='cursor', type=str, description='Cursor from the next/previous link'),
+        ]
     )
-    def list(self, request):
-        all_objects = self.get_querysets()
-
-        # Ручная фильтрация
-        filter_instance = self.filterset_class(request.query_params, queryset=ApartmentAd.objects.none())
-        filter_params = filter_instance.data
-
-        filtered_objects = []
-        for obj, prop_type in all_objects:
-            if filter_params.get('min_price') and obj.price < float(filter_params['min_price']):
-                continue
-            if filter_params.get('max_price') and obj.price > float(filter_params['max_price']):
-                continue
-            if filter_params.get('min_area') and obj.total_area and obj.total_area < float(filter_params['min_area']):
-                continue
-            if filter_params.get('max_area') and obj.total_area and obj.total_area > float(filter_params['max_area']):
-                continue
-            if filter_params.get('region') and obj.region and obj.region.region != filter_params['region']:
-                continue
-            if filter_params.get('city') and obj.city and obj.city.city != filter_params['city']:
-                continue
-            filtered_objects.append((obj, prop_type))
-
-        logger.debug(f"Objects after filtering: {len(filtered_objects)}")
-
-        paginator = self.pagination_class()
-        page_number = request.query_params.get('page', 1)
-        page_size = int(request.query_params.get('page_size', paginator.page_size))
-        start = (int(page_number) - 1) * page_size
-        end = start + page_size
-        paginated_objects = filtered_objects[start:end]
-
-        # Сериализация
-        serialized_objects = []
-        for obj, prop_type in paginated_objects:
-            serializer_class = {
-                'apartments': ApartmentAdSerializer,
-                'houses': HouseAdSerializer,
-                'commercials': CommercialAdSerializer,
-                'rooms': RoomAdSerializer,
-                'dachas': DachaAdSerializer,
-                'plots': PlotAdSerializer,
-                'parkings': ParkingAdSerializer
-            }.get(prop_type, ApartmentAdSerializer)
-            serializer = serializer_class(obj, context={'request': request})
-            serialized_objects.append({
-                'type': prop_type,
-                'data': serializer.data
-            })
-
-        # Формируем ответ
-        response_data = {
-            'results': serialized_objects,
-            'count': len(filtered_objects),
-            'next': f"?page={int(page_number) + 1}&page_size={page_size}" if end < len(filtered_objects) else None,
-            'previous': f"?page={int(page_number) - 1}&page_size={page_size}" if start > 0 else None
-        }
-        logger.debug(f"Paginated response: {len(serialized_objects)} objects on page {page_number}")
-        return Response(response_data)
\ No newline at end of file
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+MAP_FILTER_PARAMETERS = [
+    OpenApiParameter(name='property_type', type=str, description='Тип недвижимости; фильтры соответствующего списка'),
+    OpenApiParameter(name='near', type=str, description='lat,lon,км'),
+    OpenApiParameter(name='min_price', type=float),
+    OpenApiParameter(name='max_price', type=float),
+]
+
+
+class MapTileView(APIView):
+    """Векторный тайл (MVT) с точками объявлений"""
+
+    @extend_schema(parameters=MAP_FILTER_PARAMETERS, responses={(200, 'application/vnd.mapbox-vector-tile'): bytes})
+    def get(self, request, z, x, y):
+        content = get_cached_tile('mvt', request, z, x, y, render_tile)
+        response = HttpResponse(content, content_type='application/vnd.mapbox-vector-tile')
+        patch_cache_control(response, public=True, max_age=TILE_CACHE_TIMEOUT)
+        return response
+
+
+class MapClusterView(APIView):
+    """Кластеры объявлений в тайле: количество и минимальная цена по ячейкам сетки"""
+
+    @extend_schema(parameters=MAP_FILTER_PARAMETERS)
+    def get(self, request, z, x, y):
+        clusters = get_cached_tile('clusters', request, z, x, y, cluster_tile)
+        response = Response({'z': z, 'x': x, 'y': y, 'clusters': clusters})
+        patch_cache_control(response, public=True, max_age=TILE_CACHE_TIMEOUT)
+        return response
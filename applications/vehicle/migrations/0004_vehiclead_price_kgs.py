@@ -0,0 +1,37 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0003_alter_vehiclead_qr_code'),
+        ('common', '0002_exchangerate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiclead',
+            name='price_kgs',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Цена в сомах'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE vehicle_vehiclead AS ad
+            SET price_kgs = CASE
+                WHEN currency.currency = 'USD' THEN ROUND(ad.price * (
+                    SELECT rate FROM common_exchangerate ORDER BY updated_at DESC LIMIT 1
+                ), 2)
+                ELSE ad.price
+            END
+            FROM common_currency AS currency
+            WHERE ad.currency_id = currency.id
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            "UPDATE vehicle_vehiclead SET price_kgs = price WHERE currency_id IS NULL",
+            migrations.RunSQL.noop,
+        ),
+    ]
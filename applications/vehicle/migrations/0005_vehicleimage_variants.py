@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-18 14:05
+
+from cloudinary import CloudinaryResource
+from django.db import migrations, models
+
+# Копия applications.common.images на момент миграции: миграция не должна
+# зависеть от того, как код приложения строит размеры позже
+IMAGE_VARIANTS = {
+    'thumbnail': {'width': 320, 'height': 240, 'crop': 'fill', 'gravity': 'auto'},
+    'card': {'width': 640, 'crop': 'limit'},
+    'full': {'width': 1920, 'crop': 'limit'},
+}
+
+
+def build_image_variants(image):
+    if not isinstance(image, CloudinaryResource) or not image.public_id:
+        return {}
+    variants = {
+        name: image.build_url(quality='auto', fetch_format='auto', secure=True, **options)
+        for name, options in IMAGE_VARIANTS.items()
+    }
+    variants['srcset'] = ', '.join(f"{variants[name]} {options['width']}w" for name, options in IMAGE_VARIANTS.items())
+    return variants
+
+
+def backfill_variants(apps, schema_editor):
+    VehicleImage = apps.get_model('vehicle', 'VehicleImage')
+
+    batch = []
+    for image in VehicleImage.objects.only('pk', 'image').iterator(chunk_size=2000):
+        image.variants = build_image_variants(image.image)
+        batch.append(image)
+        if len(batch) == 2000:
+            VehicleImage.objects.bulk_update(batch, ['variants'])
+            batch = []
+    VehicleImage.objects.bulk_update(batch, ['variants'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0004_vehiclead_price_kgs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='URL превью, карточки и полного размера и srcset по ним', verbose_name='Размеры изображения'),
+        ),
+        migrations.RunPython(backfill_variants, migrations.RunPython.noop),
+    ]
@@ -12,7 +12,12 @@ from django.utils import timezone
 from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 
-from applications.common.models import Currency, Subscription, generate_short_id, Exchange, Region, City, CountryName
+from applications.common.cache import reference_cache
+from applications.common.counters import view_counter
+from applications.common.images import build_image_variants
+from applications.common.response_cache import bump_generation
+from applications.common.models import Currency, Subscription, generate_short_id, Exchange, Region, City, CountryName, \
+    ExchangeRate
 from applications.user.tasks import logger
 from core import settings
 from django.utils.translation import gettext_lazy as _
@@ -510,6 +515,15 @@ class VehicleAd(models.Model):
         null=True,
         related_name='vahicle_ad_currency'
     )
+    price_kgs = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        db_index=True,
+        editable=False,
+        verbose_name=_('Цена в сомах')
+    )
     exchange = models.ForeignKey(
         Exchange,
         on_delete=models.SET_NULL,
@@ -578,6 +592,8 @@ class VehicleAd(models.Model):
     )
 
     _qr_needs_regeneration = False
+    # Группа поколений кэша ответов API, категория - category
+    RESPONSE_CACHE_GROUP = 'vehicle'
 
     def expiration_date(self):
         if self.subscription:
@@ -640,7 +656,12 @@ class VehicleAd(models.Model):
             self.is_active = True
         else:
             self.is_active = False
+        self.calculate_price_kgs()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'price_kgs'}
         super().save(*args, **kwargs)
+        self.invalidate_responses(getattr(self, 'category', None))
 
     class Meta:
         verbose_name = _('Транспортное средство')
@@ -654,9 +675,32 @@ class VehicleAd(models.Model):
             models.Index(fields=['user']),
         ]
 
-    def increment_view(self):
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+    def increment_view(self, viewer=None):
+        """Просмотр попадает в буфер, view_count обновит задача flush_view_counts"""
+        return view_counter.record(self, viewer)
+
+    def calculate_price_kgs(self):
+        """Цена в сомах по текущему курсу; валюта берется из кэша справочников"""
+        currency = reference_cache.get(Currency, self.currency_id) if self.currency_id else None
+        if currency is None or currency.currency != 'USD':
+            self.price_kgs = self.price
+            return
+        rate = ExchangeRate.get_current_rate()
+        if rate is not None:
+            self.price_kgs = self.price * rate
+
+    @classmethod
+    def recompute_price_kgs(cls, rate):
+        """Цены в сомах долларовых объявлений по новому курсу одним UPDATE"""
+        price_kgs = ExchangeRate.price_kgs_expression(rate)
+        return cls.objects.filter(currency__currency='USD').exclude(price_kgs=price_kgs).update(
+            price_kgs=price_kgs
+        )
+
+    @classmethod
+    def invalidate_responses(cls, *categories):
+        """Новое поколение кэша ответов API по категориям транспорта (без категорий - для всех)"""
+        bump_generation(cls.RESPONSE_CACHE_GROUP, *categories)
 
     def deactivate(self):
         self.status = 'dactivated'
@@ -686,10 +730,26 @@ class VehicleImage(models.Model):
         default=False,
         verbose_name=_('Основное изображение')
     )
+    variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name=_('Размеры изображения'),
+        help_text=_('URL превью, карточки и полного размера и srcset по ним')
+    )
 
     def __str__(self):
         return f"{_('Изображение для')} {self.vehicle}"
 
+    def store_variants(self):
+        """Сохраняем URL размеров после загрузки изображения; пишем только при изменении"""
+        variants = build_image_variants(self.image)
+        if variants != self.variants:
+            self.variants = variants
+            VehicleImage.objects.filter(pk=self.pk).update(variants=variants)
+            # UPDATE не меняет updated_at объявления, а по нему считается ETag карточки
+            VehicleAd.objects.filter(pk=self.vehicle_id).update(updated_at=timezone.now())
+
     class Meta:
         verbose_name = _('Изображение')
         verbose_name_plural = _('Изображения')
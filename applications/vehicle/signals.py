@@ -1,4 +1,4 @@
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import pre_save, post_delete, post_save
 from django.dispatch import receiver
 from .models import VehicleImage, VehicleAd
 import cloudinary.uploader
@@ -36,3 +36,16 @@ def delete_associated_files(sender, instance, **kwargs):
             cloudinary.uploader.destroy(instance.qr_code.public_id)
         except:
             pass
+
+
+@receiver(post_save, sender=VehicleImage)
+def store_image_variants(sender, instance, **kwargs):
+    instance.store_variants()
+
+
+@receiver(post_save, sender=VehicleImage)
+@receiver(post_delete, sender=VehicleImage)
+@receiver(post_delete, sender=VehicleAd)
+def invalidate_vehicle_responses(sender, instance, **kwargs):
+    # Категория хранится в дочерней таблице, поэтому сбрасываем все категории
+    VehicleAd.invalidate_responses()
@@ -90,13 +90,17 @@ class BaseVehicleAdmin(admin.ModelAdmin):
     price_display.short_description = _('Цена')
 
     def deactivate_vehicles(self, request, queryset):
+        categories = set(queryset.values_list('category', flat=True))
         updated = queryset.update(is_active=False)
+        queryset.model.invalidate_responses(*categories)
         self.message_user(request, _('%(count)d объявлений деактивированы.') % {'count': updated})
 
     deactivate_vehicles.short_description = _('Деактивировать объявления')
 
     def activate_vehicles(self, request, queryset):
+        categories = set(queryset.values_list('category', flat=True))
         updated = queryset.update(is_active=True)
+        queryset.model.invalidate_responses(*categories)
         self.message_user(request, _('%(count)d объявлений активированы.') % {'count': updated})
 
     activate_vehicles.short_description = _('Активировать объявления')
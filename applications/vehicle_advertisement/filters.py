@@ -23,7 +23,8 @@ class BaseVehicleFilter(django_filters.FilterSet):
         label='Год выпуска'
     )
     price = django_filters.RangeFilter(
-        label='Цена'
+        field_name='price_kgs',
+        label='Цена (в сомах)'
     )
     min_mileage = django_filters.NumberFilter(
         field_name='mileage',
@@ -57,7 +58,7 @@ class BaseVehicleFilter(django_filters.FilterSet):
     )
     order_by = django_filters.OrderingFilter(
         fields=(
-            ('price', 'price'),
+            ('price_kgs', 'price'),
             ('year__year', 'year'),
             ('mileage', 'mileage'),
             ('created_at', 'created_at'),
@@ -65,7 +66,7 @@ class BaseVehicleFilter(django_filters.FilterSet):
             ('model__name', 'model'),
         ),
         field_labels={
-            'price': 'Цена',
+            'price_kgs': 'Цена',
             'year__year': 'Год',
             'mileage': 'Пробег',
             'created_at': 'Дата создания',
@@ -3,6 +3,8 @@ from drf_spectacular.utils import extend_schema_serializer, OpenApiExample, exte
 from rest_framework import serializers
 
 from .models import PassengerCar, CommercialCar, SpecialCar, Moto
+from ..common.cache import reference_cache
+from ..common.models import Currency
 from ..common.serializers import SubscriptionSerializer, CurrencySerializer, ExchangeSerializer, CountryNameSerializer
 from ..vehicle.serializers import VehicleBodyTypeSerializer, VehicleMakeSerializer, VehicleModelSerializer, \
     VehicleColorSerializer, OtherInfoSerializer, AppearanceSerializer, SalonSerializer, MediaSerializer, \
@@ -43,10 +45,13 @@ class BaseListVehicleSerializer(serializers.ModelSerializer):
     class Meta:
         abstract = True
         fields = ["public_id", "city", "price", "images", "year", "make", "model"]
+        # Атрибуты, которые читают методы (для FlatSerializer)
+        flat_values = ("price", "currency_id")
 
     @extend_schema_field(OpenApiTypes.STR)
     def get_price(self, obj):
-        return f"{obj.price}{obj.currency}"
+        currency = reference_cache.get(Currency, obj.currency_id) if obj.currency_id else None
+        return f"{obj.price}{currency}"
 
 
 class PassengerListSerializer(BaseListVehicleSerializer):
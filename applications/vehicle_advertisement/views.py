@@ -264,6 +264,7 @@
 #######################################################################################
 
 
+from django.db.models import Count, Max
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 from rest_framework.pagination import CursorPagination
@@ -271,6 +272,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
 from rest_framework import filters
 
+from applications.common.counters import get_viewer_id, view_counter
+from applications.common.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from applications.common.facets import Facet, FacetsMixin, RangeFacet
+from applications.common.flat_serializers import FlatListMixin
+from applications.common.response_cache import CachedListMixin, CachedRetrieveMixin
+from applications.vehicle.models import VehicleAd
 from applications.vehicle_advertisement.filters import (
     PassengerCarFilter, CommercialCarFilter,
     SpecialCarFilter, MotoFilter
@@ -291,18 +298,33 @@ class VehicleCursorPagination(CursorPagination):
     ordering = '-created_at'
 
 
+# Интервалы цены в сомах для счетчиков фильтров
+PRICE_FACET_BOUNDS = (500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000)
+
+
 @extend_schema(tags=['Vehicle Advertisements'])
-class BaseVehicleViewSet(ModelViewSet):
+class BaseVehicleViewSet(FacetsMixin, ConditionalListMixin, ConditionalRetrieveMixin, CachedListMixin,
+                         CachedRetrieveMixin, FlatListMixin, ModelViewSet):
     http_method_names = ['get']
     pagination_class = VehicleCursorPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
     ]
+    cache_group = VehicleAd.RESPONSE_CACHE_GROUP
+    etag_probe_fields = ('updated_at', 'image_count', 'last_image_id')
     list_serializer_class = None
     detail_serializer_class = None
     list_select_related = ()
     retrieve_select_related = ()
+    facet_fields = {
+        'make': Facet('make', attribute='name'),
+        'model': Facet('model', attribute='name'),
+        'year': Facet('year__year', params=('year_min', 'year_max')),
+        'price': RangeFacet('price_kgs', PRICE_FACET_BOUNDS, params=('price_min', 'price_max')),
+        'region': Facet('region', attribute='region'),
+        'city': Facet('city', attribute='city'),
+    }
     base_list_fields = [
         'price', 'year',
         'city_id', 'city__city',
@@ -314,6 +336,23 @@ class BaseVehicleViewSet(ModelViewSet):
     def get_serializer_class(self):
         return self.list_serializer_class if self.action == 'list' else self.detail_serializer_class
 
+    def get_cache_category(self):
+        return self.queryset.model._meta.get_field('category').default
+
+    def get_etag_probe_queryset(self):
+        # Добавление и удаление фото не меняют updated_at объявления, их считаем агрегатом
+        # (смена размеров фото обновляет updated_at в VehicleImage.store_variants)
+        return super().get_etag_probe_queryset().annotate(
+            image_count=Count('images'), last_image_id=Max('images__id')
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            # Просмотр попадает в буфер, в том числе когда ответ взят из кэша или не изменился
+            view_counter.record_pk(self.queryset.model, kwargs[self.lookup_field], get_viewer_id(request))
+        return response
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
@@ -347,6 +386,13 @@ class PassengerCarViewSet(BaseVehicleViewSet):
     queryset = PassengerCar.objects.filter(is_active=True)
     list_serializer_class = PassengerListSerializer
     detail_serializer_class = PassengerCarSerializer
+    facet_fields = {
+        **BaseVehicleViewSet.facet_fields,
+        'body_type': Facet('body_type', attribute='name'),
+        'fuel_type': Facet('fuel_type', attribute='fuel'),
+        'transmission': Facet('transmission', attribute='transmission'),
+        'drive_type': Facet('drive_type', attribute='drive'),
+    }
     retrieve_select_related = (
         'body_type', 'generation', 'fuel_type',
         'drive_type', 'transmission', 'modification'
@@ -358,6 +404,7 @@ class CommercialCarViewSet(BaseVehicleViewSet):
     queryset = CommercialCar.objects.filter(is_active=True)
     list_serializer_class = CommercialListSerializer
     detail_serializer_class = CommercialCarSerializer
+    facet_fields = {**BaseVehicleViewSet.facet_fields, 'commercial_type': Facet('commercial_type', attribute='name')}
     list_select_related = ('commercial_type',)
     retrieve_select_related = (
         'commercial_type', 'body_type', 'generation',
@@ -372,6 +419,7 @@ class SpecialCarViewSet(BaseVehicleViewSet):
     queryset = SpecialCar.objects.filter(is_active=True)
     list_serializer_class = SpecialListSerializer
     detail_serializer_class = SpecialCarSerializer
+    facet_fields = {**BaseVehicleViewSet.facet_fields, 'special_type': Facet('special_type', attribute='name')}
     list_select_related = ('special_type',)
     retrieve_select_related = ('special_type', 'fuel_type')
     base_list_fields = BaseVehicleViewSet.base_list_fields + ['special_type_id']
@@ -382,6 +430,7 @@ class MotoViewSet(BaseVehicleViewSet):
     queryset = Moto.objects.filter(is_active=True)
     list_serializer_class = MotoListSerializer
     detail_serializer_class = MotoSerializer
+    facet_fields = {**BaseVehicleViewSet.facet_fields, 'moto_type': Facet('moto_type', attribute='name')}
     list_select_related = ('moto_type',)
     retrieve_select_related = ('moto_type', 'seria', 'modification')
     base_list_fields = BaseVehicleViewSet.base_list_fields + ['moto_type_id']
\ No newline at end of file
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from applications.common.cache import reference_cache
+from applications.common.models import City, Currency, ExchangeRate, Region, Subscription, exchange_rate_cache
+from applications.real_estate.models import RealEstateAdImage, marketing_images_cache
+from applications.real_estate_advertisement.models import (
+    ApartmentAd, CommercialAd, DachaAd, HouseAd, ParkingAd, PlotAd, RoomAd
+)
+from applications.vehicle.models import VehicleAd, VehicleImage, VehicleMake, VehicleModel
+from applications.vehicle_advertisement.models import CommercialCar, Moto, PassengerCar, SpecialCar
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    """Кэш в памяти процесса вместо Redis; локальные копии двухуровневых кэшей не переходят между тестами"""
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    cache.clear()
+    for two_level_cache in (exchange_rate_cache, marketing_images_cache, *reference_cache._caches.values()):
+        two_level_cache._local.clear()
+
+
+@pytest.fixture
+def user(db):
+    return get_user_model().objects.create_user(email='owner@example.com', password='password')
+
+
+@pytest.fixture
+def listings(user, monkeypatch):
+    """По объявлению каждого типа недвижимости и транспорта, активные, с фото"""
+    # QR-код транспорта загружается в Cloudinary при создании
+    monkeypatch.setattr(VehicleAd, '_generate_qr_code', lambda ad: setattr(ad, 'qr_code', f'qr_codes/{ad.public_id}'))
+
+    ExchangeRate.objects.create(rate=Decimal('87.5'))
+    region = Region.objects.create(region='Чуйская область')
+    city = City.objects.create(region=region, city='Бишкек')
+    subscription = Subscription.objects.create(duration_days=30)
+    common = {
+        'user': user, 'region': region, 'city': city, 'subscription': subscription, 'is_approved': True,
+        'approved_at': timezone.now(), 'description': 'Продается в хорошем состоянии', 'address': 'ул. Киевская 1',
+    }
+    ads = [
+        ApartmentAd.objects.create(**common, price=65_000, total_area=54),
+        HouseAd.objects.create(**common, price=120_000, area=6, currency='USD'),
+        CommercialAd.objects.create(**common, price=9_000_000, currency='KGS', total_area=120),
+        RoomAd.objects.create(**common, price=15_000, total_area=18),
+        DachaAd.objects.create(**common, price=30_000, area=6, total_area=60),
+        PlotAd.objects.create(**common, price=2_500_000, currency='KGS', total_area=10),
+        ParkingAd.objects.create(**common, price=8_000),
+    ]
+    RealEstateAdImage.objects.create(ad=ads[0], image='image/upload/v1/real_estate/apartment.jpg', is_main=True)
+
+    usd = Currency.objects.create(currency='USD')
+    make = VehicleMake.objects.create(category='passenger', name='Toyota')
+    model = VehicleModel.objects.create(make=make, name='Camry')
+    vehicle = {
+        'user': user, 'region': region, 'city': city, 'subscription': subscription, 'currency': usd,
+        'make': make, 'model': model, 'mileage': 120_000, 'description': 'Один владелец',
+    }
+    vehicles = [
+        PassengerCar.objects.create(**vehicle, price=18_500),
+        CommercialCar.objects.create(**vehicle, price=25_000),
+        SpecialCar.objects.create(**vehicle, price=60_000),
+        Moto.objects.create(**vehicle, price=4_000),
+    ]
+    VehicleImage.objects.create(vehicle=vehicles[0], image='image/upload/v1/vehicles/camry.jpg', is_main=True)
+    return ads, vehicles
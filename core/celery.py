@@ -16,8 +16,12 @@ app.autodiscover_tasks()
 
 app.conf.beat_schedule = {
     'deactivate-expired-ads-daily': {
-        'task': 'real_estate.tasks.check_expiring_ads',
+        'task': 'applications.real_estate_advertisement.tasks.deactivate_expired_ads',
         'schedule': 86400,  # 24 часа в секундах
         'options': {'queue': 'maintenance'},
     },
+    'flush-view-counts': {
+        'task': 'applications.common.tasks.flush_view_counts',
+        'schedule': 60,
+    },
 }
\ No newline at end of file
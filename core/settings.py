@@ -3,6 +3,7 @@ from datetime import timedelta
 from pathlib import Path
 
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
@@ -38,7 +39,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     # libraries
-    'debug_toolbar',
     'rest_framework',
     'django_filters',
     'corsheaders',
@@ -58,12 +58,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'applications.common.metrics.RequestMetricsMiddleware',
+    'applications.common.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -207,6 +208,42 @@ CELERY_TASK_SERIALIZER = 'json'
 
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers.DatabaseScheduler'
 
+# Общий кэш обязателен: версии кэшей справочников и поколения ответов API должны
+# быть общими для всех процессов gunicorn и Celery. Локальный кэш - только при DEBUG
+# и пустом CACHE_REDIS_URL.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', CELERY_BROKER_URL)
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+elif not DEBUG:
+    raise ImproperlyConfigured('CACHE_REDIS_URL не задан: без DEBUG нужен общий кэш (Redis)')
+
+# Буфер просмотров объявлений (Redis, общий для веб-процессов и задачи сброса).
+# Пустой URL - буфер в памяти процесса, только при DEBUG
+VIEW_COUNTER_REDIS_URL = os.getenv('VIEW_COUNTER_REDIS_URL', CELERY_BROKER_URL)
+if not VIEW_COUNTER_REDIS_URL and not DEBUG:
+    raise ImproperlyConfigured('VIEW_COUNTER_REDIS_URL не задан: без DEBUG буфер просмотров хранится в Redis')
+# Повторный просмотр тем же пользователем/IP в течение этого времени не учитывается (0 - учитывать все)
+VIEW_COUNTER_UNIQUE_TTL = int(os.getenv('VIEW_COUNTER_UNIQUE_TTL', 24 * 60 * 60))
+VIEW_COUNTER_MODELS = ('real_estate.RealEstateAd', 'vehicle.VehicleAd')
+# Таблицы с ценой в сомах, пересчитываемой при изменении курса (recompute_price_kgs)
+NORMALIZED_PRICE_MODELS = (
+    'real_estate.RealEstateAd', 'real_estate_advertisement.ListingIndex', 'vehicle.VehicleAd'
+)
+
+# Время жизни закэшированных ответов API для анонимных пользователей, сек
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 5 * 60))
+
+# Метрики запросов и задач для /metrics (пустая строка - в памяти процесса)
+METRICS_REDIS_URL = os.getenv('METRICS_REDIS_URL', CELERY_BROKER_URL)
+# Токен сборщика метрик (Authorization: Bearer ...); без токена /metrics доступен только персоналу
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True') == 'True'
+
 
 QR_BASE_URL = config('QR_BASE_URL')
 
@@ -214,6 +251,10 @@ if DEBUG:
     INTERNAL_IPS = [
         '127.0.0.1',
     ]
+    # Панель отладки только при разработке: она замеряет каждый запрос
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.csrf.CsrfViewMiddleware') + 1,
+                      'debug_toolbar.middleware.DebugToolbarMiddleware')
 
 
 DEBUG_TOOLBAR_PANELS = [
@@ -232,10 +273,17 @@ DEBUG_TOOLBAR_PANELS = [
     # 'debug_toolbar.panels.redirects.RedirectsPanel',
 ]
 
-DEBUG_TOOLBAR_CONFIG = {
-    'SHOW_TOOLBAR_CALLBACK': lambda request: True,
-    'RENDER_PANELS': True,
-}
+# Профилирование запросов в production (applications.common.profiling)
+# Доля случайно профилируемых запросов, 0 - только по заголовку X-Profile
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+# Профили по выборке сохраняются, если запрос дольше этого порога, мс
+PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', 500))
+# Сколько последних профилей хранить
+PROFILING_BUFFER_SIZE = int(os.getenv('PROFILING_BUFFER_SIZE', 100))
+# cprofile - cProfile, stack - выборка стеков (flame graph)
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'cprofile')
+# Срок действия токена заголовка X-Profile, сек
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', 60 * 60))
 
 LEAFLET_CONFIG = {
     'DEFAULT_CENTER': (42.8746, 74.5698),  # Bishkek, Kyrgyzstan
@@ -285,5 +333,22 @@ CLOUDINARY_URL = f"cloudinary://{CLOUDINARY_STORAGE['API_KEY']}:{CLOUDINARY_STOR
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# Хранилище PDF с QR-кодами; для тестов: django.core.files.storage.FileSystemStorage
+QR_CODE_STORAGE = config('QR_CODE_STORAGE', default='applications.real_estate.storage.QRCodeStorage')
+
+# Оптимизация загруженных фото (applications.common.images): размеры в WebP без EXIF
+# Хранилище результатов; для тестов: django.core.files.storage.FileSystemStorage
+IMAGE_PIPELINE_STORAGE = config('IMAGE_PIPELINE_STORAGE', default='cloudinary_storage.storage.MediaCloudinaryStorage')
+# Запускать оптимизацию при загрузке фото объявления
+IMAGE_PIPELINE_ON_UPLOAD = config('IMAGE_PIPELINE_ON_UPLOAD', default=True, cast=bool)
+# Процессов в пуле одной задачи
+IMAGE_PIPELINE_WORKERS = config('IMAGE_PIPELINE_WORKERS', default=min(os.cpu_count() or 1, 4), cast=int)
+# Исходники больше этого размера не обрабатываются, байт
+IMAGE_PIPELINE_MAX_SOURCE_BYTES = config('IMAGE_PIPELINE_MAX_SOURCE_BYTES', default=40 * 1024 * 1024, cast=int)
+IMAGE_WEBP_QUALITY = config('IMAGE_WEBP_QUALITY', default=80, cast=int)
+# PNG водяного знака (пусто - без водяного знака) и размеры, на которые он наносится
+IMAGE_WATERMARK_PATH = config('IMAGE_WATERMARK_PATH', default='')
+IMAGE_WATERMARK_VARIANTS = ('card', 'full')
+
 
 # settings.py
@@ -4,11 +4,15 @@ from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from applications.common.views import ResponseCacheStatsView, metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # path('api/user/', include('applications.user.urls')),
     path('api/real-estate/', include('applications.real_estate_advertisement.urls')),
     # path('api/vehicle/', include('applications.vehicle_advertisement.urls')),
+    path('api/cache-stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    path('metrics', metrics_view, name='metrics'),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]